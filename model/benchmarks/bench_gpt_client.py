@@ -0,0 +1,209 @@
+"""
+Throughput of GPTClient and Augmentation against a local fake of the OpenAI API.
+
+Each scenario pushes a synthetic corpus through real HTTP calls to
+tests.fake_openai_server, whose run times, error rates and malformed-output
+rate are set below, and reports sentences per second, p50/p99 batch latency,
+p50 time to a batch's first result and API calls per sentence.
+
+    python -m benchmarks.bench_gpt_client --sentences 2000 --run-median 2 --rate-limit-rate 0.02
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from unittest.mock import patch
+
+from openai import AsyncOpenAI
+
+from lib.augment.AugmentType import AugmentationType
+from lib.augment.Augmentation import Augmentation, MAX_PER_REQUEST
+from lib.augment.Progress import ProgressManifest
+from lib.util.openai.ChatClient import ChatClient
+from lib.util.openai.FailureJournal import FailureJournal
+from lib.util.openai.GPTClient import GPTClient
+from lib.util.openai.ResponseCache import ResponseCache
+from lib.util.openai.StructuredResponse import ResponseFormat
+from tests.fake_openai_server import FakeOpenAIServer, fixed, lognormal
+
+_WORDS = (
+    "the you your they we never always again told said going make people nothing everyone "
+    "everything know think really just about because after before time"
+).split()
+_ELEMENTS = ("blame", "denial", "threat")
+_ORDINALS = ("1", "2", "3")
+
+
+def synthetic_corpus(count: int, seed: int = 0) -> list[str]:
+    generator = random.Random(seed)
+    return [
+        " ".join(generator.choice(_WORDS) for _ in range(generator.randint(6, 18))) + f" {i}"
+        for i in range(count)
+    ]
+
+
+class LatencyProbe:
+    """Records the wall time, time to first result and outcome of every process_batch call on a client."""
+
+    def __init__(self, client: GPTClient):
+        self.latencies: list[float] = []
+        self.first_results: list[float] = []
+        self.resolved = 0
+        process_batch = client.process_batch
+
+        async def timed_process_batch(batch, on_result=None):
+            start = time.monotonic()
+            first: list[float] = []
+
+            def timed_on_result(sentence, rewrites):
+                if not first:
+                    first.append(time.monotonic() - start)
+                if on_result is not None:
+                    on_result(sentence, rewrites)
+
+            result = await process_batch(batch, timed_on_result)
+            self.latencies.append(time.monotonic() - start)
+            self.first_results.extend(first)
+            self.resolved += len(result or {})
+            return result
+
+        client.process_batch = timed_process_batch
+
+
+async def connect(server: FakeOpenAIServer, workdir: str, args) -> GPTClient:
+    client_cls = ChatClient if args.backend == "chat" else GPTClient
+    client = client_cls(
+        "bench", "bench-model", "bench-system", args.pool_size,
+        requests_per_minute=args.requests_per_minute, tokens_per_minute=args.tokens_per_minute,
+        cache=ResponseCache(directory=os.path.join(workdir, "cache")) if args.cache else None,
+        response_format=ResponseFormat[args.response_format.upper()],
+        stream=args.stream,
+        hedge_percentile=args.hedge_percentile or None,
+    )
+    client.journal = FailureJournal(os.path.join(workdir, "failed.jsonl"), client.logger)
+    client._client = AsyncOpenAI(base_url=server.url, api_key="bench")
+    await client._prepare_assistant()
+    return client
+
+
+async def bench_client(server: FakeOpenAIServer, workdir: str, args) -> dict:
+    client = await connect(server, workdir, args)
+    probe = LatencyProbe(client)
+    sentences = synthetic_corpus(args.sentences, args.seed)
+    calls_before = server.total_calls
+
+    start = time.monotonic()
+    batches = [sentences[i:i + MAX_PER_REQUEST] for i in range(0, len(sentences), MAX_PER_REQUEST)]
+    await asyncio.gather(*(client.process_batch(batch) for batch in batches))
+    wall = time.monotonic() - start
+    await client.close()
+
+    return summarise(wall, len(sentences), probe, server.total_calls - calls_before)
+
+
+async def bench_augmentation(server: FakeOpenAIServer, workdir: str, args) -> dict:
+    input_dir = os.path.join(workdir, "input") + "/"
+    os.makedirs(input_dir)
+
+    sentences = synthetic_corpus(args.sentences, args.seed)
+    for i, name in enumerate(_ELEMENTS):
+        with open(input_dir + name + ".csv", "w", encoding="utf-8") as f:
+            f.write("type,sentence\n")
+            for j, sentence in enumerate(sentences[i::len(_ELEMENTS)]):
+                f.write(f'{_ORDINALS[j % len(_ORDINALS)]},"{sentence}"\n')
+
+    augmentation = Augmentation(AugmentationType.EMOTIONAL_TONE)
+    augmentation.input_path = input_dir
+    augmentation.output_path = os.path.join(workdir, "output") + "/"
+    augmentation.skipped_path = os.path.join(workdir, "skipped") + "/"
+    augmentation.progress = ProgressManifest(os.path.join(workdir, "progress.jsonl"))
+    probes: list[LatencyProbe] = []
+
+    async def create_gpt_client():
+        augmentation.gpt_client = await connect(server, workdir, args)
+        probes.append(LatencyProbe(augmentation.gpt_client))
+
+    calls_before = server.total_calls
+    start = time.monotonic()
+    with patch("lib.augment.Augmentation.ELEMENT_PATHS", {element: element for element in _ELEMENTS}), \
+            patch.object(augmentation, "create_gpt_client", create_gpt_client):
+        await augmentation._run()
+    wall = time.monotonic() - start
+
+    return summarise(wall, len(sentences), probes[0], server.total_calls - calls_before)
+
+
+def summarise(wall: float, sentences: int, probe: LatencyProbe, api_calls: int) -> dict:
+    quantiles = _percentiles(probe.latencies)
+    first_result = _percentiles(probe.first_results)
+    return {
+        "wall_secs": wall,
+        "sentences_per_sec": probe.resolved / wall,
+        "resolved": probe.resolved,
+        "sentences": sentences,
+        "p50_batch_secs": quantiles[49],
+        "p99_batch_secs": quantiles[98],
+        "p50_first_result_secs": first_result[49],
+        "calls_per_sentence": api_calls / sentences,
+    }
+
+
+def _percentiles(values: list[float]) -> list[float]:
+    values = sorted(values) or [float("nan")]
+    return statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+
+
+def report(name: str, stats: dict):
+    print(
+        f"{name:<13} wall {stats['wall_secs']:7.2f}s | {stats['sentences_per_sec']:8.1f} sentences/s | "
+        f"batch p50 {stats['p50_batch_secs']:6.2f}s p99 {stats['p99_batch_secs']:6.2f}s | "
+        f"first result p50 {stats['p50_first_result_secs']:6.2f}s | "
+        f"{stats['calls_per_sentence']:5.2f} calls/sentence | resolved {stats['resolved']:,}/{stats['sentences']:,}"
+    )
+
+
+async def run_scenario(scenario, args) -> dict:
+    server = FakeOpenAIServer(
+        latency={"*": lognormal(args.call_median)} if args.call_median else None,
+        run_seconds=lognormal(args.run_median, args.run_sigma) if args.run_sigma else fixed(args.run_median),
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    with server, tempfile.TemporaryDirectory() as workdir:
+        return await scenario(server, workdir, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=("client", "augmentation", "all"), default="all")
+    parser.add_argument("--sentences", type=int, default=1_000)
+    parser.add_argument("--pool-size", type=int, default=25)
+    parser.add_argument("--run-median", type=float, default=1.0, help="median secs a run stays in progress")
+    parser.add_argument("--run-sigma", type=float, default=0.5, help="log-normal spread of run secs, 0 for fixed")
+    parser.add_argument("--call-median", type=float, default=0.02, help="median secs per HTTP call, 0 for none")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="share of calls answered with 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of runs with malformed output")
+    parser.add_argument("--requests-per-minute", type=int, default=1_000_000)
+    parser.add_argument("--tokens-per-minute", type=int, default=1_000_000_000)
+    parser.add_argument("--cache", action="store_true", help="enable the response cache")
+    parser.add_argument("--backend", choices=("assistants", "chat"), default="assistants")
+    parser.add_argument("--response-format", choices=("text", "json"), default="text")
+    parser.add_argument("--stream", action="store_true", help="stream runs instead of polling them")
+    parser.add_argument("--hedge-percentile", type=float, default=0.95, help="latency percentile to hedge at, 0 for none")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.scenario in ("client", "all"):
+        report("gpt client", asyncio.run(run_scenario(bench_client, args)))
+    if args.scenario in ("augmentation", "all"):
+        report("augmentation", asyncio.run(run_scenario(bench_augmentation, args)))
+
+
+if __name__ == "__main__":
+    main()
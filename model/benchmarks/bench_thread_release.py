@@ -0,0 +1,155 @@
+"""
+Thread pool utilisation of GPTClient with and without a fixed hold on release.
+
+Drives GPTClient against an in-process stand-in for the Assistants API whose
+runs take a fixed time, and reports how much of the pool's thread time was
+spent on runs rather than idling before reuse.
+
+    python -m benchmarks.bench_thread_release --batches 200 --pool-size 25
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from types import SimpleNamespace
+
+from lib.util.openai.GPTClient import GPTClient
+from lib.util.openai.ThreadPool import ThreadPool
+
+
+class SimulatedAssistants:
+    """Just enough of AsyncOpenAI.beta for GPTClient, with runs lasting run_latency secs."""
+
+    def __init__(self, run_latency: float, jitter: float):
+        self.run_latency = run_latency
+        self.jitter = jitter
+        self._ids = itertools.count()
+        self._runs: dict[str, tuple[float, float]] = {}
+        self._messages: dict[str, list] = {}
+
+        self.beta = SimpleNamespace(threads=SimpleNamespace(
+            create=self._create_thread,
+            delete=self._delete_thread,
+            messages=SimpleNamespace(create=self._create_message, list=self._list_messages),
+            runs=SimpleNamespace(create=self._create_run, retrieve=self._retrieve_run, cancel=self._cancel_run),
+        ))
+
+    async def _create_thread(self):
+        return SimpleNamespace(id=f"thread_{next(self._ids)}")
+
+    async def _delete_thread(self, thread_id):
+        self._messages.pop(thread_id, None)
+
+    async def _create_message(self, thread_id, role, content):
+        message = SimpleNamespace(role=role, created_at=int(time.time()), content=content)
+        self._messages.setdefault(thread_id, []).insert(0, message)
+        return message
+
+    async def _create_run(self, thread_id, assistant_id):
+        run_id = f"run_{next(self._ids)}"
+        duration = max(0.0, random.gauss(self.run_latency, self.jitter))
+        self._runs[run_id] = (time.monotonic(), duration)
+
+        sentences = self._messages[thread_id][0].content.split("\n")
+        reply = "\n\n".join(f"{s} (rewritten)" for s in sentences)
+        self._messages[thread_id].insert(0, SimpleNamespace(
+            role="assistant",
+            created_at=int(time.time()),
+            content=[SimpleNamespace(text=SimpleNamespace(value=reply))],
+        ))
+        return SimpleNamespace(id=run_id, created_at=int(time.time()), status="queued")
+
+    async def _retrieve_run(self, thread_id, run_id):
+        started, duration = self._runs[run_id]
+        status = "completed" if time.monotonic() - started >= duration else "in_progress"
+        return SimpleNamespace(id=run_id, status=status, usage=None, last_error=None)
+
+    async def _cancel_run(self, thread_id, run_id):
+        return await self._retrieve_run(thread_id, run_id)
+
+    async def _list_messages(self, thread_id):
+        return SimpleNamespace(data=self._messages[thread_id])
+
+
+class HeldReleaseClient(GPTClient):
+    """GPTClient with the previous fixed hold before each thread is returned."""
+
+    hold_secs = 3.0
+
+    async def _release_thread(self, thread: ThreadPool):
+        await asyncio.sleep(self.hold_secs)
+        await super()._release_thread(thread)
+
+
+class UtilisationProbe:
+    def __init__(self, client: GPTClient):
+        self.busy_secs = 0.0
+        self._started: dict[int, float] = {}
+
+        get_thread = client._get_available_thread
+        release_thread = client._release_thread
+
+        async def timed_get_thread():
+            thread = await get_thread()
+            self._started[id(thread)] = time.monotonic()
+            return thread
+
+        async def timed_release_thread(thread):
+            self.busy_secs += time.monotonic() - self._started.pop(id(thread))
+            await release_thread(thread)
+
+        client._get_available_thread = timed_get_thread
+        client._release_thread = timed_release_thread
+
+
+async def run_benchmark(client_cls: type[GPTClient], args) -> dict:
+    client = client_cls(
+        "bench", "bench-model", "bench-system", args.pool_size,
+        requests_per_minute=1_000_000, tokens_per_minute=1_000_000_000,
+    )
+    client._client = SimulatedAssistants(args.run_latency, args.jitter)
+    client._assistant = SimpleNamespace(id="bench-assistant")
+    # Hold the pool size fixed so only the release behaviour differs
+    client.limiter.minimum = client.limiter.maximum = args.pool_size
+    await client._populate_thread_pool()
+
+    probe = UtilisationProbe(client)
+    batches = [[f"sentence {i}-{j}" for j in range(25)] for i in range(args.batches)]
+
+    start = time.monotonic()
+    results = await asyncio.gather(*(client.process_batch(batch) for batch in batches))
+    wall = time.monotonic() - start
+    await client.close()
+
+    return {
+        "wall_secs": wall,
+        "batches_per_sec": args.batches / wall,
+        "utilisation": probe.busy_secs / (args.pool_size * wall),
+        "failed": sum(1 for result in results if not result),
+    }
+
+
+def report(name: str, stats: dict):
+    print(
+        f"{name:<16} wall {stats['wall_secs']:7.2f}s | {stats['batches_per_sec']:6.2f} batches/s | "
+        f"pool utilisation {stats['utilisation']:6.1%} | failed {stats['failed']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=25)
+    parser.add_argument("--run-latency", type=float, default=2.0, help="mean secs per run")
+    parser.add_argument("--jitter", type=float, default=0.5, help="std dev of secs per run")
+    parser.add_argument("--hold", type=float, default=3.0, help="secs the previous release held each thread")
+    args = parser.parse_args()
+
+    HeldReleaseClient.hold_secs = args.hold
+    report(f"held {args.hold:g}s", asyncio.run(run_benchmark(HeldReleaseClient, args)))
+    report("state tracked", asyncio.run(run_benchmark(GPTClient, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class AugmentationBackend(Enum):
+    ASSISTANTS = 0  # Interactive runs through the Assistants API
+    BATCH = 1  # Offline JSONL jobs through the Batch API
+    CHAT = 2  # Stateless chat completions, one request per chunk
@@ -51,7 +51,7 @@ class AugmentationType(Enum):
             case _:
                 raise ValueError(f"Unknown AugmentationType: {self}")
 
-    def get_prompt(self) -> str:
+    def get_prompt(self, structured: bool = False) -> str:
         with _JSON_PATH.open("r", encoding="utf-8") as f:
             content = f.read()
             data: dict = json.loads(content) if content.strip() else None
@@ -63,4 +63,4 @@ class AugmentationType(Enum):
         if not specific:
             raise ValueError(f"No prompt data found for augmentation type: {self.name.lower()}")
 
-        return data["precursor"] + specific
\ No newline at end of file
+        return data["structured_precursor" if structured else "precursor"] + specific
\ No newline at end of file
@@ -2,93 +2,355 @@ import asyncio
 import csv
 import logging
 import os
-import aiofiles
+from collections import defaultdict
+from typing import Awaitable, Callable
+
 import enums
 from data import ELEMENT_PATHS
 
+from lib.augment.AugmentBackend import AugmentationBackend
 from lib.augment.AugmentType import AugmentationType
-from lib.util.list_extensions import group_by, chunked
-from lib.util.openai.GPTClient import GPTClient
+from lib.augment.Budget import Budget
+from lib.augment.Pipeline import AugmentationPipeline
+from lib.augment.Progress import ProgressManifest
+from lib.util.CsvWriter import CsvWriter
+from lib.util.list_extensions import group_by, is_rewrite_of, packed
+from lib.util.Metrics import MetricsExporter
+from lib.util.openai.BatchClient import BatchClient
+from lib.util.openai.ChatClient import ChatClient
+from lib.util.openai.GPTClient import GPTClient, ResultCallback
+from lib.util.openai.RateLimiter import estimate_sentence_tokens
+from lib.util.openai.ResponseCache import ResponseCache
+from lib.util.openai.ShardedGPTClient import ShardedGPTClient, ShardCredentials
+from lib.util.openai.StructuredResponse import ResponseFormat
+from lib.util.openai.UsageLedger import USAGE, price, usage_scope
+from lib.util.openai.WarmState import WarmState
 
 MAX_PER_REQUEST = 25
+MAX_TOKENS_PER_REQUEST = 3_000  # estimated sentence prompt and completion tokens per chunk
+BATCH_FLUSH_ROWS = 10_000  # rows buffered per element before writing batch results
+_CUSTOM_ID_SEPARATOR = "|"
+METRICS_SNAPSHOT_PATH = "./logs/metrics.json"
+USAGE_PATH = "./logs/usage.json"
+OUTPUT_HEADER = ("type", "sentence")
+SKIPPED_PATH = "./logs/skipped/"
+PROGRESS_PATH = "./logs/progress/"
+
+
+async def run_exported(run: Callable[[], Awaitable[None]]):
+    """Runs with metrics exported, saving the usage ledger however it ends."""
+    port = os.getenv("ATHENA_METRICS_PORT")
+    exporter = MetricsExporter(port=int(port) if port else None, snapshot_path=METRICS_SNAPSHOT_PATH)
+    await exporter.start()
+    try:
+        await run()
+    finally:
+        await exporter.close()
+        await USAGE.save(USAGE_PATH)
 
 
 class Augmentation:
-    def __init__(self, augmentation_type: AugmentationType):
+    def __init__(
+            self,
+            augmentation_type: AugmentationType,
+            backend: AugmentationBackend = AugmentationBackend.ASSISTANTS,
+            budget: Budget | None = None,
+            response_format: ResponseFormat = ResponseFormat.TEXT,
+            stream: bool = False,
+            cache: ResponseCache | None = None,
+    ):
 
         self.logger = logging.getLogger("Athena | Augmentation")
 
         self.augmentation_type = augmentation_type
-        self.gpt_client: GPTClient | None = None
+        self.backend = backend
+        self.gpt_client: GPTClient | ShardedGPTClient | None = None
+        self.batch_client: BatchClient | None = None
         self.input_path = augmentation_type.input_directory()
         self.output_path = augmentation_type.output_directory()
-
-        self.lock = asyncio.locks.Lock()
+        self.skipped_path = SKIPPED_PATH + augmentation_type.name.lower() + "/"
+        self.progress = ProgressManifest(PROGRESS_PATH + augmentation_type.name.lower() + ".jsonl")
+        self.budget = budget
+        self.response_format = response_format
+        self.stream = stream
+        self.cache = cache or ResponseCache()
+        self.writers: dict[str, CsvWriter] = {}
 
     def start(self):
-        asyncio.run(self._run())
+        asyncio.run(run_exported(self._run))
 
     async def _run(self):
+        match self.backend:
+            case AugmentationBackend.ASSISTANTS | AugmentationBackend.CHAT:
+                await self._run_assistants()
+            case AugmentationBackend.BATCH:
+                await self._run_batch()
+            case _:
+                raise ValueError(f"Unknown AugmentationBackend: {self.backend}")
+
+    async def _run_assistants(self):
         self.logger.info("Creating client")
         await self.create_gpt_client()
+        await self.progress.load()
+
+        work: list[tuple[int, str, str, list[str]]] = []
+        for element, name in ELEMENT_PATHS.items():
+            grouped_sentences = await self.load_sentences(name)
+            if not grouped_sentences:
+                continue
+
+            existing = await self.index_existing(name, grouped_sentences)
+            for ordinal, sentences in grouped_sentences.items():
+                if sentences := self.progress.outstanding(name, ordinal, sentences):
+                    work.append((existing.get(ordinal, 0), name, ordinal, sentences))
+
+        # Ordinals with the fewest samples so far are augmented first, so a budget
+        # running out leaves the dataset as balanced as it can be
+        work.sort(key=lambda item: item[0])
+        for _, name, ordinal, sentences in work:
+            self.logger.info(f"Queueing: Aug Type: {self.augmentation_type.name} | Element: {name} | Type: {ordinal} | Size: {len(sentences):,}")
+
+        # One queue of chunks across every element and ordinal, drained by a fixed
+        # set of workers sized to what the client can have in flight, so small
+        # ordinals and the tail of each one never leave it idle
+        workers = self.gpt_client.capacity
+        queue: asyncio.Queue[tuple[str, str, list[str]] | None] = asyncio.Queue(maxsize=workers * 2)
+        skipped: dict[str, list[tuple[str, str]]] = defaultdict(list)
+
+        async def produce():
+            for _, name, ordinal, sentences in work:
+                for chunk in self.chunk(sentences):
+                    await queue.put((name, ordinal, chunk))
+            for _ in range(workers):
+                await queue.put(None)
+
+        await asyncio.gather(produce(), *(self.drain(queue, skipped) for _ in range(workers)))
+        self.logger.info("Processing complete!")
+
+        await self.write_skipped(skipped)
+        await self.close_writers()
+        await self.gpt_client.close()
+
+    async def drain(
+            self,
+            queue: asyncio.Queue[tuple[str, str, list[str]] | None],
+            skipped: dict[str, list[tuple[str, str]]],
+            on_rows: Callable[[str, str, list[tuple[int, str]]], Awaitable[None]] | None = None,
+    ):
+        """
+        Takes (element, ordinal, chunk) work off the queue until it gets None.
+        Each sentence's rewrites are written to its element's output, recorded
+        as done and passed to on_rows as soon as the client hands them over,
+        which when streaming is while the rest of the chunk is still being
+        generated. Chunks the budget cannot cover are added to skipped instead.
+        """
+        while (item := await queue.get()) is not None:
+            name, ordinal, chunk = item
+            emitted: set[str] = set()
+            emitting: list[asyncio.Task] = []
+
+            def on_result(sentence: str, rewrites: list[str], name=name, ordinal=ordinal, emitted=emitted,
+                          emitting=emitting):
+                if sentence not in emitted:
+                    emitted.add(sentence)
+                    emitting.append(asyncio.create_task(self.emit(name, ordinal, {sentence: rewrites}, on_rows)))
+
+            result = None
+            with usage_scope(self.augmentation_type.name, name, ordinal):
+                reservation = self.reserve(chunk)
+                if reservation is None:
+                    skipped[name].extend((ordinal, sentence) for sentence in chunk)
+                    continue
+
+                try:
+                    result = await self.process_chunk(chunk, reservation, on_result)
+                except Exception as e:
+                    self.logger.error(f"Chunk for {name} type {ordinal} failed with error: {e}")
+
+            for sentence, rewrites in (result or {}).items():
+                on_result(sentence, rewrites)  # Anything the client did not hand over as it went
+
+            for outcome in await asyncio.gather(*emitting, return_exceptions=True):
+                if isinstance(outcome, Exception):
+                    self.logger.error(f"Failed to write results for {name} type {ordinal} due to: {outcome}")
+            if not emitted:
+                self.logger.error(f"Chunk for {name} type {ordinal} failed!")
+
+    async def emit(self, name: str, ordinal: str, result: dict[str, list[str]],
+                   on_rows: Callable[[str, str, list[tuple[int, str]]], Awaitable[None]] | None = None):
+        """Writes a result's rows, then records only the sentences it covers as done."""
+        rows = self.to_rows(ordinal, result)
+        await self.write_rows(self.output_path + name + ".csv", rows)
+        await self.progress.record(name, ordinal, list(result))
+        if on_rows is not None:
+            await on_rows(name, ordinal, rows)
+
+    def chunk(self, sentences: list[str]) -> list[list[str]]:
+        """Packs sentences into chunks near MAX_TOKENS_PER_REQUEST, at most MAX_PER_REQUEST sentences each."""
+        weight = self.gpt_client.estimate_sentence_tokens if self.gpt_client is not None else estimate_sentence_tokens
+        return packed(sentences, weight, MAX_TOKENS_PER_REQUEST, MAX_PER_REQUEST)
+
+    def reserve(self, chunk: list[str]) -> tuple[int, float] | None:
+        """Reserves the chunk's estimated tokens and cost, or returns None if the budget cannot cover it."""
+        if self.budget is None:
+            return 0, 0.0
+
+        estimate = self.gpt_client.estimate_usage(chunk)
+        tokens = estimate.total_tokens
+        cost = price(self.gpt_client.model, estimate.prompt_tokens, estimate.completion_tokens)
+        return (tokens, cost) if self.budget.reserve(tokens, cost) else None
+
+    async def process_chunk(self, chunk: list[str], reservation: tuple[int, float],
+                            on_result: ResultCallback | None = None) -> dict[str, list[str]] | None:
+        try:
+            return await self.gpt_client.process_batch(chunk, on_result)
+        finally:
+            if self.budget is not None:
+                self.budget.release(*reservation)
+
+    async def index_existing(self, name: str, grouped_sentences: dict[str, list[str]]) -> dict[str, int]:
+        """
+        Marks input sentences already augmented in the element's output as done,
+        so only sentences new since the last run go through the stage, even when
+        that run predates the progress manifest.
+
+        Every augmented sentence is written as a row followed by its rewrites,
+        with no column telling them apart, so only rows opening such a group are
+        matched. A row opens one unless it shares the ordinal of the group's
+        original and reads as a rewrite of it, which keeps an input sentence
+        that happens to equal an earlier rewrite outstanding.
+
+        Returns the rows already written per ordinal, originals and rewrites alike.
+        """
+        output_path = self.output_path + name + ".csv"
+        if not os.path.exists(output_path):
+            return {}
+
+        inputs = {ordinal: set(sentences) for ordinal, sentences in grouped_sentences.items()}
+        counts: dict[str, int] = defaultdict(int)
+        originals: dict[str, list[str]] = defaultdict(list)
+        original: tuple[str, str] | None = None
+
+        for ordinal, sentence in await self.read_csv(output_path):
+            counts[ordinal] += 1
+            if original is not None and original[0] == ordinal and is_rewrite_of(original[1], [sentence]):
+                continue
 
+            original = (ordinal, sentence)
+            if sentence in inputs.get(ordinal, ()):
+                originals[ordinal].append(sentence)
+
+        for ordinal, sentences in originals.items():
+            self.progress.mark(name, ordinal, sentences)
+        return counts
+
+    async def write_skipped(self, skipped: dict[str, list[tuple[str, str]]]):
+        """
+        Records sentences left undispatched by the budget as input CSVs under
+        skipped_path, replacing any earlier record, so a resumed run can read
+        them as its input.
+        """
+        if os.path.isdir(self.skipped_path):
+            for file_name in os.listdir(self.skipped_path):
+                if file_name.endswith(".csv"):
+                    os.remove(self.skipped_path + file_name)
+
+        if not skipped:
+            return
+
+        for name, rows in skipped.items():
+            writer = CsvWriter(self.skipped_path + name + ".csv", OUTPUT_HEADER, logger=self.logger)
+            await writer.write(rows)
+            await writer.close()
+
+        total = sum(len(rows) for rows in skipped.values())
+        self.logger.warning(f"Skipped {total:,} sentences over budget, recorded in {self.skipped_path}")
+
+    async def _run_batch(self):
+        self.logger.info("Creating batch client")
+        await self.create_batch_client()
+        await self.progress.load()
+
+        batches: dict[str, list[str]] = {}
         for element, name in ELEMENT_PATHS.items():
-            csv_name = name + ".csv"
-            input_path = self.input_path + csv_name
-            output_path = self.output_path + csv_name
-
-            self.logger.debug(f"Processing element type: {name} with input path: {input_path}")
-            data = await self.read_csv(input_path)
-            if not data:
-                self.logger.error("No data found in CSV.")
+            grouped_sentences = await self.load_sentences(name)
+            if not grouped_sentences:
                 continue
 
-            grouped_data: dict[int, list[tuple[str, str]]] = group_by(data, lambda x: x[0])
-
-            for ordinal, data in grouped_data.items():
-                self.logger.info(f"Processing: Aug Type: {self.augmentation_type.name} | Element: {name} | Type: {ordinal} | Size: {len(data):,} all results in {name} with ordinal {ordinal}: Size: {len(data)}")
-                sentences = list(set([row[1].replace('"', '').lstrip() for row in data]))
-                self.logger.debug(f"Sentences created!")
-
-                # Process augmentation in chunks.
-                chunks = list(chunked(sentences, MAX_PER_REQUEST))
-                tasks = [asyncio.create_task(self.gpt_client.process_batch(chunk)) for chunk in chunks]
-                self.logger.debug("Tasks created!")
-
-                augmented_results: list[dict[str, list[str]]] = []
-                for i, task in enumerate(asyncio.as_completed(tasks)):
-                    try:
-                        result: dict[str, list[str]] | None = await task
-                        self.logger.debug(f"Result retrieved for task {i}")
-                        if not result:
-                            self.logger.error(f"hunk {i} failed!")
-                        else:
-                            augmented_results.append(result)
-                    except Exception as e:
-                        self.logger.error(f"Chunk {i} failed with error: {e}")
-
-                self.logger.info("Processing complete!")
-                csv_rows: list[tuple[int, str]] = []
-
-                for result in list(augmented_results):
-                    for key, value in result.items():
-                        csv_rows.append((ordinal, key))
-                        csv_rows.extend([(ordinal, sentence) for sentence in value])
-
-                csv_string = "\n".join([f'{row[0]},"{row[1]}"' for row in csv_rows]) + "\n"
-
-
-                os.makedirs(self.output_path, exist_ok=True)
-                async with self.lock:
-                    async with aiofiles.open(output_path, mode='a+', encoding='utf-8') as f:
-                        await f.seek(0)
-                        # Check if the file is empty before writing the header
-                        file_content = await f.read()
-                        if not file_content.strip():  # If the file is empty, write the header
-                            await f.write("type,sentence\n")
-                        await f.write(csv_string)
-
-            self.logger.info(f"Processing complete for {name}")
+            for ordinal, sentences in grouped_sentences.items():
+                sentences = self.progress.outstanding(name, ordinal, sentences)
+                for i, chunk in enumerate(self.chunk(sentences)):
+                    batches[_CUSTOM_ID_SEPARATOR.join((name, ordinal, str(i)))] = chunk
+
+        self.logger.info(f"Submitting {len(batches):,} chunks for {self.augmentation_type.name}")
+        pending_rows: dict[str, list[tuple[int, str]]] = defaultdict(list)
+        pending_chunks: dict[str, list[tuple[str, list[str]]]] = defaultdict(list)
+
+        async def flush(name: str):
+            await self.write_rows(self.output_path + name + ".csv", pending_rows[name])
+            for ordinal, chunk in pending_chunks[name]:
+                await self.progress.record(name, ordinal, chunk)
+            pending_rows[name].clear()
+            pending_chunks[name].clear()
+
+        async for custom_id, result in self.batch_client.process_batches(batches):
+            name, ordinal, _ = custom_id.split(_CUSTOM_ID_SEPARATOR)
+            pending_rows[name].extend(self.to_rows(ordinal, result))
+            pending_chunks[name].append((ordinal, list(result)))
+
+            if len(pending_rows[name]) >= BATCH_FLUSH_ROWS:
+                await flush(name)
+
+        for name, rows in pending_rows.items():
+            if rows:
+                await flush(name)
+
+        self.logger.info(
+            f"Batch processing complete: {self.batch_client.completed:,} chunks completed, {self.batch_client.failed:,} failed"
+        )
+        await self.close_writers()
+        await self.batch_client.close()
+
+    async def load_sentences(self, name: str) -> dict[str, list[str]] | None:
+        input_path = self.input_path + name + ".csv"
+
+        self.logger.debug(f"Processing element type: {name} with input path: {input_path}")
+        if not os.path.exists(input_path):
+            self.logger.error(f"No input found at {input_path}.")
+            return None
+
+        data = await self.read_csv(input_path)
+        if not data:
+            self.logger.error("No data found in CSV.")
+            return None
+
+        grouped_data: dict[str, list[tuple[str, str]]] = group_by(data, lambda x: x[0])
+        return {
+            ordinal: list(set([self.normalise(row[1]) for row in rows]))
+            for ordinal, rows in grouped_data.items()
+        }
+
+    @staticmethod
+    def normalise(sentence: str) -> str:
+        return sentence.replace('"', '').lstrip()
+
+    @staticmethod
+    def to_rows(ordinal, result: dict[str, list[str]]) -> list[tuple[int, str]]:
+        rows = []
+        for key, value in result.items():
+            rows.append((ordinal, key))
+            rows.extend([(ordinal, sentence) for sentence in value])
+        return rows
+
+    async def write_rows(self, output_path: str, csv_rows: list[tuple[int, str]]):
+        """Appends rows through the output file's single writer, returning once they are written."""
+        if output_path not in self.writers:
+            self.writers[output_path] = CsvWriter(output_path, OUTPUT_HEADER, logger=self.logger)
+        await self.writers[output_path].write(csv_rows)
+
+    async def close_writers(self):
+        writers, self.writers = self.writers, {}
+        await asyncio.gather(*(writer.close() for writer in writers.values()))
 
     async def read_csv(self, file_path: str):
         # If file_path is empty, use a default CSV file.
@@ -103,17 +365,71 @@ class Augmentation:
         return rows
 
     async def create_gpt_client(self):
-        prompt = self.augmentation_type.get_prompt()
-        self.gpt_client = await GPTClient.create(
+        prompt = self.augmentation_type.get_prompt(structured=self.response_format is ResponseFormat.JSON)
+        name = f"Athena-{self.augmentation_type.name}"
+        credentials = ShardCredentials.parse_many(os.getenv("OPENAI_API_KEYS", ""))
+        client_cls = ChatClient if self.backend is AugmentationBackend.CHAT else GPTClient
+        if len(credentials) > 1:
+            self.gpt_client = await ShardedGPTClient.create(
+                name=name,
+                model="gpt-4o-mini",
+                system_prompt=prompt,
+                credentials=credentials,
+                cache=self.cache,
+                warm_state=True,
+                response_format=self.response_format,
+                stream=self.stream,
+                client_cls=client_cls
+            )
+            return
+
+        self.gpt_client = await client_cls.create(
+            name=name,
+            model="gpt-4o-mini",
+            system_prompt=prompt,
+            cache=self.cache,
+            warm_state=WarmState(name),
+            api_key=credentials[0].api_key if credentials else None,
+            organization=credentials[0].organization if credentials else None,
+            response_format=self.response_format,
+            stream=self.stream
+        )
+
+    async def create_batch_client(self):
+        prompt = self.augmentation_type.get_prompt(structured=self.response_format is ResponseFormat.JSON)
+        self.batch_client = await BatchClient.create(
             name=f"Athena-{self.augmentation_type.name}",
             model="gpt-4o-mini",
-            system_prompt=prompt
+            system_prompt=prompt,
+            response_format=self.response_format
         )
 
 
 def main():
-    for aug_type in AugmentationType:
-        augmentation = Augmentation(aug_type)
+    backend = AugmentationBackend[os.getenv("ATHENA_BACKEND", AugmentationBackend.ASSISTANTS.name).upper()]
+    response_format = ResponseFormat[os.getenv("ATHENA_RESPONSE_FORMAT", ResponseFormat.TEXT.name).upper()]
+    budget = Budget.from_env()  # Shared, so the cap covers every stage together
+    cache = ResponseCache()  # Shared, so every stage's clients read one index of the cache directory
+    resume_skipped = os.getenv("ATHENA_RESUME_SKIPPED", "").lower() in ("1", "true", "yes")
+    stream = os.getenv("ATHENA_STREAM", "").lower() in ("1", "true", "yes")
+    sequential = os.getenv("ATHENA_SEQUENTIAL", "").lower() in ("1", "true", "yes")
+
+    augmentations = [
+        Augmentation(aug_type, backend, budget, response_format, stream, cache) for aug_type in AugmentationType
+    ]
+
+    # Stages read each other's output as it is produced, so resuming skipped
+    # sentences per stage and the offline batch backend still run one by one.
+    # So do budgeted runs, which need each stage's fewest-samples-first order
+    # to spend the budget where it best balances the dataset.
+    if not sequential and not resume_skipped and budget is None and backend is not AugmentationBackend.BATCH:
+        asyncio.run(run_exported(AugmentationPipeline(augmentations).run))
+        return
+
+    for augmentation in augmentations:
+        aug_type = augmentation.augmentation_type
+        if resume_skipped:
+            augmentation.input_path = augmentation.skipped_path
         augmentation.logger.info(f"\n\nStarting Augmentation for {aug_type.name}\n\n")
         augmentation.start()
         augmentation.logger.info(f"\n\nAugmentation complete for {aug_type.name}!\n\n")
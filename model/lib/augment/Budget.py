@@ -0,0 +1,67 @@
+import logging
+import os
+
+from lib.util.openai.UsageLedger import USAGE, UsageLedger
+
+
+class Budget:
+    """
+    Cap on the tokens and/or USD spent from the moment it is created.
+
+    Chunks reserve their estimated usage before dispatch and release it once
+    done, by which point the run's actual usage is in the ledger. A chunk is
+    only dispatched while spent, reserved and its own estimate fit the budget.
+    """
+
+    def __init__(self, max_tokens: int | None = None, max_cost: float | None = None, ledger: UsageLedger = USAGE):
+        self.logger = logging.getLogger("Athena | Budget")
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.ledger = ledger
+        self.exhausted = False
+
+        self._baseline_tokens = ledger.totals.total_tokens
+        self._baseline_cost = ledger.totals.cost
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+
+    @classmethod
+    def from_env(cls) -> "Budget | None":
+        tokens = os.getenv("ATHENA_TOKEN_BUDGET")
+        cost = os.getenv("ATHENA_COST_BUDGET")
+        if not tokens and not cost:
+            return None
+        return cls(int(tokens) if tokens else None, float(cost) if cost else None)
+
+    @property
+    def spent_tokens(self) -> int:
+        return self.ledger.totals.total_tokens - self._baseline_tokens
+
+    @property
+    def spent_cost(self) -> float:
+        return self.ledger.totals.cost - self._baseline_cost
+
+    def reserve(self, tokens: int, cost: float) -> bool:
+        if self.exhausted:
+            return False
+
+        over_tokens = self.max_tokens is not None and \
+            self.spent_tokens + self._reserved_tokens + tokens > self.max_tokens
+        over_cost = self.max_cost is not None and \
+            self.spent_cost + self._reserved_cost + cost > self.max_cost
+        if over_tokens or over_cost:
+            # Stop outright rather than squeezing in smaller chunks out of priority order
+            self.exhausted = True
+            self.logger.warning(
+                f"Budget exhausted after {self.spent_tokens:,} tokens (${self.spent_cost:.4f}), "
+                f"no further chunks will be dispatched"
+            )
+            return False
+
+        self._reserved_tokens += tokens
+        self._reserved_cost += cost
+        return True
+
+    def release(self, tokens: int, cost: float):
+        self._reserved_tokens -= tokens
+        self._reserved_cost -= cost
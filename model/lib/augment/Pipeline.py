@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from data import ELEMENT_PATHS
+
+if TYPE_CHECKING:
+    from lib.augment.Augmentation import Augmentation
+
+STAGE_BUFFER_CHUNKS = 50  # chunks queued ahead of a stage before upstream waits
+
+
+class _Stage:
+    """One augmentation in the pipeline, with the bounded queue of chunks waiting for it."""
+
+    def __init__(self, augmentation: "Augmentation"):
+        self.augmentation = augmentation
+        self.queue: asyncio.Queue[tuple[str, str, list[str]] | None] = asyncio.Queue(maxsize=STAGE_BUFFER_CHUNKS)
+        self.skipped: dict[str, list[tuple[str, str]]] = defaultdict(list)
+        self.drained = asyncio.Event()
+        self.workers = 0
+
+        self._seen: dict[tuple[str, str], set[str]] = defaultdict(set)
+        self._pending: dict[tuple[str, str], list[str]] = defaultdict(list)
+
+    @property
+    def name(self) -> str:
+        return self.augmentation.augmentation_type.name
+
+    async def offer(self, name: str, ordinal: str, sentences: list[str]):
+        """
+        Takes sentences for an element's ordinal, dropping any this stage has
+        already had in this run or an earlier one, and queues them once there
+        are enough to pack full chunks.
+        The last, possibly part-filled, chunk is held back for more sentences.
+        """
+        key = (name, ordinal)
+        fresh = [
+            sentence for sentence in dict.fromkeys(map(self.augmentation.normalise, sentences))
+            if sentence and sentence not in self._seen[key]
+        ]
+        self._seen[key].update(fresh)
+        self._pending[key].extend(self.augmentation.progress.outstanding(name, ordinal, fresh))
+
+        chunks = self.augmentation.chunk(self._pending[key])
+        if len(chunks) < 2:
+            return
+
+        self._pending[key] = chunks.pop()
+        for chunk in chunks:
+            await self.queue.put((name, ordinal, chunk))
+
+    async def close(self):
+        """Queues every held-back sentence, then tells each worker there is nothing more to come."""
+        pending, self._pending = self._pending, defaultdict(list)
+        for (name, ordinal), sentences in pending.items():
+            for chunk in self.augmentation.chunk(sentences):
+                await self.queue.put((name, ordinal, chunk))
+
+        for _ in range(self.workers):
+            await self.queue.put(None)
+
+
+class AugmentationPipeline:
+    """
+    Runs every augmentation stage at once in a single event loop.
+
+    The first stage reads its input as usual. Each chunk a stage completes is
+    written to that stage's output and its rows, originals and rewrites alike,
+    are offered straight to the next stage rather than waiting for the whole
+    stage to finish. Queues between stages are bounded, so a slow stage holds
+    back the ones feeding it instead of letting work pile up in memory. Wall
+    time then tends towards the slowest stage rather than the sum of them.
+
+    Only the rows produced in this run flow downstream; intermediate output
+    directories are written but not read back, unless a stage's progress
+    manifest shows an interrupted run. Then every later stage is also fed the
+    upstream output it had not finished, since those rows will not come again.
+    """
+
+    def __init__(self, augmentations: list["Augmentation"], workers: int | None = None):
+        """Each stage keeps workers chunks in flight, or as many as its client can take when None."""
+        self.logger = logging.getLogger("Athena | Pipeline")
+        self.stages = [_Stage(augmentation) for augmentation in augmentations]
+        self.workers = workers
+
+    async def run(self):
+        self.logger.info(f"Creating clients for {len(self.stages):,} stages")
+        await asyncio.gather(*(stage.augmentation.create_gpt_client() for stage in self.stages))
+        await asyncio.gather(*(stage.augmentation.progress.load() for stage in self.stages))
+        for stage in self.stages:
+            stage.workers = self.workers or stage.augmentation.gpt_client.capacity
+
+        resumed = any(stage.augmentation.progress.resumed for stage in self.stages)
+        await asyncio.gather(*(self._run_stage(index, resumed) for index in range(len(self.stages))))
+        self.logger.info("Pipeline complete!")
+
+    async def _feed(self, index: int):
+        stage = self.stages[index]
+        for element, name in ELEMENT_PATHS.items():
+            if index and not os.path.exists(stage.augmentation.input_path + name + ".csv"):
+                continue
+
+            grouped_sentences = await stage.augmentation.load_sentences(name)
+            if not grouped_sentences:
+                continue
+
+            await stage.augmentation.index_existing(name, grouped_sentences)
+            for ordinal, sentences in grouped_sentences.items():
+                await stage.offer(name, ordinal, sentences)
+
+    async def _fill(self, index: int, resumed: bool):
+        """Feeds the stage its own input where it needs it, then closes it once upstream has drained too."""
+        if index == 0 or resumed:
+            await self._feed(index)
+        if index:
+            await self.stages[index - 1].drained.wait()
+        await self.stages[index].close()
+
+    async def _run_stage(self, index: int, resumed: bool):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        async def offer_downstream(name: str, ordinal: str, rows: list[tuple[int, str]]):
+            await downstream.offer(name, ordinal, [sentence for _, sentence in rows])
+
+        augmentation = stage.augmentation
+        on_rows = offer_downstream if downstream is not None else None
+        await asyncio.gather(
+            self._fill(index, resumed),
+            *(augmentation.drain(stage.queue, stage.skipped, on_rows) for _ in range(stage.workers))
+        )
+        stage.drained.set()
+        self.logger.info(f"Stage {stage.name} complete!")
+
+        await augmentation.write_skipped(stage.skipped)
+        await augmentation.close_writers()
+        await augmentation.gpt_client.close()
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+
+import aiofiles
+
+_HASH_CHARS = 16  # 64 bits, plenty for the sentences of one stage
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:_HASH_CHARS]
+
+
+def chunk_hash(chunk: list[str]) -> str:
+    return content_hash("\n".join(sorted(chunk)))
+
+
+class ProgressManifest:
+    """
+    Durable record of the chunks a stage has written, so an interrupted run can
+    be restarted without redoing or duplicating finished work.
+
+    Each chunk is appended as one line, in a single write, once its rows are in
+    the output: its element, ordinal, content hash and the hashes of its
+    sentences. Chunk boundaries shift between runs as token estimates change,
+    so outstanding work is worked out per sentence. A line torn by a crash is
+    ignored on load and its chunk simply done again.
+
+    Sentences found in a stage's output can also be marked done without being
+    recorded, which makes the manifest an index of every source sentence the
+    stage has augmented: a later run with new input only sends the difference.
+
+    Delete the file, and the stage's output, to start a stage over.
+    """
+
+    def __init__(self, path: str, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger("Athena | Progress")
+        self.path = Path(path)
+        self.chunks = 0
+
+        self._done: dict[tuple[str, str], set[str]] = defaultdict(set)
+        self._lock = asyncio.Lock()
+
+    @property
+    def resumed(self) -> bool:
+        """Whether an earlier run had already written chunks for this stage."""
+        return self.chunks > 0
+
+    async def load(self):
+        self._done.clear()
+        self.chunks = 0
+        try:
+            async with aiofiles.open(self.path, mode="r", encoding="utf-8") as f:
+                async for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Partial line from an interrupted write
+                    self._done[(entry["element"], entry["ordinal"])].update(entry["sentences"])
+                    self.chunks += 1
+        except FileNotFoundError:
+            return
+
+        sentences = sum(len(done) for done in self._done.values())
+        self.logger.info(f"Resuming from {self.chunks:,} chunks ({sentences:,} sentences) recorded in {self.path}")
+
+    def outstanding(self, element: str, ordinal: str, sentences: list[str]) -> list[str]:
+        done = self._done.get((element, ordinal))
+        if not done:
+            return sentences
+        return [sentence for sentence in sentences if content_hash(sentence) not in done]
+
+    def mark(self, element: str, ordinal: str, sentences: list[str]):
+        """Counts sentences as done for this run only, for work known to be finished from elsewhere."""
+        if sentences:
+            self._done[(element, ordinal)].update(content_hash(sentence) for sentence in sentences)
+
+    async def record(self, element: str, ordinal: str, chunk: list[str]):
+        hashes = [content_hash(sentence) for sentence in chunk]
+        line = json.dumps({"element": element, "ordinal": ordinal, "chunk": chunk_hash(chunk), "sentences": hashes})
+
+        async with self._lock:
+            os.makedirs(self.path.parent, exist_ok=True)
+            async with aiofiles.open(self.path, mode="a", encoding="utf-8") as f:
+                await f.write(line + "\n")
+            self._done[(element, ordinal)].update(hashes)
+            self.chunks += 1
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from pathlib import Path
+
+
+class AppendWriter:
+    """
+    Single writer task for an append-only file.
+
+    Items from any number of tasks are queued, and the writer task appends
+    everything queued since its last write in one go, up to max_flush items.
+    Subclasses turn a run of items into text in _write.
+    """
+
+    max_flush = 500
+    unit = "items"
+
+    def __init__(self, path: str | Path, logger: logging.Logger):
+        self.logger = logger
+        self.path = Path(path)
+        self.written = 0
+        self.dropped = 0
+
+        self._queue: asyncio.Queue[tuple[list, asyncio.Future | None]] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    def _submit(self, items: list, written: asyncio.Future | None = None):
+        """Queues items without waiting; written, if given, resolves once they are in the file."""
+        self._queue.put_nowait((items, written))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._write_loop())
+
+    async def flush(self):
+        if self._task is not None and not self._task.done():
+            await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _write_loop(self):
+        while True:
+            entries = [await self._queue.get()]
+            count = len(entries[0][0])
+            while count < self.max_flush and not self._queue.empty():
+                entries.append(self._queue.get_nowait())
+                count += len(entries[-1][0])
+
+            try:
+                await self._write([item for items, _ in entries for item in items])
+                self.written += count
+                for _, written in entries:
+                    if written is not None and not written.done():
+                        written.set_result(None)
+            except Exception as e:
+                self.dropped += count
+                self.logger.error(f"Failed to write {count:,} {self.unit} to {self.path} due to:\n{e}")
+                for _, written in entries:
+                    if written is not None and not written.done():
+                        written.set_exception(e)
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    async def _write(self, items: list):
+        raise NotImplementedError
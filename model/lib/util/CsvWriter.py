@@ -0,0 +1,53 @@
+import asyncio
+import csv
+import io
+import logging
+import os
+
+import aiofiles
+
+from .AppendWriter import AppendWriter
+
+
+class CsvWriter(AppendWriter):
+    """
+    Single writer for one CSV file.
+
+    Rows from any number of tasks are queued, and one writer task appends
+    everything queued since its last write in one go, quoted by the csv module.
+    Whether the header is needed is worked out once, from the file's size, so
+    appending costs the same however large the file has grown.
+    """
+
+    max_flush = 5_000
+    unit = "rows"
+
+    def __init__(self, path: str, header: tuple[str, ...], logger: logging.Logger | None = None):
+        super().__init__(path, logger or logging.getLogger("Athena | CSV Writer"))
+        self.header = header
+
+        self._needs_header: bool | None = None
+
+    async def write(self, rows: list[tuple]):
+        """Queues rows for the writer task, returning once they are in the file."""
+        if not rows:
+            return
+
+        written = asyncio.get_running_loop().create_future()
+        self._submit(rows, written)
+        await written
+
+    async def _write(self, rows: list[tuple]):
+        if self._needs_header is None:
+            self._needs_header = not self.path.exists() or self.path.stat().st_size == 0
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if self._needs_header:
+            writer.writerow(self.header)
+        writer.writerows(rows)
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        async with aiofiles.open(self.path, mode="a", encoding="utf-8") as f:
+            await f.write(buffer.getvalue())
+        self._needs_header = False
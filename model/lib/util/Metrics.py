@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+import aiofiles
+
+_DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_SNAPSHOT_QUANTILES = (0.5, 0.9, 0.99)
+_SNAPSHOT_SECS = 30
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == math.inf else f"{value:g}"
+
+
+class _Metric:
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+
+class Counter(_Metric):
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, description, label_names)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[tuple[dict[str, str], float]]:
+        return [(dict(zip(self.label_names, key)), value) for key, value in self._values.items()]
+
+    def prometheus_lines(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labels, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self) -> list[dict]:
+        return [{"labels": labels, "value": value} for labels, value in self.samples()]
+
+
+class _HistogramSeries:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.bucket_counts = [0] * (len(buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = _DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels):
+        series = self._series.setdefault(self._key(labels), _HistogramSeries(self.buckets))
+        series.bucket_counts[bisect_left(self.buckets, value)] += 1
+        series.count += 1
+        series.sum += value
+
+    @contextmanager
+    def timer(self, **labels):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series.count if series else 0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        series = self._series.get(self._key(labels))
+        return self._quantile(series, q) if series else None
+
+    def _quantile(self, series: _HistogramSeries, q: float) -> float | None:
+        if series.count == 0:
+            return None
+
+        rank = q * series.count
+        seen = 0
+        for i, bucket_count in enumerate(series.bucket_counts):
+            if seen + bucket_count >= rank and bucket_count > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # Beyond the last bound, report the bound
+                # Interpolate linearly within the bucket
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def prometheus_lines(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), series.bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(labels | {"le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series.count}")
+        return lines
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {
+                "labels": dict(zip(self.label_names, key)),
+                "count": series.count,
+                "sum": series.sum,
+            } | {f"p{int(q * 100)}": self._quantile(series, q) for q in _SNAPSHOT_QUANTILES}
+            for key, series in self._series.items()
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, description, label_names))
+
+    def histogram(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = _DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, label_names, buckets))
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} is already registered as a {type(existing).__name__}")
+            return existing
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def prometheus_text(self) -> str:
+        return "\n".join(line for metric in self._metrics.values() for line in metric.prometheus_lines()) + "\n"
+
+    def snapshot(self) -> dict:
+        return {
+            "timestamp": time.time(),
+            "counters": {m.name: m.snapshot() for m in self._metrics.values() if isinstance(m, Counter)},
+            "histograms": {m.name: m.snapshot() for m in self._metrics.values() if isinstance(m, Histogram)},
+        }
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsExporter:
+    """
+    Serves a registry as Prometheus text on http://host:port/metrics and writes a
+    JSON snapshot of it to snapshot_path every interval seconds.
+    """
+
+    def __init__(self, registry: MetricsRegistry = METRICS, port: int | None = None, host: str = "127.0.0.1",
+                 snapshot_path: str | None = None, interval: float = _SNAPSHOT_SECS):
+        self.logger = logging.getLogger("Athena | Metrics")
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.interval = interval
+
+        self._server: asyncio.Server | None = None
+        self._snapshot_task: asyncio.Task | None = None
+
+    async def start(self):
+        if self.port is not None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            self.logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+        if self.snapshot_path is not None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+        return self
+
+    async def close(self):
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            await self.write_snapshot()
+
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def write_snapshot(self):
+        os.makedirs(self.snapshot_path.parent, exist_ok=True)
+        temporary = self.snapshot_path.with_suffix(self.snapshot_path.suffix + ".tmp")
+        async with aiofiles.open(temporary, mode="w", encoding="utf-8") as f:
+            await f.write(json.dumps(self.registry.snapshot(), indent=4))
+        os.replace(temporary, self.snapshot_path)
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.write_snapshot()
+            except Exception as e:
+                self.logger.error(f"Failed to write metrics snapshot due to {e}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # Headers are not needed
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+                body = self.registry.prometheus_text().encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"Not found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
@@ -1,3 +1,4 @@
+import re
 from collections import defaultdict
 from typing import TypeVar, List, Callable, Dict, Iterator
 
@@ -22,16 +23,151 @@ def chunked(values: List[T], size: int) -> Iterator[List[T]]:
     for i in range(0, len(values), size):
         yield values[i:i + size]
 
+
+def packed(values: List[T], weight: Callable[[T], float], max_weight: float, max_items: int) -> List[List[T]]:
+    """
+    Packs values into as few chunks as possible, each holding at most max_items
+    values whose weights sum to at most max_weight.
+
+    First-fit decreasing: heaviest values are placed first, each into the first
+    chunk with room. A value heavier than max_weight gets a chunk to itself.
+    """
+    if not isinstance(max_items, int):
+        raise TypeError("Max items must be an integer.")
+    if max_items <= 0:
+        raise ValueError("Max items must be a positive integer.")
+    if max_weight <= 0:
+        raise ValueError("Max weight must be positive.")
+
+    chunks: List[List[T]] = []
+    loads: List[float] = []
+    open_chunks: List[int] = []  # indexes of chunks below max_items, in creation order
+
+    for value, value_weight in sorted(((v, weight(v)) for v in values), key=lambda pair: pair[1], reverse=True):
+        target = next((i for i in open_chunks if loads[i] + value_weight <= max_weight), None)
+        if target is None:
+            target = len(chunks)
+            chunks.append([])
+            loads.append(0.0)
+            open_chunks.append(target)
+
+        chunks[target].append(value)
+        loads[target] += value_weight
+        if len(chunks[target]) >= max_items or loads[target] >= max_weight:
+            open_chunks.remove(target)
+
+    return chunks
+
 def parse_list_response(response_text: str) -> list[list[str] | None]:
     groups = response_text.strip().split("\n\n")
-    result = []
+    return [_parse_group(group) for group in groups]
+
+
+def _parse_group(group: str) -> list[str]:
+    rewrites = [line.strip() for line in group.split("\n") if line.strip()]
+
+    if any([x.lower() == "null" for x in rewrites]):
+        return []
+    return rewrites
+
+
+class ListResponseParser:
+    """
+    Incremental parse_list_response for text arriving in pieces.
+
+    feed returns each group once the next group has started, so a trailing
+    separator is never mistaken for an empty group; close returns whatever is
+    left. Together they give exactly what parse_list_response gives for the
+    whole text.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._emitted = 0
 
-    for group in groups:
-        rewrites = [line.strip() for line in group.split("\n") if line.strip()]
+    def feed(self, text: str) -> list[list[str]]:
+        self._buffer += text
+        if self._emitted == 0:
+            self._buffer = self._buffer.lstrip()
 
-        if any([x.lower() == "null" for x in rewrites]):
-            result.append([])
+        groups = []
+        while True:
+            group, separator, rest = self._buffer.partition("\n\n")
+            if not separator or not rest.strip():
+                break
+            groups.append(_parse_group(group))
+            self._buffer = rest
+
+        self._emitted += len(groups)
+        return groups
+
+    def close(self) -> list[list[str]]:
+        if self._emitted and not self._buffer.strip():
+            return []
+        self._emitted += 1
+        return [_parse_group(self._buffer.strip())]
+
+def _words(text: str) -> set[str]:
+    return {word for word in re.findall(r"[a-z0-9']+", text.lower()) if len(word) > 2}
+
+
+def _overlap(sentence: str, group: list[str]) -> float:
+    sentence_words = _words(sentence)
+    if not sentence_words or not group:
+        return 0.0
+    return len(sentence_words & _words(" ".join(group))) / len(sentence_words)
+
+
+def is_rewrite_of(sentence: str, group: list[str], threshold: float = 0.5,
+                  rivals: List[str] = (), margin: float = 0.15) -> bool:
+    """
+    Whether the group shares enough words with the sentence to be its rewrites
+    on its own, beating its overlap with every rival sentence by margin, as
+    align_groups requires of the pairs it keeps.
+    """
+    score = _overlap(sentence, group)
+    return score >= threshold and all(score - _overlap(rival, group) >= margin for rival in rivals)
+
+
+def align_groups(sentences: List[str], groups: list[list[str] | None],
+                 threshold: float = 0.5, margin: float = 0.15) -> Dict[int, int]:
+    """
+    Aligns response groups to the sentences they rewrite when their counts differ.
+
+    Pairs are chosen by an order-preserving alignment maximising word overlap, and
+    only kept when the overlap clears threshold and beats every alternative pairing
+    for either side by margin. Returns {sentence index: group index}.
+    """
+    if len(sentences) == len(groups):
+        return {i: i for i in range(len(sentences))}
+
+    similarity = [[_overlap(sentence, group or []) for group in groups] for sentence in sentences]
+    rows, columns = len(sentences), len(groups)
+
+    # best[i][j] is the best total overlap aligning sentences[:i] with groups[:j]
+    best = [[0.0] * (columns + 1) for _ in range(rows + 1)]
+    for i in range(1, rows + 1):
+        for j in range(1, columns + 1):
+            best[i][j] = max(best[i - 1][j], best[i][j - 1])
+            if similarity[i - 1][j - 1] >= threshold:
+                best[i][j] = max(best[i][j], best[i - 1][j - 1] + similarity[i - 1][j - 1])
+
+    aligned = {}
+    i, j = rows, columns
+    while i > 0 and j > 0:
+        score = similarity[i - 1][j - 1]
+        if score >= threshold and best[i][j] == best[i - 1][j - 1] + score:
+            aligned[i - 1] = j - 1
+            i, j = i - 1, j - 1
+        elif best[i][j] == best[i - 1][j]:
+            i -= 1
         else:
-            result.append(rewrites)
+            j -= 1
+
+    def is_confident(row: int, column: int) -> bool:
+        score = similarity[row][column]
+        rivals = [similarity[row][k] for k in range(columns) if k != column]
+        rivals += [similarity[k][column] for k in range(rows) if k != row]
+        return all(score - rival >= margin for rival in rivals)
 
-    return result
\ No newline at end of file
+    return {row: column for row, column in aligned.items() if is_confident(row, column)}
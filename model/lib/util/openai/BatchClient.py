@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from os import getenv
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+from openai import AsyncOpenAI
+from openai.types import Batch
+
+from .StructuredResponse import ResponseFormat, RESPONSE_FORMAT, format_indexed_prompt, parse_indexed_response
+from ..list_extensions import parse_list_response, chunked
+
+_BATCH_DIR = "./logs/batches/"
+_ENDPOINT = "/v1/chat/completions"
+_COMPLETION_WINDOW = "24h"
+_MAX_REQUESTS_PER_FILE = 50_000  # Batch API limit per input file
+_POLL_SECS = 30
+_MAX_POLL_SECS = 300
+_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchClient:
+    """
+    Offline alternative to GPTClient which sends every chunk of a stage through
+    the Batch API as a single JSONL job rather than one interactive run per chunk.
+    """
+
+    @classmethod
+    async def create(cls, name: str, model: str, system_prompt: str, poll_interval: float = _POLL_SECS,
+                     response_format: ResponseFormat = ResponseFormat.TEXT):
+        self = cls(name, model, system_prompt, poll_interval, response_format)
+        await self._connect_client()
+        return self
+
+    def __init__(self, name: str, model: str, system_prompt: str, poll_interval: float,
+                 response_format: ResponseFormat = ResponseFormat.TEXT):
+        self.completed = 0
+        self.failed = 0
+
+        self.logger = logging.getLogger(f"BATCH CLIENT - {name}")
+
+        self.name = name
+        self.model = model
+        self.system_prompt = system_prompt
+        self.poll_interval = poll_interval
+        self.response_format = response_format
+
+        self._client: AsyncOpenAI | None = None
+
+    async def _connect_client(self):
+        self.logger.info(f"Connecting {self.name} to OpenAI client!")
+        self._client = AsyncOpenAI(api_key=getenv("OPENAI_API_KEY"))
+        self.logger.info(f"Connection of {self.name} complete!")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+    async def process_batches(self, batches: dict[str, list[str]]) -> AsyncIterator[tuple[str, dict[str, list[str]]]]:
+        """
+        Submits every batch, keyed by a caller chosen custom ID, and yields
+        (custom ID, {sentence: rewrites}) pairs as the result files are read.
+        """
+        if self._client is None:
+            raise RuntimeError("Client not initialised!")
+
+        items = list(batches.items())
+        jobs: list[Batch] = []
+        for part, requests in enumerate(chunked(items, _MAX_REQUESTS_PER_FILE)):
+            path = await self._write_batch_file(requests, part)
+            jobs.append(await self._submit(path))
+
+        for job in jobs:
+            job = await self._wait(job)
+            if job.status != "completed" or job.output_file_id is None:
+                self.logger.error(f"Batch {job.id} finished with status {job.status}")
+                self.failed += job.request_counts.total if job.request_counts else 0
+                continue
+
+            async for result in self._stream_results(job.output_file_id, batches):
+                yield result
+
+            if job.error_file_id is not None:
+                await self._log_errors(job.error_file_id)
+
+    async def _write_batch_file(self, requests: list[tuple[str, list[str]]], part: int) -> Path:
+        os.makedirs(_BATCH_DIR, exist_ok=True)
+        path = Path(_BATCH_DIR) / f"{self.name}-{int(time.time())}-{part}.jsonl"
+
+        async with aiofiles.open(path, mode="w", encoding="utf-8") as f:
+            for custom_id, batch in requests:
+                await f.write(json.dumps(self._request_line(custom_id, batch)) + "\n")
+
+        self.logger.info(f"Wrote {len(requests):,} requests to {path}")
+        return path
+
+    def _request_line(self, custom_id: str, batch: list[str]) -> dict:
+        structured = self.response_format is ResponseFormat.JSON
+        body = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": format_indexed_prompt(batch) if structured else "\n".join(batch)},
+            ],
+        }
+        if structured:
+            body["response_format"] = RESPONSE_FORMAT
+
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": _ENDPOINT,
+            "body": body,
+        }
+
+    async def _submit(self, path: Path) -> Batch:
+        file = await self._client.files.create(file=path, purpose="batch")
+        job = await self._client.batches.create(
+            input_file_id=file.id,
+            endpoint=_ENDPOINT,
+            completion_window=_COMPLETION_WINDOW,
+        )
+        self.logger.info(f"Submitted batch {job.id} from {path}")
+        return job
+
+    async def _wait(self, job: Batch) -> Batch:
+        interval = self.poll_interval
+        while job.status not in _TERMINAL_STATUSES:
+            await asyncio.sleep(interval)
+            job = await self._client.batches.retrieve(job.id)
+            interval = min(_MAX_POLL_SECS, interval * 2)
+
+            if job.request_counts:
+                counts = job.request_counts
+                self.logger.info(
+                    f"Batch {job.id}: {job.status} | {counts.completed:,}/{counts.total:,} done, {counts.failed:,} failed"
+                )
+        return job
+
+    async def _stream_results(self, file_id: str, batches: dict[str, list[str]]) -> AsyncIterator[tuple[str, dict[str, list[str]]]]:
+        async with self._client.files.with_streaming_response.content(file_id) as response:
+            async for line in response.iter_lines():
+                if not line.strip():
+                    continue
+
+                result = self._parse_result(json.loads(line), batches)
+                if result is None:
+                    self.failed += 1
+                    continue
+
+                self.completed += 1
+                yield result
+
+    def _parse_result(self, line: dict, batches: dict[str, list[str]]) -> tuple[str, dict[str, list[str]]] | None:
+        custom_id = line.get("custom_id")
+        batch = batches.get(custom_id)
+        response = line.get("response") or {}
+
+        if batch is None or response.get("status_code") != 200:
+            self.logger.error(f"Batch request {custom_id} failed: {line.get('error')}")
+            return None
+
+        content = response["body"]["choices"][0]["message"]["content"]
+        if self.response_format is ResponseFormat.JSON:
+            try:
+                indexed = parse_indexed_response(content or "", len(batch))
+            except ValueError as e:
+                self.logger.error(f"Invalid structured response for {custom_id}: {e}")
+                return None
+            if not indexed:
+                return None
+            # Sentences missing from the response are left out rather than failing the chunk
+            return custom_id, {batch[index]: rewrites for index, rewrites in indexed.items()}
+
+        formatted_responses = parse_list_response(content or "")
+
+        if len(formatted_responses) != len(batch):
+            self.logger.error(f"Mismatch between number of prompts and response groups for {custom_id}.")
+            return None
+
+        return custom_id, dict(zip(batch, formatted_responses))
+
+    async def _log_errors(self, file_id: str):
+        async with self._client.files.with_streaming_response.content(file_id) as response:
+            async for line in response.iter_lines():
+                if line.strip():
+                    error = json.loads(line)
+                    self.failed += 1
+                    self.logger.error(f"Batch request {error.get('custom_id')} errored: {error.get('error')}")
@@ -0,0 +1,73 @@
+import time
+
+from openai.types.chat import ChatCompletion
+
+from .GPTClient import GPTClient, ResultCallback, _API_LATENCY
+from .RateLimiter import TokenEstimate
+from .StructuredResponse import ResponseFormat, RESPONSE_FORMAT
+
+
+class ChatClient(GPTClient):
+    """
+    GPTClient over stateless chat completions: every batch is one request of the
+    system prompt plus the chunk, so there is no assistant, thread pool or run
+    polling, and no earlier exchanges inflate the prompt.
+
+    The concurrency and rate limiters, cache, journal and bisection are shared
+    with GPTClient, as is the process_batch contract. Completions are not
+    streamed, so on_result sees a batch's sentences once the request returns.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.stream:
+            self.logger.warning("Chat completions are not streamed, stream is ignored")
+            self.stream = False
+
+    async def _prepare_assistant(self):
+        pass  # The system prompt is sent with every request, so there is nothing to discover or warm
+
+    def _resize_thread_pool(self, limit: int):
+        self.pool_size = limit
+
+    async def _process_batch(self, batch: list[str], estimate: TokenEstimate | None = None,
+                             on_result: ResultCallback | None = None) -> dict[str, list[str]] | None:
+        if self._client is None:
+            raise RuntimeError("Client not initialised!")
+
+        prompt = "\n".join(batch)
+        start_time = time.monotonic()
+
+        try:
+            with _API_LATENCY.timer(client=self.name, call="chat_completion"):
+                completion = await self._create_completion(batch)
+            if estimate is not None:
+                self._run_estimates[completion.id] = estimate
+            self._record_usage(completion)
+
+            choice = completion.choices[0]
+            if choice.finish_reason != "stop" or not choice.message.content:
+                await self._log_failed_batch(
+                    completion.id, prompt, f"Completion finished with {choice.finish_reason}", choice.message.content
+                )
+                return self._record_outcome(None, start_time)
+
+            response = self._parse_response(batch, choice.message.content)
+            self._deliver(response, on_result)
+            return self._record_outcome(response, start_time)
+        except Exception as e:
+            self._record_error(e)
+            self.logger.critical(f"FAILED TO COMPLETE BATCH DUE TO {e}")
+            return None
+
+    async def _create_completion(self, batch: list[str]) -> ChatCompletion:
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self._format_message(batch)},
+        ]
+        if self.response_format is ResponseFormat.JSON:
+            return await self._client.chat.completions.create(
+                model=self.model, messages=messages, response_format=RESPONSE_FORMAT
+            )
+
+        return await self._client.chat.completions.create(model=self.model, messages=messages)
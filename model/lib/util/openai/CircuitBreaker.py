@@ -0,0 +1,83 @@
+import logging
+import time
+from collections import deque
+from enum import Enum
+
+_WINDOW = 20  # most recent batch outcomes considered
+_MIN_CALLS = 10
+_FAILURE_THRESHOLD = 0.5
+_COOLDOWN_SECS = 30
+
+
+class BreakerState(Enum):
+    CLOSED = 0  # dispatching normally
+    OPEN = 1  # failing fast
+    HALF_OPEN = 2  # one probe batch allowed through
+
+
+class CircuitBreaker:
+    """
+    Fails batches fast while the upstream is failing most of them, instead of
+    letting every batch queue up for its own timeout.
+
+    The breaker opens once at least min_calls of the last window outcomes are
+    in and failure_threshold of them failed. After cooldown_secs one probe is
+    let through: its success closes the breaker, its failure re-opens it. A
+    probe that never reports back is replaced after another cooldown.
+    """
+
+    def __init__(
+            self,
+            window: int = _WINDOW,
+            min_calls: int = _MIN_CALLS,
+            failure_threshold: float = _FAILURE_THRESHOLD,
+            cooldown_secs: float = _COOLDOWN_SECS,
+            logger: logging.Logger | None = None,
+    ):
+        self.logger = logger or logging.getLogger("Athena | Circuit Breaker")
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.cooldown_secs = cooldown_secs
+        self.state = BreakerState.CLOSED
+
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = float("-inf")
+        self._probe_started_at: float | None = None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        match self.state:
+            case BreakerState.CLOSED:
+                return True
+            case BreakerState.OPEN if now - self._opened_at >= self.cooldown_secs:
+                self.logger.info("Circuit half-open, sending a probe batch")
+                self.state = BreakerState.HALF_OPEN
+                self._probe_started_at = now
+                return True
+            case BreakerState.HALF_OPEN if now - self._probe_started_at >= self.cooldown_secs:
+                self._probe_started_at = now
+                return True
+            case _:
+                return False
+
+    def record(self, success: bool):
+        if self.state is BreakerState.HALF_OPEN:
+            if success:
+                self.logger.info("Probe batch succeeded, circuit closed")
+                self.state = BreakerState.CLOSED
+                self._outcomes.clear()
+            else:
+                self._open("probe batch failed")
+            return
+
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if self.state is BreakerState.CLOSED and len(self._outcomes) >= self.min_calls \
+                and failures >= self.failure_threshold * len(self._outcomes):
+            self._open(f"{failures}/{len(self._outcomes)} recent batches failed")
+
+    def _open(self, reason: str):
+        self.logger.warning(f"Circuit open for {self.cooldown_secs:.0f}s: {reason}")
+        self.state = BreakerState.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started_at = None
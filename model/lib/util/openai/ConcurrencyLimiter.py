@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+_ADDITIVE_INCREASE = 1  # slots gained per limit's worth of successes
+_DECREASE_FACTOR = 0.5
+_LATENCY_FACTOR = 2.0  # latency this far above baseline counts as congestion
+_LATENCY_ALPHA = 0.05  # EWMA weight of a new latency sample on the baseline
+_DECREASE_COOLDOWN_SECS = 5  # one decrease per burst of congestion signals
+_HISTORY_SIZE = 1000
+
+
+@dataclass
+class LimitChange:
+    timestamp: float
+    limit: int
+    reason: str
+
+
+class ConcurrencyLimiter:
+    """
+    Additive-increase/multiplicative-decrease limit on concurrent runs.
+
+    The limit grows by one slot for every limit's worth of successful runs while
+    saturated, and is cut by _DECREASE_FACTOR on rate limits, server errors or
+    latency rising well above its running baseline.
+    """
+
+    def __init__(
+            self,
+            initial: int,
+            minimum: int = 1,
+            maximum: int = 100,
+            on_resize: Callable[[int], None] | None = None,
+            logger: logging.Logger | None = None,
+    ):
+        if not minimum <= initial <= maximum:
+            raise ValueError("Initial limit must be between the minimum and maximum.")
+
+        self.logger = logger or logging.getLogger("Athena | Concurrency Limiter")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.history: deque[LimitChange] = deque(maxlen=_HISTORY_SIZE)
+        self.last_throttle = float("-inf")  # monotonic time of the last rate limit
+
+        self._on_resize = on_resize
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._latency_baseline: float | None = None
+        self._last_decrease = float("-inf")
+        self._notify_task: asyncio.Task | None = None
+
+        self.history.append(LimitChange(time.time(), initial, "initial"))
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    def on_success(self, latency: float):
+        if self._latency_baseline is None:
+            self._latency_baseline = latency
+
+        congested = latency > self._latency_baseline * _LATENCY_FACTOR
+        self._latency_baseline += _LATENCY_ALPHA * (latency - self._latency_baseline)
+
+        if congested:
+            self._decrease(f"latency {latency:.1f}s above baseline {self._latency_baseline:.1f}s")
+        elif self._in_flight >= self.limit:
+            # Only grow while the current limit is actually being used
+            self._set_limit(self._limit + _ADDITIVE_INCREASE / self.limit, "success")
+
+    def on_throttle(self):
+        self.last_throttle = time.monotonic()
+        self._decrease("rate limited")
+
+    def on_error(self, reason: str = "server error"):
+        self._decrease(reason)
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < _DECREASE_COOLDOWN_SECS:
+            return
+
+        self._last_decrease = now
+        self._set_limit(self._limit * _DECREASE_FACTOR, reason)
+
+    def _set_limit(self, value: float, reason: str):
+        previous = self.limit
+        self._limit = min(float(self.maximum), max(float(self.minimum), value))
+
+        if self.limit == previous:
+            return
+
+        self.logger.info(f"Concurrency limit {previous} -> {self.limit} ({reason})")
+        self.history.append(LimitChange(time.time(), self.limit, reason))
+        if self._on_resize is not None:
+            self._on_resize(self.limit)
+
+        # Waiters may now fit under a raised limit
+        if self.limit > previous:
+            self._notify_task = asyncio.get_running_loop().create_task(self._notify())
+
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import aiofiles
+
+from ..AppendWriter import AppendWriter
+from ..list_extensions import chunked
+
+_JOURNAL_PATH = "./logs/failed.jsonl"
+
+
+async def replay_failed(
+        journal: "FailureJournal",
+        clients: set[str],
+        process_batch: Callable[[list[str]], Awaitable[dict[str, list[str]] | None]],
+        batch_size: int,
+        logger: logging.Logger,
+) -> dict[str, list[str]]:
+    """
+    Re-sends every sentence the given clients journaled as failed, rechunked
+    into batch_size batches through process_batch. The journal is rotated
+    first, so anything failing again is journaled afresh.
+    """
+    path, entries = await journal.take(clients)
+    if path is None:
+        return {}
+
+    sentences = list(dict.fromkeys(
+        sentence for entry in entries for sentence in entry["message"].split("\n") if sentence
+    ))
+    logger.info(f"Replaying {len(sentences):,} sentences from {len(entries):,} failed batches in {path}")
+
+    results = await asyncio.gather(*(process_batch(batch) for batch in chunked(sentences, batch_size)))
+
+    replayed: dict[str, list[str]] = {}
+    for result in results:
+        if result:
+            replayed |= result
+    return replayed
+
+
+class FailureJournal(AppendWriter):
+    """
+    Append-only, line-delimited record of failed batches.
+
+    Entries are queued without blocking and written by a single writer task,
+    which appends everything queued since its last write in one go.
+    """
+
+    unit = "failed batches"
+
+    def __init__(self, path: str = _JOURNAL_PATH, logger: logging.Logger | None = None):
+        super().__init__(path, logger or logging.getLogger("Athena | Failure Journal"))
+
+    def record(self, entry: dict):
+        self._submit([entry | {"logged_at": time.time()}])
+
+    def rotate(self) -> Path | None:
+        """Moves the journal aside so it can be replayed while new failures start a fresh file."""
+        if not self.path.exists():
+            return None
+
+        rotated = self.path.with_name(f"{self.path.name}.{int(time.time())}.replayed")
+        os.replace(self.path, rotated)
+        return rotated
+
+    async def take(self, clients: set[str]) -> tuple[Path | None, list[dict]]:
+        """
+        Rotates the journal and returns the entries recorded by the given
+        clients. Everyone else's entries are journaled again for their own replay.
+        """
+        await self.flush()
+        path = self.rotate()
+        if path is None:
+            return None, []
+
+        taken = []
+        for entry in await self.read(path):
+            if entry.get("client") in clients:
+                taken.append(entry)
+            else:
+                self.record(entry)
+        return path, taken
+
+    @staticmethod
+    async def read(path: str | Path) -> list[dict]:
+        entries = []
+        async with aiofiles.open(path, mode="r", encoding="utf-8") as f:
+            async for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # Partial line from an interrupted write
+        return entries
+
+    async def _write(self, entries: list[dict]):
+        os.makedirs(self.path.parent, exist_ok=True)
+        async with aiofiles.open(self.path, mode="a", encoding="utf-8") as f:
+            await f.write("".join(json.dumps(entry) + "\n" for entry in entries))
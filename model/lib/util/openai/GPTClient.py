@@ -1,64 +1,173 @@
 import logging
 import time
-import json
 import asyncio
 
-import aiofiles
 from os import getenv
+from typing import Callable
+from .CircuitBreaker import CircuitBreaker
+from .ConcurrencyLimiter import ConcurrencyLimiter
+from .FailureJournal import FailureJournal, replay_failed
+from .HedgePolicy import HedgePolicy
+from .RateLimiter import RateLimiter, TokenEstimate
+from .ResponseCache import ResponseCache
+from .RunPoller import RunPoller, TERMINAL_STATUSES
+from .StructuredResponse import ResponseFormat, RESPONSE_FORMAT, format_indexed_prompt, parse_indexed_response
 from .ThreadPool import ThreadPool
+from .UsageLedger import USAGE
+from .WarmState import WarmState, fingerprint
 from asyncio import Queue
-from openai import AsyncOpenAI
-from openai.types.beta import Assistant, Thread
+from openai import AsyncOpenAI, AsyncStream, APIStatusError, NotFoundError, RateLimitError
+from openai.types.beta import Assistant, AssistantStreamEvent, Thread
 from openai.types.beta.threads import Run, Message
 
-from ..list_extensions import parse_list_response
+from ..list_extensions import parse_list_response, align_groups, ListResponseParser, is_rewrite_of
+from ..Metrics import METRICS
 
 _NAME = "Athena-Augmentation"
 _TIMEOUT_SECS = 300  # 5 mins
 _ASSISTANT_ID = "assistant"
 _USER_ID = "user"
 _BATCH_ID_KEY = "batch_id"
-_ERROR_PATH = "./logs/failed.json"
+_REPLAY_BATCH_SIZE = 25
+_MAX_BISECT_DEPTH = 5  # 25 sentences isolate to singles within 5 halvings
 _MAX_THREAD_POOL_TRIES = 5
-_MAX_SEMAPHORE = 100  # concurrent runs at a time
+_CANCEL_TIMEOUT_SECS = 30
+_GROW_RETRY_SECS = 1
+_MIN_CONCURRENCY = 1
+_MAX_CONCURRENCY = 100  # concurrent runs at a time
+_REQUESTS_PER_MINUTE = 500
+_TOKENS_PER_MINUTE = 200_000
+_HEDGE_PERCENTILE = 0.95  # batches outliving this share of recent batches are duplicated
+_RUN_EVENTS_WITH_STATUS = ("thread.run.created", "thread.run.completed", "thread.run.failed", "thread.run.incomplete",
+                           "thread.run.cancelled", "thread.run.expired", "thread.run.requires_action")
+
+ResultCallback = Callable[[str, list[str]], None]  # called with each sentence and its rewrites once resolved
+
+_THREAD_WAIT = METRICS.histogram(
+    "athena_thread_wait_seconds", "Time spent waiting for a free thread", ("client",)
+)
+_API_LATENCY = METRICS.histogram(
+    "athena_api_call_seconds", "Latency of message and run API calls", ("client", "call")
+)
+_RUN_COMPLETION = METRICS.histogram(
+    "athena_run_completion_seconds", "Time from run creation to a terminal status", ("client", "status")
+)
+_RUN_POLLS = METRICS.histogram(
+    "athena_run_polls", "Status polls per run", ("client",), buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55)
+)
+_RUN_TOKENS = METRICS.histogram(
+    "athena_run_tokens", "Tokens used per run", ("client", "kind"),
+    buckets=(100, 250, 500, 1_000, 2_000, 4_000, 8_000, 16_000, 32_000)
+)
+_FIRST_RESULT = METRICS.histogram(
+    "athena_first_result_seconds", "Time from run creation to the first streamed sentence", ("client",)
+)
+_BATCHES = METRICS.counter("athena_batches_total", "Batches processed by outcome", ("client", "outcome"))
+_COALESCED = METRICS.counter(
+    "athena_coalesced_sentences_total", "Sentences served by a concurrent batch's call", ("client",)
+)
+_HEDGES = METRICS.counter("athena_hedges_total", "Hedged batches by the attempt that won", ("client", "winner"))
+_FAILURES = METRICS.counter("athena_failures_total", "Failed batches by reason", ("client", "reason"))
 
 class GPTClient:
 
     @classmethod
-    async def create(cls, name: str, model: str, system_prompt: str, pool_size: int = 25):
-        self = cls(name, model, system_prompt, pool_size)
+    async def create(
+            cls,
+            name: str,
+            model: str,
+            system_prompt: str,
+            pool_size: int = 25,
+            requests_per_minute: int = _REQUESTS_PER_MINUTE,
+            tokens_per_minute: int = _TOKENS_PER_MINUTE,
+            cache: ResponseCache | None = None,
+            warm_state: WarmState | None = None,
+            api_key: str | None = None,
+            organization: str | None = None,
+            response_format: ResponseFormat = ResponseFormat.TEXT,
+            stream: bool = False,
+            hedge_percentile: float | None = _HEDGE_PERCENTILE,
+            journal: FailureJournal | None = None,
+            in_flight: dict[str, asyncio.Future[list[str] | None]] | None = None,
+    ):
+        self = cls(
+            name, model, system_prompt, pool_size, requests_per_minute, tokens_per_minute, cache, warm_state,
+            api_key, organization, response_format, stream, hedge_percentile, journal, in_flight,
+        )
 
         await self._connect_client()
-        await self._create_assistant()
-        await self._populate_thread_pool()
-
+        await self._prepare_assistant()
         return self
 
-    def __init__(self, name: str, model: str, system_prompt: str, pool_size: int):
+    def __init__(
+            self,
+            name: str,
+            model: str,
+            system_prompt: str,
+            pool_size: int,
+            requests_per_minute: int = _REQUESTS_PER_MINUTE,
+            tokens_per_minute: int = _TOKENS_PER_MINUTE,
+            cache: ResponseCache | None = None,
+            warm_state: WarmState | None = None,
+            api_key: str | None = None,
+            organization: str | None = None,
+            response_format: ResponseFormat = ResponseFormat.TEXT,
+            stream: bool = False,
+            hedge_percentile: float | None = _HEDGE_PERCENTILE,
+            journal: FailureJournal | None = None,
+            in_flight: dict[str, asyncio.Future[list[str] | None]] | None = None,
+    ):
         """
         TODO -> Docstring
+
+        journal and in_flight let several clients share one failure journal
+        writer and one single-flight map, as the shards of a ShardedGPTClient do.
         """
         self.completed = 0
         self.failed = 0
 
         self.logger = logging.getLogger(f"GPT CLIENT -  {name}")
-        self.semaphore = asyncio.Semaphore(_MAX_SEMAPHORE)
-        self.lock = asyncio.locks.Lock()
+        self.limiter = ConcurrencyLimiter(
+            initial=pool_size,
+            minimum=_MIN_CONCURRENCY,
+            maximum=max(pool_size, _MAX_CONCURRENCY),
+            on_resize=self._resize_thread_pool,
+            logger=self.logger,
+        )
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute, self.logger)
+        self.hedging = HedgePolicy(hedge_percentile) if hedge_percentile is not None else None
+        self.breaker = CircuitBreaker(logger=self.logger)
+        self.journal = journal or FailureJournal(logger=self.logger)
 
         self.name = name
         self.model = model
         self.system_prompt = system_prompt
         self.pool_size = pool_size
+        self.cache = cache
+        self.warm_state = warm_state
+        self.api_key = api_key
+        self.organization = organization
+        self.response_format = response_format
+        self.stream = stream
 
         self._client: AsyncOpenAI | None = None
         self._assistant: Assistant | None = None
         self._thread_queue: Queue[ThreadPool] = Queue()
+        self._poller = RunPoller(self._retrieve_status, self.logger, self._on_run_resolved)
+        self._thread_count = 0
+        self._next_pool_id = 0
+        self._thread_waiters = 0
+        self._pending_threads = 0
+        self._background_tasks: set[asyncio.Task] = set()
+        self._run_estimates: dict[str, TokenEstimate] = {}
+        self._run_statuses: dict[str, str] = {}
+        self._in_flight: dict[str, asyncio.Future[list[str] | None]] = in_flight if in_flight is not None else {}
 
     async def _connect_client(self):
         self.logger.info(f"Connecting {self.name} to OpenAI client!")
 
         # Any error in connection should count as a breaking stoppage
-        self._client = AsyncOpenAI(api_key=getenv("OPENAI_API_KEY"))
+        self._client = AsyncOpenAI(api_key=self.api_key or getenv("OPENAI_API_KEY"), organization=self.organization)
         self.logger.info(f"Connection of {self.name} complete!")
 
     async def _create_assistant(self):
@@ -86,40 +195,391 @@ class GPTClient:
             )
             self.logger.info(f"Created new assistant with ID: {self._assistant.id}")
 
+    async def _prepare_assistant(self):
+        """Restores or discovers the assistant and the threads batches run on."""
+        if not await self._restore_warm_state():
+            await self._create_assistant()
+            await self._populate_thread_pool()
+            await self._save_warm_state()
+
+    async def _restore_warm_state(self) -> bool:
+        """
+        Reuses the assistant and threads from the last run when the name, model
+        and prompt are unchanged. The assistant and every thread are checked with
+        the API first, the threads concurrently, so one deleted since then is
+        dropped instead of failing the first batch sent to it.
+        """
+        if self.warm_state is None:
+            return False
+
+        state = await self.warm_state.claim(fingerprint(self.name, self.model, self.system_prompt))
+        if state is None:
+            return False
+
+        try:
+            assistant = await self._client.beta.assistants.retrieve(state["assistant_id"])
+        except Exception as e:
+            self.logger.warning(f"Could not reuse assistant {state['assistant_id']} due to {e}")
+            return False
+
+        if assistant.instructions != self.system_prompt or assistant.model != self.model:
+            self.logger.info(f"Assistant {assistant.id} was changed elsewhere, rediscovering")
+            return False
+
+        self._assistant = assistant
+        entries = [
+            entry for entry in state["threads"][:self.pool_size]
+            if entry["completion_count"] < _MAX_THREAD_POOL_TRIES
+        ]
+        threads = await asyncio.gather(
+            *(self._client.beta.threads.retrieve(entry["id"]) for entry in entries), return_exceptions=True
+        )
+        for entry, thread in zip(entries, threads):
+            if isinstance(thread, BaseException):
+                self.logger.warning(f"Could not reuse thread {entry['id']} due to {thread}")
+                continue
+
+            self._thread_queue.put_nowait(ThreadPool(self._next_pool_id, thread, entry["completion_count"]))
+            self._next_pool_id += 1
+            self._thread_count += 1
+
+        self.logger.info(f"Restored assistant {assistant.id} with {self._thread_count:,} threads from warm state")
+        if self._thread_count == 0:
+            await self._populate_thread_pool()
+        return True
+
+    async def _save_warm_state(self):
+        if self.warm_state is None or self._assistant is None:
+            return
+
+        idle = [self._thread_queue.get_nowait() for _ in range(self._thread_queue.qsize())]
+        for pool in idle:
+            self._thread_queue.put_nowait(pool)
+
+        try:
+            await self.warm_state.save(
+                fingerprint(self.name, self.model, self.system_prompt), self._assistant.id, idle
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to save warm state due to {e}")
+
     async def _populate_thread_pool(self):
+        """
+        Creates only the first thread, so batches can start straight away. The
+        rest of the pool is grown concurrently as batches wait for a thread.
+        """
         if self._client is None:
             raise ValueError("Failed to create thread pool! Client is not initialised!")
 
-        for i in range(self.pool_size):
-            await self._create_thread_pool(i, 0)
+        await self._add_thread()
+
+    async def _add_thread(self):
+        index = self._next_pool_id
+        self._next_pool_id += 1
+        self._thread_count += 1
+
+        try:
+            await self._create_thread_pool(index, 0)
+        except Exception:
+            self._thread_count -= 1
+            raise
 
     async def _create_thread_pool(self, index: int, previous_created_at: int = 0):
         self.logger.info(f"{'Re-c' if previous_created_at != 0 else 'C'}Creating thread pool no.{index:,}")
         pool = await ThreadPool.create(self._client, index, previous_created_at)
         await self._thread_queue.put(pool)
 
+    def _grow_on_demand(self):
+        """Starts a thread for every waiting batch not already covered by a free or pending thread."""
+        shortfall = self._thread_waiters - self._thread_queue.qsize() - self._pending_threads
+        for _ in range(min(shortfall, self.pool_size - self._thread_count)):
+            self._pending_threads += 1
+            self._thread_count += 1
+            self._spawn(self._grow_thread_pool(self._next_pool_id))
+            self._next_pool_id += 1
+
+    async def _grow_thread_pool(self, index: int):
+        try:
+            await self._create_thread_pool(index, 0)
+        except Exception as e:
+            self._thread_count -= 1
+            self.logger.error(f"Failed to grow thread pool due to {e}")
+            await asyncio.sleep(_GROW_RETRY_SECS)
+        finally:
+            self._pending_threads -= 1
+
+        self._grow_on_demand()
+
+    def _resize_thread_pool(self, limit: int):
+        """
+        Follows the concurrency limit. Growth happens as batches wait for a
+        thread, shrinking retires surplus threads as they are released.
+        """
+        self.pool_size = limit
+        self._grow_on_demand()
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_done)
+
+    def _on_background_done(self, task: asyncio.Task):
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Background task failed due to {task.exception()}")
+
+    async def close(self):
+        await self._save_warm_state()
+        await self._poller.close()
+        await self.journal.close()
+        for task in list(self._background_tasks):
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
     async def _get_available_thread(self) -> ThreadPool:
-        return await self._thread_queue.get()
+        with _THREAD_WAIT.timer(client=self.name):
+            self._thread_waiters += 1
+            try:
+                self._grow_on_demand()
+                return await self._thread_queue.get()
+            finally:
+                self._thread_waiters -= 1
 
     async def _release_thread(self, thread: ThreadPool):
-        await asyncio.sleep(3) # Ensuring thread is free in API
-        if thread.completion_count >= _MAX_THREAD_POOL_TRIES:
+        if self._thread_count > self.pool_size:
+            self._retire_thread(thread)
+            return
+
+        if thread.completion_count >= _MAX_THREAD_POOL_TRIES or not await self._is_thread_ready(thread):
             await self._refresh_thread(thread)
             return
 
+        thread.active_run_id = None
+        thread.run_status = None
         await self._thread_queue.put(thread)
 
+    async def _is_thread_ready(self, thread: ThreadPool) -> bool:
+        """
+        A thread can take a new message once its last run is terminal. The status
+        fetched while waiting on the run is trusted; only when that is unknown or
+        still active is the run checked again, and cancelled if need be.
+        """
+        if thread.is_idle:
+            return True
+
+        try:
+            run = await self._retrieve_status(thread.thread.id, thread.active_run_id)
+            if run.status in TERMINAL_STATUSES:
+                return True
+
+            self.logger.warning(f"Cancelling run {run.id} still {run.status} on thread pool no.{thread.pool_id:,}")
+            await self._client.beta.threads.runs.cancel(thread_id=thread.thread.id, run_id=run.id)
+            run = await self._poller.wait(thread.thread.id, run.id, _CANCEL_TIMEOUT_SECS)
+            return run is not None and run.status in TERMINAL_STATUSES
+        except Exception as e:
+            self.logger.error(f"Failed to check thread pool no.{thread.pool_id:,} due to {e}")
+            return False
+
     async def _refresh_thread(self, thread: ThreadPool):
         self.logger.info(f"Refreshing thread pool no.{thread.pool_id:,}")
-        await self._create_thread_pool(thread.pool_id, thread.previous_created_at)
+        self._retire_thread(thread)
+
+    def _retire_thread(self, thread: ThreadPool):
+        """Drops the thread from the pool and deletes it server-side in the background."""
+        self.logger.info(f"Retiring thread pool no.{thread.pool_id:,}")
+        self._thread_count -= 1
+        self._spawn(self._delete_thread(thread))
+        self._grow_on_demand()
+
+    async def _delete_thread(self, thread: ThreadPool):
+        try:
+            await self._client.beta.threads.delete(thread_id=thread.thread.id)
+        except Exception as e:
+            self.logger.warning(f"Failed to delete thread pool no.{thread.pool_id:,} due to {e}")
 
-    async def process_batch(self, batch: list[str]) -> dict[str, list[str]] | None:
+    async def process_batch(self, batch: list[str], on_result: ResultCallback | None = None) -> dict[str, list[str]] | None:
+        """
+        Resolves the batch to {sentence: rewrites}. on_result, if given, is called
+        for each sentence as soon as its rewrites are known, which when streaming
+        is while the rest of the batch is still being generated. It may be called
+        for some sentences of a batch that ultimately fails; only the rest are
+        journaled.
+        """
         if not batch:
             return {}
-        async with self.semaphore:
-            return await self._process_batch(batch)
 
-    async def _process_batch(self, batch: list[str]) -> dict[str, list[str]] | None:
+        cached: dict[str, list[str]] = {}
+        if self.cache is not None:
+            cached = await self.cache.get_many(self.model, self.system_prompt, batch)
+            self._deliver(cached, on_result)
+
+        misses = [sentence for sentence in batch if sentence not in cached]
+        if not misses:
+            return cached
+
+        response = await self._coalesce(misses, on_result)
+        if response is None:
+            return cached or None
+        return cached | response
+
+    async def _coalesce(self, batch: list[str], on_result: ResultCallback | None) -> dict[str, list[str]] | None:
+        """
+        Single-flight at sentence granularity. Sentences already in flight for a
+        concurrent batch are awaited rather than sent again; the rest are sent
+        and published, so later batches asking for them wait on this call. The
+        client has one system prompt, so the sentence alone is the key. A
+        sentence that fails resolves to nothing for every waiter, and is
+        journaled once, by the batch that sent it.
+        """
+        joined = {sentence: self._in_flight[sentence] for sentence in batch if sentence in self._in_flight}
+        owned = [sentence for sentence in dict.fromkeys(batch) if sentence not in joined]
+        coalesced: dict[str, list[str]] = {}
+
+        def on_joined(sentence: str, future: asyncio.Future):
+            if not future.cancelled() and future.result() is not None:
+                coalesced[sentence] = future.result()
+                if on_result is not None:
+                    on_result(sentence, future.result())
+
+        for sentence, future in joined.items():
+            future.add_done_callback(lambda done, sentence=sentence: on_joined(sentence, done))
+        if joined:
+            _COALESCED.inc(len(joined), client=self.name)
+
+        for sentence in owned:
+            self._in_flight[sentence] = asyncio.get_running_loop().create_future()
+
+        response = None
+        try:
+            if owned:
+                response = await self._resolve(owned, on_result=on_result)
+                if response and self.cache is not None:
+                    await self.cache.put_many(self.model, self.system_prompt, response)
+        finally:
+            for sentence in owned:
+                future = self._in_flight.pop(sentence)
+                if not future.done():
+                    future.set_result((response or {}).get(sentence))
+
+        await asyncio.gather(*(asyncio.shield(future) for future in joined.values()), return_exceptions=True)
+        if response is None and not coalesced:
+            return None
+        return (response or {}) | coalesced
+
+    async def _resolve(self, batch: list[str], depth: int = 0,
+                       on_result: ResultCallback | None = None) -> dict[str, list[str]] | None:
+        """
+        Dispatches the batch, then re-submits any sentences the response could not
+        be aligned to, bisecting them until each failure is isolated. Batches that
+        fail outright are not retried here; they are journaled for replay.
+        """
+        response = await self._dispatch(batch, on_result)
+        if response is None:
+            return None
+
+        unresolved = [sentence for sentence in batch if sentence not in response]
+        if not unresolved:
+            return response
+
+        if len(batch) == 1 or depth >= _MAX_BISECT_DEPTH:
+            await self._log_failed_batch(
+                "unresolved", "\n".join(unresolved), "No response group aligned to sentences", None
+            )
+            return response or None
+
+        self.logger.info(f"Salvaged {len(response):,}/{len(batch):,} sentences, re-submitting {len(unresolved):,}")
+        middle = (len(unresolved) + 1) // 2
+        halves = [half for half in (unresolved[:middle], unresolved[middle:]) if half]
+        for result in await asyncio.gather(*(self._resolve(half, depth + 1, on_result) for half in halves)):
+            if result:
+                response |= result
+
+        return response or None
+
+    def estimate_usage(self, batch: list[str]) -> TokenEstimate:
+        return self.rate_limiter.estimate(self.system_prompt, batch)
+
+    def estimate_sentence_tokens(self, sentence: str) -> int:
+        return self.rate_limiter.estimate_sentence(sentence)
+
+    @property
+    def capacity(self) -> int:
+        """Most batches worth keeping in flight, so the concurrency limit is free to grow to its ceiling."""
+        return self.limiter.maximum
+
+    async def _dispatch(self, batch: list[str], on_result: ResultCallback | None = None) -> dict[str, list[str]] | None:
+        if not self.breaker.allow():
+            _BATCHES.inc(client=self.name, outcome="rejected")
+            await self._log_failed_batch("circuit_open", "\n".join(batch), "Circuit open", None)
+            return None
+
+        estimate = self.rate_limiter.estimate(self.system_prompt, batch)
+        await self.rate_limiter.acquire(estimate)
+
+        async with self.limiter:
+            response = await self._hedge(batch, estimate, on_result)
+
+        self.breaker.record(bool(response))
+        return response
+
+    async def _hedge(self, batch: list[str], estimate: TokenEstimate,
+                     on_result: ResultCallback | None) -> dict[str, list[str]] | None:
+        """
+        Processes the batch, duplicating it on another thread once it outlives
+        the hedge policy's latency percentile. The first attempt to succeed wins;
+        the other is cancelled in the background, which cancels its run when its
+        thread is released. The duplicate shares the batch's concurrency slot but
+        is rate limited in its own right.
+        """
+        delivered: set[str] = set()
+
+        def deliver_once(sentence: str, rewrites: list[str]):
+            if sentence not in delivered:
+                delivered.add(sentence)
+                on_result(sentence, rewrites)
+
+        callback = deliver_once if on_result is not None else None
+        start_time = time.monotonic()
+        attempts = [asyncio.create_task(self._process_batch(batch, estimate, callback))]
+        delay = self.hedging.delay() if self.hedging is not None else None
+
+        try:
+            done, pending = await asyncio.wait(attempts, timeout=delay)
+            if not done and self.hedging.try_hedge():
+                self.logger.info(f"Hedging a batch of {len(batch):,} still running after {delay:.1f}s")
+                await self.rate_limiter.acquire(estimate)
+                attempts.append(asyncio.create_task(self._process_batch(batch, estimate, callback)))
+
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.result() is not None), None)
+                if winner is None:
+                    continue
+
+                if self.hedging is not None:
+                    self.hedging.observe(time.monotonic() - start_time)
+                if len(attempts) > 1:
+                    _HEDGES.inc(client=self.name, winner="hedge" if winner is attempts[1] else "original")
+                return winner.result()
+
+            return None
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._on_background_done)
+
+    @staticmethod
+    def _deliver(response: dict[str, list[str]] | None, on_result: ResultCallback | None):
+        if not response or on_result is None:
+            return
+        for sentence, rewrites in response.items():
+            on_result(sentence, rewrites)
+
+    async def _process_batch(self, batch: list[str], estimate: TokenEstimate | None = None,
+                             on_result: ResultCallback | None = None) -> dict[str, list[str]] | None:
         if self._client is None:
             raise RuntimeError("Client not initialised!")
         if self._assistant is None:
@@ -128,27 +588,97 @@ class GPTClient:
         prompt: str = "\n".join(batch)
         thread_pool: ThreadPool = await self._get_available_thread()
         run_created_at = None
+        run_id = None
+        start_time = time.monotonic()
 
         try:
             thread: Thread = thread_pool.thread
-            await self._create_message(thread, prompt)
-            run: Run = await self._create_run(thread)
-            run_created_at = run.created_at
-
-            response: dict[str, list[str]] = await self._retrieve_run(thread, run, prompt)
-            if response:
-                self.completed += 1
-
-            return response
+            with _API_LATENCY.timer(client=self.name, call="message_create"):
+                await self._create_message(thread, self._format_message(batch))
+            succeeded = True
+            if self.stream:
+                run, response = await self._stream_run(thread_pool, batch, estimate, on_result)
+                run_created_at = run.created_at if run is not None else None
+                run_id = run.id if run is not None else None
+                succeeded = run is not None and run.status == "completed"  # Not just groups kept from a failed run
+            else:
+                with _API_LATENCY.timer(client=self.name, call="run_create"):
+                    run: Run = await self._create_run(thread)
+                run_created_at = run.created_at
+                run_id = run.id
+                thread_pool.active_run_id = run_id
+                if estimate is not None:
+                    self._run_estimates[run_id] = estimate
+
+                response = await self._retrieve_run(thread, run, prompt)
+                self._deliver(response, on_result)
+
+            return self._record_outcome(response, start_time, succeeded)
         except Exception as e:
+            self._record_error(e)
+            if isinstance(e, NotFoundError):
+                thread_pool.completion_count = _MAX_THREAD_POOL_TRIES  # Thread is gone, replace it
             self.logger.critical(f"FAILED TO START RUN DUE TO {e}")
             return None
         finally:
+            run_id = run_id or thread_pool.active_run_id  # A stream can break after its run was created
+            self._run_estimates.pop(run_id, None)
+            thread_pool.run_status = self._run_statuses.pop(run_id, None)
             thread_pool.completion_count += 1
             if run_created_at is not None:
                 thread_pool.previous_created_at = run_created_at
             await self._release_thread(thread_pool)
 
+    def _record_outcome(self, response: dict[str, list[str]] | None, start_time: float,
+                        succeeded: bool = True) -> dict[str, list[str]] | None:
+        """Counts a batch that reached the API, returning its response."""
+        if response and succeeded:
+            self.completed += 1
+            self.limiter.on_success(time.monotonic() - start_time)
+        _BATCHES.inc(
+            client=self.name,
+            outcome="failed" if response is None or not succeeded else "completed" if response else "unaligned",
+        )
+        return response
+
+    def _record_error(self, error: Exception):
+        _BATCHES.inc(client=self.name, outcome="error")
+        self._observe_error(error)
+
+    def _observe_error(self, error: Exception):
+        if isinstance(error, RateLimitError):
+            self.limiter.on_throttle()
+        elif isinstance(error, APIStatusError) and error.status_code >= 500:
+            self.limiter.on_error(f"HTTP {error.status_code}")
+
+    def _observe_run_status(self, run: Run):
+        last_error = getattr(run, "last_error", None)
+        if last_error is None:
+            return
+
+        if last_error.code == "rate_limit_exceeded":
+            self.limiter.on_throttle()
+        elif last_error.code == "server_error":
+            self.limiter.on_error("run server error")
+
+    def _on_run_resolved(self, status: str, polls: int, elapsed: float):
+        _RUN_COMPLETION.observe(elapsed, client=self.name, status=status)
+        _RUN_POLLS.observe(polls, client=self.name)
+
+    def _record_usage(self, run: Run):
+        usage = getattr(run, "usage", None)
+        estimate = self._run_estimates.pop(run.id, None)
+        if usage is None:
+            return
+
+        _RUN_TOKENS.observe(usage.prompt_tokens, client=self.name, kind="prompt")
+        _RUN_TOKENS.observe(usage.completion_tokens, client=self.name, kind="completion")
+        USAGE.record(self.model, usage.prompt_tokens, usage.completion_tokens)
+        if estimate is None:
+            return
+
+        self.rate_limiter.reconcile(estimate, usage.prompt_tokens, usage.completion_tokens)
+
     async def _create_message(self, thread: Thread, message: str) -> Message:
         return await self._client.beta.threads.messages.create(
             thread_id=thread.id,
@@ -156,12 +686,102 @@ class GPTClient:
             content=message
         )
 
-    async def _create_run(self, thread: Thread) -> Run:
+    def _format_message(self, batch: list[str]) -> str:
+        if self.response_format is ResponseFormat.JSON:
+            return format_indexed_prompt(batch)
+        return "\n".join(batch)
+
+    async def _create_run(self, thread: Thread, stream: bool = False) -> Run | AsyncStream[AssistantStreamEvent]:
+        options = {}
+        if self.response_format is ResponseFormat.JSON:
+            options["response_format"] = RESPONSE_FORMAT
+        if stream:
+            options["stream"] = True
+
         return await self._client.beta.threads.runs.create(
             thread_id=thread.id,
             assistant_id=self._assistant.id,
+            **options,
         )
 
+    async def _stream_run(self, thread_pool: ThreadPool, batch: list[str], estimate: TokenEstimate | None,
+                          on_result: ResultCallback | None) -> tuple[Run | None, dict[str, list[str]] | None]:
+        """
+        Creates the run as an event stream instead of polling it, parsing rewrite
+        groups out of the message deltas as they arrive.
+
+        In text mode a group is handed to on_result as soon as the next one
+        starts, provided it is clearly a rewrite of the sentence in its position
+        and not of any other sentence in the batch. Everything else is settled
+        from the full message once the run completes, as a polled run would be.
+        An early delivery is final: the alignment only settles the sentences not
+        yet handed over, so the result always matches what on_result was given.
+        """
+        thread = thread_pool.thread
+        parser = ListResponseParser() if self.response_format is ResponseFormat.TEXT else None
+        delivered: dict[str, list[str]] = {}
+        pieces: list[str] = []
+        run: Run | None = None
+        groups = 0
+        start_time = time.monotonic()
+
+        def deliver(group: list[str]):
+            nonlocal groups
+            rivals = [sentence for i, sentence in enumerate(batch) if i != groups]
+            if groups < len(batch) and group and is_rewrite_of(batch[groups], group, rivals=rivals):
+                if not delivered:
+                    _FIRST_RESULT.observe(time.monotonic() - start_time, client=self.name)
+                delivered[batch[groups]] = group
+                if on_result is not None:
+                    on_result(batch[groups], group)
+            groups += 1
+
+        async def fail(run_id: str, reason: str) -> tuple[Run | None, dict[str, list[str]] | None]:
+            # Groups already handed over are kept; the caller re-submits the rest like any partial response
+            if delivered:
+                return run, dict(delivered)
+            await self._log_failed_batch(run_id, "\n".join(batch), reason, None)
+            return run, None
+
+        try:
+            async with asyncio.timeout(_TIMEOUT_SECS):
+                with _API_LATENCY.timer(client=self.name, call="run_create"):
+                    events = await self._create_run(thread, stream=True)
+
+                async for event in events:
+                    if event.event in _RUN_EVENTS_WITH_STATUS:
+                        run = event.data
+                        if event.event == "thread.run.created":
+                            thread_pool.active_run_id = run.id
+                            if estimate is not None:
+                                self._run_estimates[run.id] = estimate
+                    elif event.event == "thread.message.delta":
+                        text = "".join(
+                            part.text.value for part in event.data.delta.content or []
+                            if part.type == "text" and part.text is not None and part.text.value
+                        )
+                        pieces.append(text)
+                        for group in parser.feed(text) if parser is not None else []:
+                            deliver(group)
+        except TimeoutError:
+            self.logger.error(f"Run {run.id if run else 'stream'} timed out.")
+            self.limiter.on_error("run timed out")
+            return await fail(run.id if run else "stream", "Run timed out")
+
+        if run is None:
+            return await fail("stream", "Stream ended before the run was created")
+
+        if not await self._check_run(run, None if delivered else "\n".join(batch)):
+            return run, dict(delivered) or None
+
+        content = "".join(pieces)
+        if not content:
+            return await fail(run.id, "No assistant message found")
+
+        response = self._parse_response(batch, content) | delivered
+        self._deliver({sentence: rewrites for sentence, rewrites in response.items() if sentence not in delivered}, on_result)
+        return run, response
+
     async def _retrieve_run(self, thread: Thread, run: Run, message: str) -> dict[str, list[str]] | None:
         status = await self._get_response(thread, run, message)
         if not status:
@@ -171,42 +791,73 @@ class GPTClient:
         if not response:
             return None
 
+        return self._parse_response(message.split("\n"), response)
+
+    def _parse_response(self, sentences: list[str], response: str) -> dict[str, list[str]]:
+        if self.response_format is ResponseFormat.JSON:
+            return self._map_indexed_response(sentences, response)
+
         formatted_responses = parse_list_response(response)
 
-        if len(formatted_responses) != len(message.split("\n")):
-            self.logger.error("Mismatch between number of prompts and response groups.")
-            return None
+        if len(formatted_responses) == len(sentences):
+            return dict(zip(sentences, formatted_responses))
+
+        self.logger.error("Mismatch between number of prompts and response groups.")
+        if len(sentences) == 1:
+            # Every rewrite belongs to the only sentence, however it was grouped
+            return {sentences[0]: [rewrite for group in formatted_responses for rewrite in group]}
 
-        return dict(zip(message.split("\n"), formatted_responses))
+        aligned = align_groups(sentences, formatted_responses)
+        return {sentences[row]: formatted_responses[column] for row, column in aligned.items()}
+
+    def _map_indexed_response(self, sentences: list[str], response: str) -> dict[str, list[str]]:
+        """Each rewrite set maps straight to its sentence; missing indexes are left unresolved."""
+        try:
+            indexed = parse_indexed_response(response, len(sentences))
+        except ValueError as e:
+            self.logger.error(f"Invalid structured response: {e}")
+            return {}
+
+        if len(indexed) < len(sentences):
+            self.logger.error(f"Structured response covered {len(indexed):,}/{len(sentences):,} sentences.")
+        return {sentences[index]: rewrites for index, rewrites in indexed.items()}
 
     async def _get_response(self, thread: Thread, run: Run, prompt: str) -> bool:
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > _TIMEOUT_SECS:
-                self.logger.error(f"Run {run.id} timed out.")
-                await self._log_failed_batch(run.id, prompt, "Run timed out", None)
-                return False
-
-            status = await self._client.beta.threads.runs.retrieve(
-                thread_id=thread.id,
-                run_id=run.id,
-            )
+        status = await self._poller.wait(thread.id, run.id, _TIMEOUT_SECS)
 
-            if status.status not in ("queued", "in_progress"):
-                break
-            await asyncio.sleep(1)
+        if status is None:
+            self.logger.error(f"Run {run.id} timed out.")
+            self.limiter.on_error("run timed out")
+            await self._log_failed_batch(run.id, prompt, "Run timed out", None)
+            return False
 
-        if status.status != "completed":
-            self.logger.error(f"Run {run.id} failed with status: {status.status}")
-            await self._log_failed_batch(
-                run.id, prompt, f"Response status was {status.status}, not completed", status.status
-            )
+        return await self._check_run(status, prompt)
+
+    async def _check_run(self, run: Run, prompt: str | None) -> bool:
+        """Records a terminal run's status and usage, journaling the prompt, if given, unless it completed."""
+        self._run_statuses[run.id] = run.status
+        self._record_usage(run)
+
+        if run.status != "completed":
+            self._observe_run_status(run)
+            self.logger.error(f"Run {run.id} failed with status: {run.status}")
+            if prompt is not None:
+                await self._log_failed_batch(
+                    run.id, prompt, f"Response status was {run.status}, not completed", run.status
+                )
             return False
         else:
             return True
 
+    async def _retrieve_status(self, thread_id: str, run_id: str) -> Run:
+        return await self._client.beta.threads.runs.retrieve(
+            thread_id=thread_id,
+            run_id=run_id,
+        )
+
     async def _get_message_response(self, thread: Thread, run: Run, original_message: str) -> str | None:
-        messages = await self._client.beta.threads.messages.list(thread_id=thread.id)
+        with _API_LATENCY.timer(client=self.name, call="message_list"):
+            messages = await self._client.beta.threads.messages.list(thread_id=thread.id)
         assistant_message = next(
             (m for m in messages.data if m.role == "assistant" and m.created_at >= run.created_at),
             None
@@ -223,33 +874,20 @@ class GPTClient:
 
     async def _log_failed_batch(self, run_id: str, batch: str, reason: str, raw_response: str | None):
         self.failed += 1
+        _FAILURES.inc(client=self.name, reason=reason)
         self.logger.error(
             f"Preparing to log failed batch request"
             f"\n\tID: {run_id}\n\tBatch: {batch}"
             f"\n\tReason: {reason}\n\tRaw Response`: {raw_response}"
         )
-        log = {
+        self.journal.record({
+            "client": self.name,
             "run_id": run_id,
             "message": batch,
             "reason": reason,
             "raw_response": raw_response,
-        }
+        })
 
-        try:
-            async with self.lock:
-                async with aiofiles.open(_ERROR_PATH, mode="r+", encoding="utf-8") as f:
-                    await f.seek(0)
-                    content = await f.read()
-                    data = json.loads(content) if content.strip() else {}
-
-                    data[run_id] = log
-
-                    await f.seek(0)
-                    await f.write(json.dumps(data, indent=4))
-                    await f.truncate()
-        except FileNotFoundError:
-            # If the log file doesn't exist yet, create it
-            async with aiofiles.open(_ERROR_PATH, mode="w", encoding="utf-8") as f:
-                await f.write(json.dumps({run_id: log}, indent=4))
-        except Exception as e:
-            self.logger.error(f"Failed to log failed batch due to:\n{e}")
+    async def replay_failed(self, batch_size: int = _REPLAY_BATCH_SIZE) -> dict[str, list[str]]:
+        """Re-sends every sentence journaled as failed by this client, see FailureJournal.replay_failed."""
+        return await replay_failed(self.journal, {self.name}, self.process_batch, batch_size, self.logger)
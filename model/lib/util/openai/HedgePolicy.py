@@ -0,0 +1,50 @@
+from .SlidingWindow import SlidingWindow
+
+_HISTORY_SIZE = 512
+_MIN_SAMPLES = 20  # no hedging until the percentile means something
+_MAX_HEDGE_RATIO = 0.1  # hedges per completed batch, so hedging adds at most ~10% load
+
+
+class HedgePolicy:
+    """
+    Decides when a slow batch is duplicated.
+
+    A batch is hedged once it has been running longer than the given
+    percentile of recent batch latencies, and only while hedges stay under
+    max_ratio of completed batches, so a general slowdown cannot double the
+    load on an upstream that is already struggling.
+    """
+
+    def __init__(
+            self,
+            percentile: float = 0.95,
+            min_samples: int = _MIN_SAMPLES,
+            max_ratio: float = _MAX_HEDGE_RATIO,
+    ):
+        if not 0 < percentile < 1:
+            raise ValueError("Percentile must be between 0 and 1.")
+
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self.completed = 0
+        self.hedges = 0
+
+        self._latencies = SlidingWindow(_HISTORY_SIZE)
+
+    def observe(self, latency: float):
+        self.completed += 1
+        self._latencies.add(latency)
+
+    def delay(self) -> float | None:
+        """Seconds after which a batch should be hedged, or None while there is too little history."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        return self._latencies.percentile(self.percentile)
+
+    def try_hedge(self) -> bool:
+        if self.hedges + 1 > self.completed * self.max_ratio:
+            return False
+
+        self.hedges += 1
+        return True
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+_CHARS_PER_TOKEN = 4  # rough average for English text
+_INITIAL_COMPLETION_RATIO = 3.0  # completion tokens per input sentence token, ~3 rewrites each
+_ESTIMATE_ALPHA = 0.2  # EWMA weight of observed usage on the estimate corrections
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / _CHARS_PER_TOKEN))
+
+
+def estimate_sentence_tokens(sentence: str, prompt_scale: float = 1.0,
+                             completion_ratio: float = _INITIAL_COMPLETION_RATIO) -> int:
+    """Prompt and completion tokens one sentence adds to a batch, excluding the system prompt."""
+    return math.ceil(estimate_tokens(sentence) * (prompt_scale + completion_ratio))
+
+
+@dataclass
+class TokenEstimate:
+    prompt_tokens: int
+    completion_tokens: int
+    raw_prompt_tokens: int = 0  # heuristic counts before correction
+    content_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.refill_rate = per_minute / 60
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, amount: float) -> float:
+        shortfall = min(amount, self.capacity) - self.available
+        return max(0.0, shortfall / self.refill_rate)
+
+    def consume(self, amount: float):
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Refunds (positive) or charges (negative) tokens after the fact; may leave the bucket in debt."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Admits batches against both the request-per-minute and token-per-minute
+    budgets. Token costs are estimated up front and corrected with the usage
+    reported by completed runs.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger("Athena | Rate Limiter")
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+        self._prompt_scale = 1.0
+        self._completion_ratio = _INITIAL_COMPLETION_RATIO
+        self._lock = asyncio.Lock()
+
+    def estimate(self, system_prompt: str, batch: list[str]) -> TokenEstimate:
+        content_tokens = estimate_tokens("\n".join(batch))
+        raw_prompt_tokens = estimate_tokens(system_prompt) + content_tokens
+        return TokenEstimate(
+            prompt_tokens=math.ceil(raw_prompt_tokens * self._prompt_scale),
+            completion_tokens=math.ceil(content_tokens * self._completion_ratio),
+            raw_prompt_tokens=raw_prompt_tokens,
+            content_tokens=content_tokens,
+        )
+
+    def estimate_sentence(self, sentence: str) -> int:
+        return estimate_sentence_tokens(sentence, self._prompt_scale, self._completion_ratio)
+
+    async def acquire(self, estimate: TokenEstimate):
+        # Admission is FIFO so large batches are not starved by small ones
+        async with self._lock:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimate.total_tokens))
+                if wait <= 0:
+                    break
+
+                self.logger.debug(f"Rate limited, waiting {wait:.2f}s for {estimate.total_tokens:,} tokens")
+                await asyncio.sleep(wait)
+
+            self.requests.consume(1)
+            self.tokens.consume(estimate.total_tokens)
+
+    def reconcile(self, estimate: TokenEstimate, prompt_tokens: int, completion_tokens: int):
+        self.tokens.adjust(estimate.total_tokens - (prompt_tokens + completion_tokens))
+
+        if estimate.raw_prompt_tokens and estimate.content_tokens:
+            observed_scale = prompt_tokens / estimate.raw_prompt_tokens
+            observed_ratio = completion_tokens / estimate.content_tokens
+            self._prompt_scale += _ESTIMATE_ALPHA * (observed_scale - self._prompt_scale)
+            self._completion_ratio += _ESTIMATE_ALPHA * (observed_ratio - self._completion_ratio)
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import aiofiles
+
+_CACHE_DIR = "./cache/responses/"
+_MAX_BYTES = 512 * 1024 * 1024  # 512 MiB
+_EVICT_TO = 0.9  # fraction of max_bytes kept after an eviction pass
+
+
+def cache_key(model: str, system_prompt: str, sentence: str) -> str:
+    return hashlib.sha256(json.dumps([model, system_prompt, sentence]).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of parsed rewrites.
+
+    Entries are stored per sentence, keyed on the model, system prompt and
+    sentence text, so a chunk hits whenever its sentences were seen before in
+    any chunk. Least recently used entries are evicted past max_bytes.
+    """
+
+    def __init__(self, directory: str = _CACHE_DIR, max_bytes: int = _MAX_BYTES, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger("Athena | Response Cache")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._index: OrderedDict[str, int] | None = None  # key -> size, least recently used first
+        self._size = 0
+
+    async def get_many(self, model: str, system_prompt: str, sentences: list[str]) -> dict[str, list[str]]:
+        self._load_index()
+        found = {}
+
+        for sentence in sentences:
+            key = cache_key(model, system_prompt, sentence)
+            if key not in self._index:
+                self.misses += 1
+                continue
+
+            try:
+                async with aiofiles.open(self._path(key), mode="r", encoding="utf-8") as f:
+                    entry = json.loads(await f.read())
+                await asyncio.to_thread(os.utime, self._path(key))  # Keeps recency across restarts
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self._forget(key)
+                self.misses += 1
+                continue
+
+            self._index.move_to_end(key)
+            found[sentence] = entry["rewrites"]
+            self.hits += 1
+
+        return found
+
+    async def put_many(self, model: str, system_prompt: str, results: dict[str, list[str]]):
+        self._load_index()
+
+        for sentence, rewrites in results.items():
+            key = cache_key(model, system_prompt, sentence)
+            content = json.dumps({"sentence": sentence, "rewrites": rewrites})
+            path = self._path(key)
+            os.makedirs(path.parent, exist_ok=True)
+
+            async with aiofiles.open(path, mode="w", encoding="utf-8") as f:
+                await f.write(content)
+
+            self._forget(key)
+            self._index[key] = len(content.encode("utf-8"))
+            self._size += self._index[key]
+
+        if self._size > self.max_bytes:
+            self._evict()
+
+    @property
+    def size(self) -> int:
+        self._load_index()
+        return self._size
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+
+        entries = []
+        if self.directory.exists():
+            for path in self.directory.glob("*/*.json"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+
+        self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._size = sum(self._index.values())
+        self.logger.info(f"Loaded {len(self._index):,} cached responses ({self._size:,} bytes)")
+
+    def _forget(self, key: str):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self):
+        target = self.max_bytes * _EVICT_TO
+        evicted = 0
+
+        while self._index and self._size > target:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            evicted += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+        self.logger.info(f"Evicted {evicted:,} cached responses, {self._size:,} bytes remain")
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from openai.types.beta.threads import Run
+
+from .SlidingWindow import SlidingWindow
+
+ACTIVE_STATUSES = ("queued", "in_progress", "cancelling")
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+_MIN_INTERVAL = 0.5  # secs between polls of a single run
+_MAX_INTERVAL = 15
+_BACKOFF = 1.5  # growth factor once a run outlives every observed completion
+_EARLY_QUANTILE = 0.25  # aim the next poll at the lower quartile of remaining completions
+_HISTORY_SIZE = 512
+
+
+@dataclass
+class _PendingRun:
+    thread_id: str
+    run_id: str
+    future: asyncio.Future
+    started_at: float
+    next_poll: float
+    polls: int = 0
+
+
+class RunPoller:
+    """
+    Single background task that polls every outstanding run.
+
+    Each run is polled on its own schedule, derived from the distribution of
+    completion times seen so far, and the awaiting coroutine is woken through a
+    future once the run leaves an active status.
+    """
+
+    def __init__(
+            self,
+            retrieve: Callable[[str, str], Awaitable[Run]],
+            logger: logging.Logger | None = None,
+            on_resolved: Callable[[str, int, float], None] | None = None,
+    ):
+        """
+        on_resolved, if given, is called with the final status (or "timeout"), the
+        number of polls and the seconds waited for every run that stops being tracked.
+        """
+        self.logger = logger or logging.getLogger("Athena | Run Poller")
+        self.polls = 0
+
+        self._retrieve = retrieve
+        self._on_resolved = on_resolved
+        self._pending: dict[str, _PendingRun] = {}
+        self._durations = SlidingWindow(_HISTORY_SIZE)
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def wait(self, thread_id: str, run_id: str, timeout: float) -> Run | None:
+        """
+        Waits for the run to reach a terminal status, returning the final run
+        or None if it did not finish within timeout seconds.
+        """
+        now = time.monotonic()
+        pending = _PendingRun(
+            thread_id=thread_id,
+            run_id=run_id,
+            future=asyncio.get_running_loop().create_future(),
+            started_at=now,
+            next_poll=now + self._next_delay(0),
+        )
+        self._pending[run_id] = pending
+        self._ensure_running()
+        self._wake.set()
+
+        try:
+            run = await asyncio.wait_for(pending.future, timeout)
+        except asyncio.TimeoutError:
+            run = None
+        finally:
+            self._pending.pop(run_id, None)
+
+        if self._on_resolved is not None:
+            self._on_resolved(run.status if run else "timeout", pending.polls, time.monotonic() - pending.started_at)
+        return run
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        while self._pending:
+            self._wake.clear()
+            now = time.monotonic()
+            due = [p for p in self._pending.values() if p.next_poll <= now]
+
+            if not due:
+                next_poll = min(p.next_poll for p in self._pending.values())
+                try:
+                    await asyncio.wait_for(self._wake.wait(), next_poll - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await asyncio.gather(*(self._poll(p) for p in due))
+
+    async def _poll(self, pending: _PendingRun):
+        try:
+            run = await self._retrieve(pending.thread_id, pending.run_id)
+        except Exception as e:
+            self.logger.warning(f"Failed to poll run {pending.run_id}: {e}")
+            run = None
+
+        self.polls += 1
+        pending.polls += 1
+        elapsed = time.monotonic() - pending.started_at
+
+        if run is None or run.status in ACTIVE_STATUSES:
+            pending.next_poll = time.monotonic() + self._next_delay(elapsed)
+            return
+
+        self._record(elapsed)
+        if not pending.future.done():
+            pending.future.set_result(run)
+
+    def _record(self, duration: float):
+        self._durations.add(duration)
+
+    def _next_delay(self, elapsed: float) -> float:
+        remaining = self._durations.percentile(_EARLY_QUANTILE, above=elapsed)
+
+        if remaining is not None:
+            delay = remaining - elapsed
+        else:
+            delay = elapsed * (_BACKOFF - 1)
+
+        return min(_MAX_INTERVAL, max(_MIN_INTERVAL, delay))
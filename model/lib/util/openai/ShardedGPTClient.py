@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from .FailureJournal import FailureJournal, replay_failed
+from .GPTClient import (
+    GPTClient, ResultCallback, _REQUESTS_PER_MINUTE, _TOKENS_PER_MINUTE, _REPLAY_BATCH_SIZE, _HEDGE_PERCENTILE,
+)
+from .RateLimiter import TokenEstimate
+from .ResponseCache import ResponseCache
+from .StructuredResponse import ResponseFormat
+from .WarmState import WarmState
+
+_DRAIN_SECS = 30  # a shard is skipped this long after its last rate limit
+_KEY_SEPARATOR = ","
+_ORGANIZATION_SEPARATOR = "@"
+
+
+@dataclass
+class ShardCredentials:
+    api_key: str
+    organization: str | None = None
+
+    @classmethod
+    def parse_many(cls, value: str) -> list["ShardCredentials"]:
+        """Parses "key[@organization],key[@organization],..." as found in OPENAI_API_KEYS."""
+        credentials = []
+        for entry in filter(None, map(str.strip, value.split(_KEY_SEPARATOR))):
+            api_key, _, organization = entry.partition(_ORGANIZATION_SEPARATOR)
+            credentials.append(cls(api_key, organization or None))
+        return credentials
+
+
+class ShardedGPTClient:
+    """
+    Spreads batches over one GPTClient per API key, each with its own assistant,
+    thread pool and limiters.
+
+    Every batch goes to the healthy shard with the least outstanding work for
+    its concurrency limit. A shard that was rate limited within _DRAIN_SECS is
+    drained: it finishes what it has but gets nothing new while another shard
+    is healthy. Shards share one in-flight map, so a sentence already being
+    resolved on any shard is awaited rather than sent again on another.
+    """
+
+    @classmethod
+    async def create(
+            cls,
+            name: str,
+            model: str,
+            system_prompt: str,
+            credentials: list[ShardCredentials],
+            pool_size: int = 25,
+            requests_per_minute: int = _REQUESTS_PER_MINUTE,
+            tokens_per_minute: int = _TOKENS_PER_MINUTE,
+            cache: ResponseCache | None = None,
+            warm_state: bool = False,
+            response_format: ResponseFormat = ResponseFormat.TEXT,
+            stream: bool = False,
+            hedge_percentile: float | None = _HEDGE_PERCENTILE,
+            client_cls: type[GPTClient] = GPTClient,
+    ):
+        if not credentials:
+            raise ValueError("At least one set of shard credentials is required.")
+
+        self = cls(name)
+        shard_names = [f"{name}-shard{i}" for i in range(len(credentials))]
+        results = await asyncio.gather(*(
+            client_cls.create(
+                shard_name, model, system_prompt, pool_size, requests_per_minute, tokens_per_minute, cache,
+                WarmState(shard_name) if warm_state else None, shard.api_key, shard.organization,
+                response_format, stream, hedge_percentile, self.journal, self._in_flight,
+            )
+            for shard_name, shard in zip(shard_names, credentials)
+        ), return_exceptions=True)
+
+        for shard_name, result in zip(shard_names, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Failed to create {shard_name} due to {result}")
+                continue
+
+            self.shards.append(result)
+
+        if not self.shards:
+            raise RuntimeError(f"Failed to create any of the {len(credentials):,} shards for {name}")
+
+        self.logger.info(f"Created {len(self.shards):,}/{len(credentials):,} shards")
+        return self
+
+    def __init__(self, name: str, shards: list[GPTClient] | None = None):
+        self.logger = logging.getLogger(f"GPT CLIENT -  {name}")
+        self.name = name
+        self.shards: list[GPTClient] = shards or []
+        self.journal = FailureJournal(logger=self.logger)
+
+        self._outstanding: dict[str, int] = {}
+        self._draining: set[str] = set()
+        self._in_flight: dict[str, asyncio.Future[list[str] | None]] = {}
+
+    @property
+    def completed(self) -> int:
+        return sum(shard.completed for shard in self.shards)
+
+    @property
+    def failed(self) -> int:
+        return sum(shard.failed for shard in self.shards)
+
+    @property
+    def model(self) -> str:
+        return self.shards[0].model
+
+    @property
+    def capacity(self) -> int:
+        return sum(shard.capacity for shard in self.shards)
+
+    def estimate_usage(self, batch: list[str]) -> TokenEstimate:
+        return self._route().estimate_usage(batch)
+
+    def estimate_sentence_tokens(self, sentence: str) -> int:
+        return self.shards[0].estimate_sentence_tokens(sentence)
+
+    async def process_batch(self, batch: list[str], on_result: ResultCallback | None = None) -> dict[str, list[str]] | None:
+        shard = self._route()
+        self._outstanding[shard.name] = self._outstanding.get(shard.name, 0) + 1
+        try:
+            return await shard.process_batch(batch, on_result)
+        finally:
+            self._outstanding[shard.name] -= 1
+
+    def _route(self) -> GPTClient:
+        healthy = [shard for shard in self.shards if not self._is_draining(shard)]
+        return min(healthy or self.shards, key=self._load)
+
+    def _load(self, shard: GPTClient) -> float:
+        return self._outstanding.get(shard.name, 0) / shard.limiter.limit
+
+    def _is_draining(self, shard: GPTClient) -> bool:
+        draining = time.monotonic() - shard.limiter.last_throttle < _DRAIN_SECS
+        if draining and shard.name not in self._draining:
+            self.logger.warning(f"Draining {shard.name} after a rate limit")
+            self._draining.add(shard.name)
+        elif not draining and shard.name in self._draining:
+            self.logger.info(f"{shard.name} is healthy again")
+            self._draining.discard(shard.name)
+        return draining
+
+    async def close(self):
+        await asyncio.gather(*(shard.close() for shard in self.shards))
+        await self.journal.close()
+
+    async def replay_failed(self, batch_size: int = _REPLAY_BATCH_SIZE) -> dict[str, list[str]]:
+        """Re-sends every sentence journaled as failed by any shard, routed afresh."""
+        shards = {shard.name for shard in self.shards}
+        return await replay_failed(self.journal, shards, self.process_batch, batch_size, self.logger)
@@ -0,0 +1,37 @@
+from bisect import bisect_right, insort
+from collections import deque
+
+
+class SlidingWindow:
+    """
+    The most recent size samples, kept in arrival order and in sorted order,
+    so percentiles of recent history can be read without sorting.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+
+        self._samples: deque[float] = deque()
+        self._sorted: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def add(self, sample: float):
+        self._samples.append(sample)
+        insort(self._sorted, sample)
+
+        if len(self._samples) > self.size:
+            oldest = self._samples.popleft()
+            del self._sorted[bisect_right(self._sorted, oldest) - 1]
+
+    def percentile(self, percentile: float, above: float | None = None) -> float | None:
+        """
+        The given percentile of the window, or of only the samples greater than
+        above, if given. None when there are no such samples.
+        """
+        start = 0 if above is None else bisect_right(self._sorted, above)
+        count = len(self._sorted) - start
+        if count <= 0:
+            return None
+        return self._sorted[start + int(count * percentile)]
@@ -0,0 +1,65 @@
+import json
+from enum import Enum
+
+
+class ResponseFormat(Enum):
+    TEXT = 0  # rewrite groups separated by blank lines
+    JSON = 1  # rewrites keyed by sentence index, enforced by a JSON schema
+
+
+_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    "rewrites": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["index", "rewrites"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "indexed_rewrites", "strict": True, "schema": _SCHEMA},
+}
+
+
+def format_indexed_prompt(batch: list[str]) -> str:
+    return "\n".join(f"{i}: {sentence}" for i, sentence in enumerate(batch))
+
+
+def parse_indexed_response(response_text: str, count: int) -> dict[int, list[str]]:
+    """
+    Reads {"results": [{"index": i, "rewrites": [...]}, ...]} into {index: rewrites}.
+
+    Entries with an index outside the batch or malformed rewrites are dropped,
+    so their sentences are left unresolved rather than given someone else's
+    rewrites. Raises ValueError if the text is not a JSON object of results.
+    """
+    document = json.loads(response_text)
+    if not isinstance(document, dict) or not isinstance(document.get("results"), list):
+        raise ValueError("Response is not an object with a results list")
+
+    parsed: dict[int, list[str]] = {}
+    for entry in document["results"]:
+        if not isinstance(entry, dict):
+            continue
+
+        index, rewrites = entry.get("index"), entry.get("rewrites")
+        if type(index) is not int or not 0 <= index < count or not isinstance(rewrites, list):
+            continue
+
+        parsed.setdefault(index, []).extend(
+            rewrite.strip() for rewrite in rewrites
+            if isinstance(rewrite, str) and rewrite.strip() and rewrite.strip().lower() != "null"
+        )
+    return parsed
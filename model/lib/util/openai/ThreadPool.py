@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from openai import AsyncOpenAI
 from openai.types.beta import Thread
 
+from .RunPoller import TERMINAL_STATUSES
+
 
 # TODO -> Docstring
 
@@ -13,6 +15,12 @@ class ThreadPool:
     thread: Thread
     completion_count: int = 0
     previous_created_at: int = 0
+    active_run_id: str | None = None
+    run_status: str | None = None  # last status fetched for active_run_id
+
+    @property
+    def is_idle(self) -> bool:
+        return self.active_run_id is None or self.run_status in TERMINAL_STATUSES
 
     @classmethod
     async def create(cls, client: AsyncOpenAI, pool_id: int, previous_created_at: int):
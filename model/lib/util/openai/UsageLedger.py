@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+import aiofiles
+
+_USAGE_PATH = "./logs/usage.json"
+# USD per million prompt and completion tokens
+_PRICES_PER_MILLION: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+# (stage, element, ordinal) of the work running in the current task
+_SCOPE: ContextVar[tuple[str, str, str] | None] = ContextVar("usage_scope", default=None)
+
+
+def price(model: str, prompt_tokens: int, completion_tokens: float) -> float:
+    prompt_price, completion_price = _PRICES_PER_MILLION.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+@contextmanager
+def usage_scope(stage: str, element: str, ordinal: str):
+    """Attributes runs started in this block, including tasks created in it, to a stage, element and ordinal."""
+    token = _SCOPE.set((stage, element, str(ordinal)))
+    try:
+        yield
+    finally:
+        _SCOPE.reset(token)
+
+
+@dataclass
+class Usage:
+    runs: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cost: float):
+        self.runs += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost += cost
+
+
+class UsageLedger:
+    """Tokens and cost of every completed run, in total and per stage, element and ordinal."""
+
+    def __init__(self, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger("Athena | Usage")
+        self.totals = Usage()
+        self.by_scope: dict[tuple[str, str, str] | None, Usage] = {}
+        self._unpriced: set[str] = set()
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int):
+        if model not in _PRICES_PER_MILLION and model not in self._unpriced:
+            self._unpriced.add(model)
+            self.logger.warning(f"No price known for {model}, its usage is counted at no cost")
+
+        cost = price(model, prompt_tokens, completion_tokens)
+        self.totals.add(prompt_tokens, completion_tokens, cost)
+        self.by_scope.setdefault(_SCOPE.get(), Usage()).add(prompt_tokens, completion_tokens, cost)
+
+    def snapshot(self) -> dict:
+        return {
+            "totals": asdict(self.totals),
+            "scopes": [
+                {"stage": stage, "element": element, "ordinal": ordinal} | asdict(usage)
+                for (stage, element, ordinal), usage in
+                ((scope or ("", "", ""), usage) for scope, usage in self.by_scope.items())
+            ],
+        }
+
+    async def save(self, path: str = _USAGE_PATH):
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        temporary = path.with_suffix(path.suffix + ".tmp")
+        async with aiofiles.open(temporary, mode="w", encoding="utf-8") as f:
+            await f.write(json.dumps(self.snapshot(), indent=4))
+        os.replace(temporary, path)
+
+
+USAGE = UsageLedger()
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import aiofiles
+
+from .ThreadPool import ThreadPool
+
+_STATE_DIR = "./cache/warm_state/"
+_MAX_AGE_SECS = 24 * 60 * 60  # threads idle longer than this are not worth trusting
+
+
+def fingerprint(name: str, model: str, system_prompt: str) -> str:
+    return hashlib.sha256(json.dumps([name, model, system_prompt]).encode("utf-8")).hexdigest()
+
+
+class WarmState:
+    """
+    Local snapshot of a client's assistant and reusable threads, so a restart
+    with an unchanged name, model and prompt can skip assistant discovery and
+    thread creation.
+
+    Threads are claimed on load: the snapshot is rewritten without them, so two
+    processes starting from the same file never share a thread.
+    """
+
+    def __init__(self, name: str, directory: str = _STATE_DIR, max_age_secs: float = _MAX_AGE_SECS,
+                 logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger("Athena | Warm State")
+        self.path = Path(directory) / f"{name}.json"
+        self.max_age_secs = max_age_secs
+
+    async def claim(self, expected_fingerprint: str) -> dict | None:
+        """Returns the snapshot if it matches the fingerprint and is fresh, taking its threads."""
+        state = await self._read()
+        if state is None:
+            return None
+
+        if state.get("fingerprint") != expected_fingerprint:
+            self.logger.info("Warm state fingerprint changed, ignoring snapshot")
+            return None
+        if time.time() - state.get("saved_at", 0) > self.max_age_secs:
+            self.logger.info("Warm state is stale, ignoring snapshot")
+            return None
+
+        await self._write(state | {"threads": []})
+        return state
+
+    async def save(self, expected_fingerprint: str, assistant_id: str, threads: list[ThreadPool]):
+        await self._write({
+            "fingerprint": expected_fingerprint,
+            "assistant_id": assistant_id,
+            "threads": [
+                {
+                    "id": pool.thread.id,
+                    "created_at": getattr(pool.thread, "created_at", 0),
+                    "completion_count": pool.completion_count,
+                }
+                for pool in threads
+            ],
+            "saved_at": time.time(),
+        })
+
+    async def _read(self) -> dict | None:
+        try:
+            async with aiofiles.open(self.path, mode="r", encoding="utf-8") as f:
+                return json.loads(await f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable warm state {self.path}: {e}")
+            return None
+
+    async def _write(self, state: dict):
+        os.makedirs(self.path.parent, exist_ok=True)
+        temporary = self.path.with_suffix(self.path.suffix + ".tmp")
+        async with aiofiles.open(temporary, mode="w", encoding="utf-8") as f:
+            await f.write(json.dumps(state))
+        os.replace(temporary, self.path)
@@ -0,0 +1,580 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator
+
+
+#############################################
+# Local stand-in for the OpenAI HTTP API
+#############################################
+
+def echo_responder(sentences: list[str]) -> str:
+    """Default model: one rewrite per sentence, groups separated by blank lines."""
+    return "\n\n".join(f"{sentence} (rewritten)" for sentence in sentences)
+
+
+def fixed(seconds: float) -> Callable[[], float]:
+    return lambda: seconds
+
+
+def lognormal(median: float, sigma: float = 0.5) -> Callable[[], float]:
+    """Right-skewed latency, as seen from the real API: most calls near median, a long tail."""
+    return lambda: random.lognormvariate(0, sigma) * median
+
+
+def to_indexed_json(content: str) -> str:
+    """Converts blank-line separated groups into the structured response schema."""
+    return json.dumps({"results": [
+        {"index": i, "rewrites": [line for line in group.split("\n") if line]}
+        for i, group in enumerate(content.split("\n\n"))
+    ]})
+
+
+def malform_json(content: str) -> str:
+    """Structured output drifts by dropping an entry or being cut short."""
+    document = json.loads(content)
+    if len(document["results"]) > 1 and random.random() < 0.5:
+        document["results"].pop(random.randrange(len(document["results"])))
+        return json.dumps(document)
+    return content[:len(content) // 2]
+
+
+def malform(content: str) -> str:
+    """Breaks the group structure the way model formatting drift does."""
+    groups = content.split("\n\n")
+    if len(groups) > 1 and random.random() < 0.5:
+        groups.pop(random.randrange(len(groups)))  # A sentence's rewrites go missing
+        return "\n\n".join(groups)
+    return content.replace("\n\n", "\n")  # Separators are dropped
+
+
+class FakeOpenAIServer:
+    """
+    Serves the subset of the OpenAI API used by the augmentation clients on a
+    local port, so clients can be pointed at it with base_url.
+
+    Latency is configurable per route and for run completion, and a share of
+    requests can be answered with 429s, 5xx errors or malformed model output.
+    Batch jobs advance one status per retrieve, so clients must poll through
+    validating -> in_progress -> completed before results are available. Runs
+    created with stream=true answer with server-sent events instead, the
+    message arriving word by word over the run's time.
+    """
+
+    def __init__(
+            self,
+            responder: Callable[[list[str]], str] = echo_responder,
+            latency: dict[str, Callable[[], float]] | None = None,
+            run_seconds: Callable[[], float] = fixed(0),
+            rate_limit_rate: float = 0.0,
+            server_error_rate: float = 0.0,
+            malformed_rate: float = 0.0,
+            seed: int | None = None,
+    ):
+        """
+        latency maps route names (e.g. "runs.create") or "*" to a distribution of
+        seconds to wait before answering. run_seconds is the distribution of time
+        a run stays in progress.
+        """
+        self.responder = responder
+        self.latency = latency or {}
+        self.run_seconds = run_seconds
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.malformed_rate = malformed_rate
+        self.calls: dict[str, int] = {}
+
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+        self.assistants: dict[str, dict] = {}
+        self.threads: dict[str, dict] = {}
+        self.messages: dict[str, list[dict]] = {}
+        self.runs: dict[str, dict] = {}
+
+        self._random = random.Random(seed)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids)}"
+
+    def record_call(self, route: str):
+        with self._lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+    def delay(self, route: str):
+        distribution = self.latency.get(route, self.latency.get("*"))
+        if distribution is not None:
+            time.sleep(max(0.0, distribution()))
+
+    def injected_error(self) -> tuple[int, dict] | None:
+        with self._lock:
+            roll = self._random.random()
+
+        if roll < self.rate_limit_rate:
+            return 429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+        if roll < self.rate_limit_rate + self.server_error_rate:
+            return 500, {"error": {"message": "The server had an error", "type": "server_error", "code": None}}
+        return None
+
+    def respond(self, sentences: list[str], structured: bool = False) -> str:
+        if structured:
+            sentences = [sentence.partition(": ")[2] for sentence in sentences]
+
+        content = self.responder(sentences)
+        if structured:
+            content = to_indexed_json(content)
+
+        with self._lock:
+            roll = self._random.random()
+        if roll >= self.malformed_rate:
+            return content
+        return malform_json(content) if structured else malform(content)
+
+    # Files
+
+    def create_file(self, content: bytes, purpose: str, filename: str = "upload.jsonl") -> dict:
+        file_id = self.new_id("file")
+        self.files[file_id] = content
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    # Batches
+
+    def create_batch(self, body: dict) -> dict:
+        batch = {
+            "id": self.new_id("batch"),
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "created_at": int(time.time()),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        self.batches[batch["id"]] = batch
+        return batch
+
+    def retrieve_batch(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        match batch["status"]:
+            case "validating":
+                batch["status"] = "in_progress"
+            case "in_progress":
+                self._complete_batch(batch)
+        return batch
+
+    def _complete_batch(self, batch: dict):
+        lines = self.files[batch["input_file_id"]].decode("utf-8").splitlines()
+        output, errors = [], []
+
+        for line in filter(str.strip, lines):
+            request = json.loads(line)
+            sentences = request["body"]["messages"][-1]["content"].split("\n")
+            try:
+                content = self.respond(sentences, "response_format" in request["body"])
+            except Exception as e:
+                errors.append({"custom_id": request["custom_id"], "error": {"message": str(e)}})
+                continue
+
+            output.append({
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]},
+                },
+                "error": None,
+            })
+
+        batch["status"] = "completed"
+        batch["output_file_id"] = self.create_file(_to_jsonl(output), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self.create_file(_to_jsonl(errors), "batch_output")["id"]
+        batch["request_counts"] = {"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)}
+
+    # Chat completions
+
+    def create_chat_completion(self, body: dict) -> dict:
+        prompt = body["messages"][-1]["content"]
+        content = self.respond(prompt.split("\n"), "response_format" in body)
+        return {
+            "id": self.new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        }
+
+    # Assistants
+
+    def create_assistant(self, body: dict) -> dict:
+        assistant = {
+            "id": self.new_id("asst"),
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": body.get("name"),
+            "model": body["model"],
+            "instructions": body.get("instructions"),
+            "tools": [],
+            "metadata": {},
+        }
+        self.assistants[assistant["id"]] = assistant
+        return assistant
+
+    def update_assistant(self, assistant_id: str, body: dict) -> dict:
+        assistant = self.assistants[assistant_id]
+        assistant.update({key: value for key, value in body.items() if key in ("name", "model", "instructions")})
+        return assistant
+
+    # Threads and messages
+
+    def create_thread(self) -> dict:
+        thread = {"id": self.new_id("thread"), "object": "thread", "created_at": int(time.time()), "metadata": {}}
+        self.threads[thread["id"]] = thread
+        self.messages[thread["id"]] = []
+        return thread
+
+    def delete_thread(self, thread_id: str) -> dict:
+        del self.threads[thread_id]
+        return {"id": thread_id, "object": "thread.deleted", "deleted": True}
+
+    def create_message(self, thread_id: str, role: str, content: str, run_id: str | None = None) -> dict:
+        if any(run["status"] in ("queued", "in_progress") for run in self._thread_runs(thread_id)):
+            raise _ApiError(400, f"Can't add messages to {thread_id} while a run is active.")
+
+        message = {
+            "id": self.new_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "content": [{"type": "text", "text": {"value": content, "annotations": []}}],
+            "run_id": run_id,
+            "status": "completed",
+            "attachments": [],
+            "metadata": {},
+        }
+        self.messages[thread_id].append(message)
+        return message
+
+    def list_messages(self, thread_id: str) -> dict:
+        data = list(reversed(self.messages[thread_id]))
+        return {
+            "object": "list",
+            "data": data,
+            "first_id": data[0]["id"] if data else None,
+            "last_id": data[-1]["id"] if data else None,
+            "has_more": False,
+        }
+
+    # Runs
+
+    def create_run(self, thread_id: str, body: dict) -> dict:
+        self.threads[thread_id]  # Unknown threads are a 404
+        run = {
+            "id": self.new_id("run"),
+            "object": "thread.run",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "assistant_id": body["assistant_id"],
+            "status": "queued",
+            "model": "fake-model",
+            "instructions": "",
+            "tools": [],
+            "usage": None,
+            "last_error": None,
+            "response_format": body.get("response_format", "auto"),
+            "_completes_at": time.monotonic() + max(0.0, self.run_seconds()),
+        }
+        self.runs[run["id"]] = run
+        return _public(run)
+
+    def retrieve_run(self, thread_id: str, run_id: str) -> dict:
+        run = self.runs[run_id]
+        if run["status"] in ("queued", "in_progress"):
+            if time.monotonic() >= run["_completes_at"]:
+                self._complete_run(run)
+            else:
+                run["status"] = "in_progress"
+        return _public(run)
+
+    def stream_run(self, thread_id: str, body: dict) -> Iterator[tuple[str, dict]]:
+        """Yields the (event, data) pairs of a streamed run, pacing deltas out over its run time."""
+        run = self.runs[self.create_run(thread_id, body)["id"]]
+        yield "thread.run.created", _public(run)
+
+        run["status"] = "in_progress"
+        yield "thread.run.in_progress", _public(run)
+
+        prompt, content = self._run_content(run)
+        message_id = self.new_id("msg")
+        pieces = re.findall(r"\s*\S+", content)
+        pause = max(0.0, run["_completes_at"] - time.monotonic()) / max(1, len(pieces))
+        for piece in pieces:
+            time.sleep(pause)
+            yield "thread.message.delta", {
+                "id": message_id,
+                "object": "thread.message.delta",
+                "delta": {"role": "assistant", "content": [
+                    {"index": 0, "type": "text", "text": {"value": piece, "annotations": []}}
+                ]},
+            }
+
+        self._finish_run(run, prompt, content)
+        yield "thread.run.completed", _public(run)
+
+    def cancel_run(self, thread_id: str, run_id: str) -> dict:
+        run = self.runs[run_id]
+        if run["status"] in ("queued", "in_progress"):
+            run["status"] = "cancelled"
+        return _public(run)
+
+    def _complete_run(self, run: dict):
+        self._finish_run(run, *self._run_content(run))
+
+    def _run_content(self, run: dict) -> tuple[str, str]:
+        thread_messages = self.messages[run["thread_id"]]
+        prompt = next(m for m in reversed(thread_messages) if m["role"] == "user")["content"][0]["text"]["value"]
+        return prompt, self.respond(prompt.split("\n"), run["response_format"] != "auto")
+
+    def _finish_run(self, run: dict, prompt: str, content: str):
+        run["status"] = "completed"
+        run["usage"] = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        self.create_message(run["thread_id"], "assistant", content, run["id"])
+
+    def _thread_runs(self, thread_id: str) -> list[dict]:
+        return [run for run in self.runs.values() if run["thread_id"] == thread_id]
+
+
+class _ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _public(run: dict) -> dict:
+    return {key: value for key, value in run.items() if not key.startswith("_")}
+
+
+def _to_jsonl(rows: list[dict]) -> bytes:
+    return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+
+def _parse_multipart(content_type: str, body: bytes) -> dict[str, tuple[str | None, bytes]]:
+    message = BytesParser(policy=default).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+    )
+    return {
+        part.get_param("name", header="content-disposition"): (part.get_filename(), part.get_payload(decode=True))
+        for part in message.iter_parts()
+    }
+
+
+def _make_handler(server: FakeOpenAIServer):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        routes = [
+            ("POST", re.compile(r"/v1/files$"), "files.create"),
+            ("GET", re.compile(r"/v1/files/(?P<file_id>[^/]+)/content$"), "files.content"),
+            ("POST", re.compile(r"/v1/batches$"), "batches.create"),
+            ("GET", re.compile(r"/v1/batches/(?P<batch_id>[^/]+)$"), "batches.retrieve"),
+            ("POST", re.compile(r"/v1/chat/completions$"), "chat.completions.create"),
+            ("GET", re.compile(r"/v1/assistants$"), "assistants.list"),
+            ("POST", re.compile(r"/v1/assistants$"), "assistants.create"),
+            ("GET", re.compile(r"/v1/assistants/(?P<assistant_id>[^/]+)$"), "assistants.retrieve"),
+            ("POST", re.compile(r"/v1/assistants/(?P<assistant_id>[^/]+)$"), "assistants.update"),
+            ("POST", re.compile(r"/v1/threads$"), "threads.create"),
+            ("GET", re.compile(r"/v1/threads/(?P<thread_id>[^/]+)$"), "threads.retrieve"),
+            ("DELETE", re.compile(r"/v1/threads/(?P<thread_id>[^/]+)$"), "threads.delete"),
+            ("POST", re.compile(r"/v1/threads/(?P<thread_id>[^/]+)/messages$"), "messages.create"),
+            ("GET", re.compile(r"/v1/threads/(?P<thread_id>[^/]+)/messages$"), "messages.list"),
+            ("POST", re.compile(r"/v1/threads/(?P<thread_id>[^/]+)/runs$"), "runs.create"),
+            ("GET", re.compile(r"/v1/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)$"), "runs.retrieve"),
+            ("POST", re.compile(r"/v1/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)/cancel$"), "runs.cancel"),
+        ]
+
+        def log_message(self, format, *args):
+            pass  # Keep test output quiet
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+        def _dispatch(self, method: str):
+            body = self._read_body()
+            for route_method, pattern, name in self.routes:
+                match = pattern.match(self.path.split("?")[0])
+                if route_method != method or not match:
+                    continue
+
+                server.record_call(name)
+                server.delay(name)
+
+                error = server.injected_error()
+                if error is not None:
+                    self._send_json(*error)
+                    return
+
+                try:
+                    getattr(self, "_" + name.replace(".", "_"))(body, **match.groupdict())
+                except KeyError:
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                except _ApiError as e:
+                    self._send_json(e.status, {"error": {"message": str(e), "type": "invalid_request_error"}})
+                return
+
+            self._send_json(404, {"error": {"message": f"No route for {method} {self.path}"}})
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _send_json(self, status: int, payload: dict):
+            self._send_bytes(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+        def _send_bytes(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_events(self, events: Iterator[tuple[str, dict]]):
+            first = next(events)  # Errors before the stream starts are still plain responses
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            for event, data in itertools.chain([first], events):
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"event: done\ndata: [DONE]\n\n")
+
+        def _files_create(self, body: bytes):
+            parts = _parse_multipart(self.headers["Content-Type"], body)
+            filename, content = parts["file"]
+            purpose = parts["purpose"][1].decode("utf-8")
+            self._send_json(200, server.create_file(content, purpose, filename or "upload.jsonl"))
+
+        def _files_content(self, body: bytes, file_id: str):
+            self._send_bytes(200, server.files[file_id], "application/octet-stream")
+
+        def _batches_create(self, body: bytes):
+            self._send_json(200, server.create_batch(json.loads(body)))
+
+        def _batches_retrieve(self, body: bytes, batch_id: str):
+            self._send_json(200, server.retrieve_batch(batch_id))
+
+        def _chat_completions_create(self, body: bytes):
+            self._send_json(200, server.create_chat_completion(json.loads(body)))
+
+        def _assistants_list(self, body: bytes):
+            data = list(server.assistants.values())
+            self._send_json(200, {"object": "list", "data": data, "has_more": False})
+
+        def _assistants_create(self, body: bytes):
+            self._send_json(200, server.create_assistant(json.loads(body)))
+
+        def _assistants_retrieve(self, body: bytes, assistant_id: str):
+            self._send_json(200, server.assistants[assistant_id])
+
+        def _assistants_update(self, body: bytes, assistant_id: str):
+            self._send_json(200, server.update_assistant(assistant_id, json.loads(body)))
+
+        def _threads_create(self, body: bytes):
+            self._send_json(200, server.create_thread())
+
+        def _threads_retrieve(self, body: bytes, thread_id: str):
+            self._send_json(200, server.threads[thread_id])
+
+        def _threads_delete(self, body: bytes, thread_id: str):
+            self._send_json(200, server.delete_thread(thread_id))
+
+        def _messages_create(self, body: bytes, thread_id: str):
+            request = json.loads(body)
+            self._send_json(200, server.create_message(thread_id, request["role"], request["content"]))
+
+        def _messages_list(self, body: bytes, thread_id: str):
+            self._send_json(200, server.list_messages(thread_id))
+
+        def _runs_create(self, body: bytes, thread_id: str):
+            request = json.loads(body)
+            if request.get("stream"):
+                self._send_events(server.stream_run(thread_id, request))
+            else:
+                self._send_json(200, server.create_run(thread_id, request))
+
+        def _runs_retrieve(self, body: bytes, thread_id: str, run_id: str):
+            self._send_json(200, server.retrieve_run(thread_id, run_id))
+
+        def _runs_cancel(self, body: bytes, thread_id: str, run_id: str):
+            self._send_json(200, server.cancel_run(thread_id, run_id))
+
+    return Handler
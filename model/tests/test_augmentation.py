@@ -0,0 +1,239 @@
+import asyncio
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from lib.augment.Augmentation import Augmentation
+from lib.augment.AugmentType import AugmentationType
+from lib.augment.Budget import Budget
+from lib.augment.Progress import ProgressManifest
+from lib.util.openai.RateLimiter import TokenEstimate
+from lib.util.openai.UsageLedger import UsageLedger
+
+
+class DummyGPTClient:
+    model = "gpt-4o-mini"
+
+    def __init__(self, ledger: UsageLedger | None = None):
+        self.batches = []
+        self.ledger = ledger or UsageLedger()
+
+    def estimate_usage(self, batch):
+        return TokenEstimate(prompt_tokens=10 * len(batch), completion_tokens=0)
+
+    def estimate_sentence_tokens(self, sentence):
+        return 10
+
+    @property
+    def capacity(self):
+        return 4
+
+    async def process_batch(self, batch, on_result=None):
+        self.batches.append(batch)
+        self.ledger.record(self.model, 10 * len(batch), 0)
+        return {sentence: [f"{sentence} (rewritten)"] for sentence in batch}
+
+    async def close(self):
+        pass
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+class TestAugmentationScheduler(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = self.tmp.name + "/input/"
+        os.makedirs(self.input_dir)
+        with open(self.input_dir + "threat.csv", "w", encoding="utf-8") as f:
+            f.write('type,sentence\n1,"a"\n1,"b"\n2,"c"\n')
+
+        self.output_dir = self.tmp.name + "/output/"
+        os.makedirs(self.output_dir)
+        with open(self.output_dir + "threat.csv", "w", encoding="utf-8") as f:
+            f.write('type,sentence\n1,"old"\n1,"old (rewritten)"\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_augmentation(self, budget: Budget | None) -> tuple[Augmentation, DummyGPTClient]:
+        augmentation = Augmentation(AugmentationType.EMOTIONAL_TONE, budget=budget)
+        augmentation.input_path = self.input_dir
+        augmentation.output_path = self.output_dir
+        augmentation.skipped_path = self.tmp.name + "/skipped/"
+        augmentation.progress = ProgressManifest(self.tmp.name + "/progress.jsonl")
+        client = DummyGPTClient(budget.ledger if budget else None)
+
+        async def fake_create_gpt_client():
+            augmentation.gpt_client = client
+
+        augmentation.create_gpt_client = fake_create_gpt_client
+        return augmentation, client
+
+    # 1. Ordinals with the fewest existing samples are dispatched first
+    async def test_fewest_samples_first(self):
+        augmentation, client = self.make_augmentation(None)
+
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 1):
+            await augmentation._run()
+
+        self.assertEqual(client.batches[0], ["c"])
+        self.assertFalse(os.path.exists(augmentation.skipped_path))
+
+    # 2. An exhausted budget stops dispatch and records what was skipped
+    async def test_budget_skips_and_records(self):
+        augmentation, client = self.make_augmentation(Budget(max_tokens=15, ledger=UsageLedger()))
+
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 1):
+            await augmentation._run()
+
+        self.assertEqual(client.batches, [["c"]])
+        self.assertIn(["2", "c (rewritten)"], read_rows(self.output_dir + "threat.csv"))
+        self.assertEqual(sorted(read_rows(augmentation.skipped_path + "threat.csv")), [["1", "a"], ["1", "b"]])
+
+    # 3. Chunks from every ordinal are in flight together rather than one ordinal at a time
+    async def test_ordinals_share_workers(self):
+        augmentation, client = self.make_augmentation(None)
+        in_flight, peak = 0, 0
+
+        async def slow_process_batch(batch, on_result=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {sentence: [f"{sentence} (rewritten)"] for sentence in batch}
+
+        client.process_batch = slow_process_batch
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 1):
+            await augmentation._run()
+
+        self.assertEqual(peak, 3)
+        self.assertEqual(len(read_rows(self.output_dir + "threat.csv")), 2 + 6)
+
+    # 4. A restarted run only dispatches what the previous one did not finish, without duplicating rows
+    async def test_restart_skips_finished_chunks(self):
+        augmentation, client = self.make_augmentation(None)
+        process_batch = client.process_batch
+
+        async def failing_process_batch(batch, on_result=None):
+            return None if "a" in batch else await process_batch(batch)
+
+        client.process_batch = failing_process_batch
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 1):
+            await augmentation._run()
+
+            augmentation, client = self.make_augmentation(None)
+            await augmentation._run()
+
+        self.assertEqual(client.batches, [["a"]])
+        rows = read_rows(self.output_dir + "threat.csv")
+        self.assertEqual(len(rows), len(set(map(tuple, rows))))
+        self.assertIn(["1", "a (rewritten)"], rows)
+
+    # 5. Sentences already in the output are not sent again, only those new to the input
+    async def test_only_new_sentences(self):
+        with open(self.output_dir + "threat.csv", "a", encoding="utf-8") as f:
+            f.write('1,"a"\n1,"a (rewritten)"\n2,"c"\n2,"c (rewritten)"\n')
+        augmentation, client = self.make_augmentation(None)
+
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}):
+            await augmentation._run()
+
+        self.assertEqual(client.batches, [["b"]])
+
+    # 6. Sentences a partial result leaves out stay outstanding for the next run
+    async def test_partial_result_keeps_rest_outstanding(self):
+        augmentation, client = self.make_augmentation(None)
+
+        async def partial_process_batch(batch, on_result=None):
+            client.batches.append(batch)
+            return {batch[0]: [f"{batch[0]} (rewritten)"]}
+
+        client.process_batch = partial_process_batch
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}):
+            await augmentation._run()
+
+        resolved = {batch[0] for batch in client.batches}
+        progress = ProgressManifest(augmentation.progress.path)
+        await progress.load()
+        self.assertEqual(
+            sorted(progress.outstanding("threat", "1", ["a", "b"]) + progress.outstanding("threat", "2", ["c"])),
+            sorted({"a", "b", "c"} - resolved),
+        )
+        self.assertEqual(len(resolved), 2)
+
+    # 7. Workers are sized to the client's capacity rather than a fixed count
+    async def test_workers_follow_client_capacity(self):
+        with open(self.input_dir + "threat.csv", "a", encoding="utf-8") as f:
+            f.write("".join(f'1,"s{i}"\n' for i in range(20)))
+        augmentation, client = self.make_augmentation(None)
+        in_flight, peak = 0, 0
+
+        async def slow_process_batch(batch, on_result=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {sentence: [f"{sentence} (rewritten)"] for sentence in batch}
+
+        client.process_batch = slow_process_batch
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 1), \
+                patch.object(DummyGPTClient, "capacity", 6):
+            await augmentation._run()
+
+        self.assertEqual(peak, 6)
+
+    # 8. Sentences handed over while the chunk is still running are written straight away
+    async def test_results_written_as_handed_over(self):
+        augmentation, client = self.make_augmentation(None)
+        written_before_return: list[list[str]] = []
+
+        async def streaming_process_batch(batch, on_result=None):
+            for sentence in batch:
+                on_result(sentence, [f"{sentence} (rewritten)"])
+                await asyncio.sleep(0.01)
+            written_before_return.append([row[1] for row in read_rows(self.output_dir + "threat.csv")])
+            return {sentence: [f"{sentence} (rewritten)"] for sentence in batch}
+
+        client.process_batch = streaming_process_batch
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 2):
+            await augmentation._run()
+
+        self.assertTrue(any("a (rewritten)" in rows or "c (rewritten)" in rows for rows in written_before_return))
+        rows = read_rows(self.output_dir + "threat.csv")
+        self.assertEqual(len(rows), 2 + 6)
+
+    # 9. Skipped sentences are quoted properly, so they read back as the next run's input
+    async def test_skipped_sentences_round_trip(self):
+        augmentation, _ = self.make_augmentation(None)
+        sentence = 'He said "stop", then left'
+
+        await augmentation.write_skipped({"threat": [("1", sentence)]})
+
+        self.assertEqual(read_rows(augmentation.skipped_path + "threat.csv"), [["1", sentence]])
+
+    # 10. An input sentence matching an earlier rewrite, rather than an original, is still sent
+    async def test_rewrite_in_output_is_not_an_original(self):
+        with open(self.input_dir + "threat.csv", "a", encoding="utf-8") as f:
+            f.write('1,"I will find you soon"\n')
+        with open(self.output_dir + "threat.csv", "a", encoding="utf-8") as f:
+            f.write('1,"a"\n1,"b"\n1,"I will find you"\n1,"I will find you soon"\n2,"c"\n')
+        augmentation, client = self.make_augmentation(None)
+
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}):
+            await augmentation._run()
+
+        self.assertEqual(client.batches, [["I will find you soon"]])
@@ -0,0 +1,118 @@
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from openai import AsyncOpenAI
+
+from lib.augment.AugmentBackend import AugmentationBackend
+from lib.augment.AugmentType import AugmentationType
+from lib.augment.Augmentation import Augmentation
+from lib.augment.Progress import ProgressManifest
+from lib.util.openai.BatchClient import BatchClient
+from lib.util.openai.StructuredResponse import ResponseFormat
+from tests.fake_openai_server import FakeOpenAIServer
+
+
+def failing_responder(sentences):
+    if "bad" in sentences:
+        raise ValueError("Dummy model failure")
+    return "\n\n".join(f"{s} (rewritten)" for s in sentences)
+
+
+class TestBatchClient(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir_patch = patch("lib.util.openai.BatchClient._BATCH_DIR", self.tmp.name + "/batches/")
+        self.dir_patch.start()
+        self.server = FakeOpenAIServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+        patch.stopall()
+        self.tmp.cleanup()
+
+    def make_client(self) -> BatchClient:
+        client = BatchClient("dummy", "dummy-model", "dummy-system", poll_interval=0)
+        client._client = AsyncOpenAI(api_key="test", base_url=self.server.url)
+        return client
+
+    # 1. All chunks are written to one file, submitted once and streamed back
+    async def test_process_batches_round_trip(self):
+        client = self.make_client()
+        batches = {"a": ["one", "two"], "b": ["three"]}
+
+        results = {custom_id: result async for custom_id, result in client.process_batches(batches)}
+        await client.close()
+
+        self.assertEqual(results, {
+            "a": {"one": ["one (rewritten)"], "two": ["two (rewritten)"]},
+            "b": {"three": ["three (rewritten)"]},
+        })
+        self.assertEqual(self.server.calls["files.create"], 1)
+        self.assertEqual(self.server.calls["batches.create"], 1)
+        self.assertEqual(client.completed, 2)
+
+    # 2. Request lines carry the system prompt and joined chunk
+    async def test_request_line_format(self):
+        client = self.make_client()
+        line = client._request_line("id-1", ["x", "y"])
+
+        self.assertEqual(line["custom_id"], "id-1")
+        self.assertEqual(line["url"], "/v1/chat/completions")
+        self.assertEqual(line["body"]["messages"][0], {"role": "system", "content": "dummy-system"})
+        self.assertEqual(line["body"]["messages"][1]["content"], "x\ny")
+
+    # 3. Errored and mismatched requests are counted as failed and skipped
+    async def test_failed_requests_are_skipped(self):
+        self.server.responder = failing_responder
+        client = self.make_client()
+        batches = {"ok": ["fine"], "err": ["bad"]}
+
+        results = {custom_id: result async for custom_id, result in client.process_batches(batches)}
+        await client.close()
+
+        self.assertEqual(list(results), ["ok"])
+        self.assertEqual(client.failed, 1)
+
+    # 4. Augmentation streams batch results into the element output CSVs
+    async def test_augmentation_batch_backend(self):
+        input_dir = self.tmp.name + "/input/"
+        output_dir = self.tmp.name + "/output/"
+        os.makedirs(input_dir)
+        with open(input_dir + "threat.csv", "w", encoding="utf-8") as f:
+            f.write('type,sentence\n1,"first"\n2,"second"\n')
+
+        augmentation = Augmentation(AugmentationType.EMOTIONAL_TONE, AugmentationBackend.BATCH)
+        augmentation.input_path = input_dir
+        augmentation.output_path = output_dir
+        augmentation.progress = ProgressManifest(self.tmp.name + "/progress.jsonl")
+
+        async def fake_create_batch_client():
+            augmentation.batch_client = self.make_client()
+
+        with patch("lib.augment.Augmentation.ELEMENT_PATHS", {None: "threat"}), \
+                patch.object(augmentation, "create_batch_client", fake_create_batch_client):
+            await augmentation._run()
+
+        with open(output_dir + "threat.csv", encoding="utf-8") as f:
+            rows = sorted(tuple(row) for row in csv.reader(f))
+
+        self.assertEqual(rows, sorted([
+            ("type", "sentence"),
+            ("1", "first"), ("1", "first (rewritten)"),
+            ("2", "second"), ("2", "second (rewritten)"),
+        ]))
+        self.assertEqual(augmentation.progress.chunks, 2)
+
+    # 5. Structured mode requests the JSON schema and maps rewrites by index
+    async def test_structured_round_trip(self):
+        client = self.make_client()
+        client.response_format = ResponseFormat.JSON
+
+        results = {custom_id: result async for custom_id, result in client.process_batches({"a": ["one", "two"]})}
+        await client.close()
+
+        self.assertEqual(results, {"a": {"one": ["one (rewritten)"], "two": ["two (rewritten)"]}})
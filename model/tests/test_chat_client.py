@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from openai import AsyncOpenAI
+
+from lib.util.openai.ChatClient import ChatClient
+from lib.util.openai.FailureJournal import FailureJournal
+from lib.util.openai.StructuredResponse import ResponseFormat
+from tests.fake_openai_server import FakeOpenAIServer
+
+
+class TestChatClient(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeOpenAIServer(seed=0).start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def openai_client(self, api_key=None, organization=None):
+        return AsyncOpenAI(api_key="test", base_url=self.server.url)
+
+    async def make_client(self, response_format: ResponseFormat = ResponseFormat.TEXT) -> ChatClient:
+        with patch("lib.util.openai.GPTClient.AsyncOpenAI", self.openai_client):
+            client = await ChatClient.create("dummy", "dummy-model", "dummy-system", response_format=response_format)
+        client.journal = FailureJournal(os.path.join(self.tmp.name, "failed.jsonl"))
+        return client
+
+    # 1. Each batch is a single request, with no assistant or thread set up
+    async def test_one_request_per_batch(self):
+        client = await self.make_client()
+
+        result = await client.process_batch(["one", "two"])
+        await client.close()
+
+        self.assertEqual(result, {"one": ["one (rewritten)"], "two": ["two (rewritten)"]})
+        self.assertEqual(self.server.calls, {"chat.completions.create": 1})
+        self.assertEqual(client.completed, 1)
+
+    # 2. Structured mode asks for the schema and maps rewrites by index
+    async def test_structured_round_trip(self):
+        client = await self.make_client(ResponseFormat.JSON)
+
+        result = await client.process_batch(["one", "two"])
+        await client.close()
+
+        self.assertEqual(result, {"one": ["one (rewritten)"], "two": ["two (rewritten)"]})
+
+    # 3. Malformed responses are bisected through the shared retry path
+    async def test_malformed_responses_are_resolved(self):
+        client = await self.make_client()
+        self.server.malformed_rate = 1.0
+        batch = ["alpha one", "beta two", "gamma three", "delta four"]
+
+        result = await client.process_batch(batch)
+        await client.close()
+
+        self.assertEqual(result, {sentence: [f"{sentence} (rewritten)"] for sentence in batch})
+        self.assertGreater(self.server.calls["chat.completions.create"], 1)
+
+    # 4. Server errors fail the batch and are fed to the concurrency limiter
+    async def test_server_error_fails_batch(self):
+        client = await self.make_client()
+        client._client = AsyncOpenAI(api_key="test", base_url=self.server.url, max_retries=0)
+        self.server.server_error_rate = 1.0
+
+        self.assertIsNone(await client.process_batch(["one"]))
+        await client.close()
+        self.assertLess(client.limiter.limit, 25)
+
+    # 5. Asking for streaming is called out and ignored rather than silently dropped
+    async def test_stream_is_ignored_with_a_warning(self):
+        with self.assertLogs("GPT CLIENT -  dummy", level="WARNING") as logs:
+            client = ChatClient("dummy", "dummy-model", "dummy-system", 2, stream=True)
+
+        self.assertFalse(client.stream)
+        self.assertIn("not streamed", logs.output[0])
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+
+from lib.util.openai.CircuitBreaker import CircuitBreaker, BreakerState
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        patcher = patch("lib.util.openai.CircuitBreaker.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(window=10, min_calls=4, failure_threshold=0.5, cooldown_secs=30)
+
+    # 1. Occasional failures leave the breaker closed
+    def test_stays_closed_below_threshold(self):
+        for success in (True, True, False, True, True, False, True):
+            self.breaker.record(success)
+        self.assertIs(self.breaker.state, BreakerState.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    # 2. Failures at the threshold open it, and dispatch fails fast
+    def test_opens_on_failure_spike(self):
+        for success in (True, False, False, True):
+            self.breaker.record(success)
+        self.assertIs(self.breaker.state, BreakerState.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    # 3. Too few outcomes never open it
+    def test_min_calls_required(self):
+        for _ in range(3):
+            self.breaker.record(False)
+        self.assertIs(self.breaker.state, BreakerState.CLOSED)
+
+    # 4. After the cooldown a single probe goes through, and its success closes the breaker
+    def test_probe_success_closes(self):
+        for _ in range(4):
+            self.breaker.record(False)
+
+        self.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.assertIs(self.breaker.state, BreakerState.HALF_OPEN)
+
+        self.breaker.record(True)
+        self.assertIs(self.breaker.state, BreakerState.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    # 5. A failed probe re-opens it for another cooldown
+    def test_probe_failure_reopens(self):
+        for _ in range(4):
+            self.breaker.record(False)
+
+        self.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(False)
+        self.assertIs(self.breaker.state, BreakerState.OPEN)
+
+        self.now = 59
+        self.assertFalse(self.breaker.allow())
+        self.now = 60
+        self.assertTrue(self.breaker.allow())
+
+    # 6. A probe that never reports back is replaced after a cooldown
+    def test_lost_probe_is_replaced(self):
+        for _ in range(4):
+            self.breaker.record(False)
+
+        self.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.now = 60
+        self.assertTrue(self.breaker.allow())
@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from lib.util.openai.ConcurrencyLimiter import ConcurrencyLimiter
+
+
+class TestConcurrencyLimiter(unittest.IsolatedAsyncioTestCase):
+
+    # 1. Acquire blocks once the limit is reached
+    async def test_acquire_respects_limit(self):
+        limiter = ConcurrencyLimiter(initial=2, maximum=10)
+        await limiter.acquire()
+        await limiter.acquire()
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+
+        await limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(limiter.in_flight, 2)
+
+    # 2. Saturated successes increase the limit additively
+    async def test_additive_increase(self):
+        limiter = ConcurrencyLimiter(initial=2, maximum=10)
+        await limiter.acquire()
+        await limiter.acquire()
+
+        for _ in range(2):
+            limiter.on_success(1.0)
+        self.assertEqual(limiter.limit, 3)
+
+    # 3. Unsaturated successes leave the limit alone
+    async def test_no_increase_when_idle(self):
+        limiter = ConcurrencyLimiter(initial=4, maximum=10)
+        for _ in range(20):
+            limiter.on_success(1.0)
+        self.assertEqual(limiter.limit, 4)
+
+    # 4. Throttles and errors halve the limit, once per cooldown
+    async def test_multiplicative_decrease(self):
+        limiter = ConcurrencyLimiter(initial=8, maximum=10)
+        limiter.on_throttle()
+        limiter.on_error()
+        self.assertEqual(limiter.limit, 4)
+
+        with patch("lib.util.openai.ConcurrencyLimiter._DECREASE_COOLDOWN_SECS", 0):
+            limiter.on_error()
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual([change.reason for change in limiter.history], ["initial", "rate limited", "server error"])
+
+    # 5. Latency well above baseline counts as congestion
+    async def test_latency_decrease(self):
+        limiter = ConcurrencyLimiter(initial=8, maximum=10)
+        limiter.on_success(1.0)
+        limiter.on_success(5.0)
+        self.assertEqual(limiter.limit, 4)
+
+    # 6. Limit stays within bounds and reports resizes
+    async def test_bounds_and_resize_callback(self):
+        sizes = []
+        limiter = ConcurrencyLimiter(initial=2, minimum=2, maximum=10, on_resize=sizes.append)
+        limiter.on_throttle()
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(sizes, [])
+
+        await limiter.acquire()
+        await limiter.acquire()
+        limiter.on_success(1.0)
+        limiter.on_success(1.0)
+        self.assertEqual(sizes, [3])
+
+    # 7. Waiters are woken when the limit grows
+    async def test_increase_wakes_waiters(self):
+        limiter = ConcurrencyLimiter(initial=1, maximum=10)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+
+        limiter.on_success(1.0)
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(limiter.in_flight, 2)
+
+    # 8. Invalid initial limits are rejected
+    def test_invalid_initial(self):
+        with self.assertRaises(ValueError):
+            ConcurrencyLimiter(initial=0, minimum=1)
@@ -0,0 +1,66 @@
+import asyncio
+import csv
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from lib.util.CsvWriter import CsvWriter
+
+
+def read_all(path):
+    with open(path, encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+class TestCsvWriter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name + "/output/threat.csv"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 1. Concurrent writers share one header and their rows are appended together
+    async def test_concurrent_writes_coalesce(self):
+        writer = CsvWriter(self.path, ("type", "sentence"))
+
+        with patch.object(writer, "_write", wraps=writer._write) as write:
+            await asyncio.gather(*(writer.write([("1", f"s{i}")]) for i in range(10)))
+            await writer.close()
+
+        rows = read_all(self.path)
+        self.assertEqual(rows[0], ["type", "sentence"])
+        self.assertEqual(sorted(rows[1:]), sorted([["1", f"s{i}"] for i in range(10)]))
+        self.assertLess(write.call_count, 10)
+        self.assertEqual(writer.written, 10)
+
+    # 2. Appending to an existing file adds no second header
+    async def test_existing_file_keeps_header(self):
+        first = CsvWriter(self.path, ("type", "sentence"))
+        await first.write([("1", "a")])
+        await first.close()
+
+        second = CsvWriter(self.path, ("type", "sentence"))
+        await second.write([("2", "b")])
+        await second.close()
+
+        self.assertEqual(read_all(self.path), [["type", "sentence"], ["1", "a"], ["2", "b"]])
+
+    # 3. Commas, quotes and newlines survive a round trip
+    async def test_quoting(self):
+        writer = CsvWriter(self.path, ("type", "sentence"))
+        sentence = 'He said "stop, now"\nthen left'
+        await writer.write([("1", sentence)])
+        await writer.close()
+
+        self.assertEqual(read_all(self.path)[1], ["1", sentence])
+
+    # 4. A failed write is raised to every caller waiting on it
+    async def test_failure_propagates(self):
+        writer = CsvWriter(self.path, ("type", "sentence"))
+
+        with patch.object(writer, "_write", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                await writer.write([("1", "a")])
+        await writer.close()
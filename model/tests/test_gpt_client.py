@@ -1,8 +1,14 @@
+import asyncio
+import tempfile
 import time
 import unittest
+
+import httpx
 import pytest
 
 from unittest.mock import patch, AsyncMock
+from openai import RateLimitError
+from lib.util.openai.FailureJournal import FailureJournal
 from lib.util.openai.GPTClient import GPTClient, parse_list_response
 from lib.util.openai.ThreadPool import ThreadPool
 
@@ -78,6 +84,9 @@ class DummyThreads:
     async def create(self):
         return DummyThread("dummy-thread-id")
 
+    async def delete(self, thread_id):
+        return None
+
     class messages:
         @staticmethod
         async def create(thread_id, role, content):
@@ -125,35 +134,7 @@ async def dummy_populate_thread_pool(self):
             previous_created_at=0,
         )
         await self._thread_queue.put(pool)
-
-
-class DummyFile:
-    def __init__(self, initial_content=""):
-        self.content = initial_content
-
-    async def seek(self, pos):
-        pass
-
-    async def read(self):
-        return self.content
-
-    async def write(self, data):
-        self.content = data
-
-    async def truncate(self):
-        pass
-
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        pass
-
-
-def dummy_aiofiles_open_file_not_found(path, mode, encoding):
-    if mode == "r+":
-        raise FileNotFoundError
-    return DummyFile()
+    self._thread_count = self._next_pool_id = self.pool_size
 
 
 def dummy_aiofiles_open_exception(path, mode, encoding):
@@ -279,18 +260,20 @@ class TestGPTClient(unittest.IsolatedAsyncioTestCase):
     # 9. Releasing a Thread (With Refresh)
     async def test_release_thread_with_refresh(self):
         dummy_pool = ThreadPool(1, DummyThread("dummy-thread-1"), completion_count=10, previous_created_at=111)
-        refreshed = False
+        deleted = []
 
-        async def fake_create_thread_pool(index, previous_created_at):
-            nonlocal refreshed
-            refreshed = True
-            return ThreadPool(index, DummyThread(f"refreshed-thread-{index}"), 0, previous_created_at)
+        async def fake_delete(thread_id):
+            deleted.append(thread_id)
 
-        with patch.object(self.client, "_create_thread_pool", fake_create_thread_pool):
+        with patch.object(self.client._client.beta.threads, "delete", fake_delete):
             while not self.client._thread_queue.empty():
                 await self.client._thread_queue.get()
             await self.client._release_thread(dummy_pool)
-            self.assertTrue(refreshed)
+            await asyncio.gather(*self.client._background_tasks)
+
+        self.assertEqual(deleted, ["dummy-thread-1"])
+        self.assertEqual(self.client._thread_count, 2)
+        self.assertTrue(self.client._thread_queue.empty())
 
     # 10. Processing Batch – Successful Response
     async def test_process_batch_success(self):
@@ -411,8 +394,8 @@ class TestGPTClient(unittest.IsolatedAsyncioTestCase):
 
             mapping = await self.client._retrieve_run(thread, run, prompt)
 
-            # Should return None due to mismatch in lengths (2 prompts, only 1 group)
-            self.assertIsNone(mapping)
+            # Nothing can be salvaged from a mismatch (2 prompts, 1 unrelated group)
+            self.assertEqual(mapping, {})
 
     # 17. Getting Response – Successful Loop (_get_response)
     async def test_get_response_success(self):
@@ -507,22 +490,31 @@ class TestGPTClient(unittest.IsolatedAsyncioTestCase):
         expected = [[], [], ["valid"]]
         self.assertEqual(result, expected)
 
-    # 24. Logging Failed Batch – File Not Found
-    async def test_log_failed_batch_file_not_found(self):
-        with patch("aiofiles.open", new=dummy_aiofiles_open_file_not_found):
-            try:
-                await self.client._log_failed_batch("run-24", "batch", "reason", "raw")
-            except Exception as e:
-                self.fail(f"Failed with exception: {e}")
+    # 24. Logging Failed Batch – Appended to the journal
+    async def test_log_failed_batch_journaled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.client.journal = FailureJournal(tmp + "/failed.jsonl")
+            await self.client._log_failed_batch("run-24", "batch", "reason", "raw")
+            await self.client._log_failed_batch("run-24b", "batch", "reason", None)
+            await self.client.journal.flush()
+
+            entries = await FailureJournal.read(tmp + "/failed.jsonl")
+            self.assertEqual([e["run_id"] for e in entries], ["run-24", "run-24b"])
+            self.assertEqual(entries[0]["client"], "dummy")
+            await self.client.journal.close()
 
     # 25. Logging Failed Batch – General File Operation Exception
     async def test_log_failed_batch_exception(self):
-        # Instead of expecting an exception (since the method swallows errors),
-        # we check that the failed counter is incremented.
+        # Write errors are swallowed by the journal; the failed counter still increments.
         original_failed = self.client.failed
-        with patch("aiofiles.open", new=dummy_aiofiles_open_exception):
+        with tempfile.TemporaryDirectory() as tmp, patch("aiofiles.open", new=dummy_aiofiles_open_exception):
+            self.client.journal = FailureJournal(tmp + "/failed.jsonl")
             await self.client._log_failed_batch("run-25", "batch", "reason", "raw")
+            await self.client.journal.flush()
+
             self.assertGreater(self.client.failed, original_failed)
+            self.assertEqual(self.client.journal.dropped, 1)
+            await self.client.journal.close()
 
     # 1. Simulated Exception in _create_message (API failure)
     async def test_exception_in_create_message(self):
@@ -551,36 +543,28 @@ class TestGPTClient(unittest.IsolatedAsyncioTestCase):
             response = await self.client.process_batch(["test prompt"])
             self.assertIsNone(response)
 
-        # 3. _log_failed_batch with malformed JSON in the log file
-
-    class DummyFileMalformed:
-        def __init__(self, initial_content="malformed json"):
-            self.content = initial_content
-
-        async def seek(self, pos):
-            pass
-
-        async def read(self):
-            return self.content
-
-        async def write(self, data):
-            self.content = data
-
-        async def truncate(self):
-            pass
-
-        async def __aenter__(self):
-            return self
-
-        async def __aexit__(self, exc_type, exc, tb):
-            pass
-
-    async def test_log_failed_batch_malformed_json(self):
-        with patch("aiofiles.open",
-                   new=lambda path, mode, encoding: TestGPTClient.DummyFileMalformed("malformed json")):
-            original_failed = self.client.failed
-            await self.client._log_failed_batch("run-malformed", "batch", "reason", "raw")
-            self.assertGreater(self.client.failed, original_failed)
+    # 3. Replaying journaled failures re-sends their sentences in bulk
+    async def test_replay_failed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.client.journal = FailureJournal(tmp + "/failed.jsonl")
+            self.client.journal.record({"client": "dummy", "run_id": "r1", "message": "a\nb"})
+            self.client.journal.record({"client": "other", "run_id": "r2", "message": "c"})
+            self.client.journal.record({"client": "dummy", "run_id": "r3", "message": "b\nd"})
+            sent = []
+
+            async def fake_process_batch(batch):
+                sent.append(batch)
+                return {sentence: [sentence + "1"] for sentence in batch}
+
+            with patch.object(self.client, "process_batch", fake_process_batch):
+                result = await self.client.replay_failed(batch_size=2)
+            await self.client.journal.flush()
+
+            self.assertEqual(sent, [["a", "b"], ["d"]])
+            self.assertEqual(result, {"a": ["a1"], "b": ["b1"], "d": ["d1"]})
+            remaining = await FailureJournal.read(tmp + "/failed.jsonl")
+            self.assertEqual([e["run_id"] for e in remaining], ["r2"])
+            await self.client.journal.close()
 
     # 4. Parsing Unexpected Structure (dictionary-like content instead of groups)
     async def test_parse_model_response_unexpected_structure(self):
@@ -597,6 +581,217 @@ class TestGPTClient(unittest.IsolatedAsyncioTestCase):
         expected = [[]]
         self.assertEqual(result, expected)
 
+    # 6. Shrinking the concurrency limit retires surplus threads on release
+    async def test_release_thread_retires_surplus(self):
+        self.client._thread_count = 3
+        self.client._resize_thread_pool(2)
+        while not self.client._thread_queue.empty():
+            await self.client._thread_queue.get()
+
+        await self.client._release_thread(ThreadPool(0, DummyThread("dummy-thread-0")))
+        self.assertTrue(self.client._thread_queue.empty())
+        self.assertEqual(self.client._thread_count, 2)
+
+    # 7. Growing the concurrency limit creates threads as batches wait for them
+    async def test_resize_thread_pool_grows(self):
+        while not self.client._thread_queue.empty():
+            await self.client._thread_queue.get()
+
+        self.client._resize_thread_pool(5)
+        self.assertEqual(self.client._thread_count, 3)
+
+        waiters = [asyncio.create_task(self.client._get_available_thread()) for _ in range(2)]
+        pools = await asyncio.gather(*waiters)
+
+        self.assertEqual(self.client._thread_count, 5)
+        self.assertEqual(len(pools), 2)
+        self.assertEqual(self.client._thread_queue.qsize(), 0)
+
+    # 8. Rate limit errors reduce the concurrency limit
+    async def test_rate_limit_error_decreases_limit(self):
+        error = RateLimitError("Rate limited", response=httpx.Response(429, request=httpx.Request("POST", "http://x")), body=None)
+
+        async def fake_create_message_rate_limited(thread, message):
+            raise error
+
+        with patch.object(self.client, "_create_message", fake_create_message_rate_limited):
+            await self.client._thread_queue.put(ThreadPool(0, DummyThread("dummy-thread-429")))
+            response = await self.client.process_batch(["test prompt"])
+
+        self.assertIsNone(response)
+        self.assertEqual(self.client.limiter.limit, 1)
+
+    # 9. Threads whose run is known to be terminal are released without an API call
+    async def test_release_thread_terminal_status(self):
+        dummy_pool = ThreadPool(0, DummyThread("dummy-thread-0"), active_run_id="run-9", run_status="completed")
+        while not self.client._thread_queue.empty():
+            await self.client._thread_queue.get()
+
+        with patch.object(self.client, "_retrieve_status", new=AsyncMock()) as retrieve:
+            await self.client._release_thread(dummy_pool)
+            retrieve.assert_not_called()
+
+        pool = await self.client._get_available_thread()
+        self.assertEqual(pool, dummy_pool)
+        self.assertIsNone(pool.active_run_id)
+
+    # 10. Threads with a run still active are cancelled and replaced
+    async def test_release_thread_active_run_refreshes(self):
+        dummy_pool = ThreadPool(1, DummyThread("dummy-thread-1"), active_run_id="run-10")
+        refreshed = False
+
+        async def fake_retrieve(thread_id, run_id):
+            return DummyRun(run_id, time.time(), status="in_progress")
+
+        async def fake_cancel(thread_id, run_id):
+            return DummyRun(run_id, time.time(), status="cancelling")
+
+        async def fake_wait(thread_id, run_id, timeout):
+            return DummyRun(run_id, time.time(), status="in_progress")
+
+        async def fake_refresh_thread(thread):
+            nonlocal refreshed
+            refreshed = True
+
+        with patch.object(self.client, "_retrieve_status", fake_retrieve), \
+                patch.object(self.client._client.beta.threads.runs, "cancel", fake_cancel, create=True), \
+                patch.object(self.client._poller, "wait", fake_wait), \
+                patch.object(self.client, "_refresh_thread", fake_refresh_thread):
+            await self.client._release_thread(dummy_pool)
+
+        self.assertTrue(refreshed)
+
+    # 11. Mismatched responses keep the groups that align to their sentences
+    async def test_retrieve_run_partial_salvage(self):
+        async def fake_get_response(thread, run, prompt):
+            return True
+
+        async def fake_get_message_response(thread, run, prompt):
+            return "the cat sat on the mat\nthe cat is sitting on the mat\n\nextra stray group\n\nanother stray group"
+
+        with patch.object(self.client, "_get_response", fake_get_response), \
+                patch.object(self.client, "_get_message_response", fake_get_message_response):
+            mapping = await self.client._retrieve_run(
+                DummyThread("thread-11"), DummyRun("run-11", time.time()),
+                "the cat sat on the mat\ndogs bark loudly at night"
+            )
+
+        self.assertEqual(mapping, {"the cat sat on the mat": ["the cat sat on the mat", "the cat is sitting on the mat"]})
+
+    # 12. Unresolved sentences are bisected and re-submitted until isolated
+    async def test_process_batch_bisects_unresolved(self):
+        sent = []
+
+        async def fake_dispatch(batch, on_result=None):
+            sent.append(batch)
+            # "bad" never gets a response group; everything else does
+            return {sentence: [sentence + "1"] for sentence in batch if sentence != "bad"} if len(sent) > 1 else {}
+
+        with patch.object(self.client, "_dispatch", fake_dispatch), \
+                patch.object(self.client, "_log_failed_batch", new=AsyncMock()) as log_failed:
+            result = await self.client.process_batch(["a", "b", "bad", "c"])
+
+        self.assertEqual(result, {"a": ["a1"], "b": ["b1"], "c": ["c1"]})
+        self.assertEqual(sent[0], ["a", "b", "bad", "c"])
+        self.assertEqual(sent[1:3], [["a", "b"], ["bad", "c"]])
+        self.assertIn(["bad"], sent)
+        log_failed.assert_awaited_once()
+
+    # 13. Outright failures are not bisected
+    async def test_process_batch_failure_not_bisected(self):
+        sent = []
+
+        async def fake_dispatch(batch, on_result=None):
+            sent.append(batch)
+            return None
+
+        with patch.object(self.client, "_dispatch", fake_dispatch):
+            self.assertIsNone(await self.client.process_batch(["a", "b"]))
+        self.assertEqual(len(sent), 1)
+
+    # 14. Only the first thread is created up front, the rest concurrently on demand
+    async def test_thread_pool_grows_lazily_and_concurrently(self):
+        self.thread_pool_patch.stop()
+        client = GPTClient("dummy", "dummy-model", "dummy-system", pool_size=4)
+        client._client = DummyClient()
+        in_flight = peak = 0
+
+        async def slow_create():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return DummyThread("dummy-thread")
+
+        with patch.object(client._client.beta.threads, "create", slow_create):
+            await client._populate_thread_pool()
+            self.assertEqual(client._thread_count, 1)
+
+            pools = await asyncio.gather(*(client._get_available_thread() for _ in range(4)))
+
+        self.assertEqual(len(pools), 4)
+        self.assertEqual(client._thread_count, 4)
+        self.assertEqual(peak, 3)
+
+    # 15. Concurrent batches share one call for the sentences they have in common
+    async def test_process_batch_coalesces_in_flight_sentences(self):
+        sent = []
+        release = asyncio.Event()
+
+        async def fake_dispatch(batch, on_result=None):
+            sent.append(batch)
+            await release.wait()
+            response = {sentence: [sentence + "1"] for sentence in batch}
+            GPTClient._deliver(response, on_result)
+            return response
+
+        delivered = {}
+        with patch.object(self.client, "_dispatch", fake_dispatch):
+            first = asyncio.create_task(self.client.process_batch(["a", "b"]))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(self.client.process_batch(["b", "c"], delivered.__setitem__))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(first, second)
+
+        self.assertEqual(sent, [["a", "b"], ["c"]])
+        self.assertEqual(results, [{"a": ["a1"], "b": ["b1"]}, {"b": ["b1"], "c": ["c1"]}])
+        self.assertEqual(delivered, {"b": ["b1"], "c": ["c1"]})
+        self.assertEqual(self.client._in_flight, {})
+
+    # 16. A failed call resolves its sentences to nothing for every waiting batch
+    async def test_process_batch_coalesced_failure_fans_out(self):
+        release = asyncio.Event()
+
+        async def fake_dispatch(batch, on_result=None):
+            await release.wait()
+            return None if "a" in batch else {sentence: [sentence + "1"] for sentence in batch}
+
+        with patch.object(self.client, "_dispatch", fake_dispatch):
+            first = asyncio.create_task(self.client.process_batch(["a"]))
+            await asyncio.sleep(0)
+            joined_only = asyncio.create_task(self.client.process_batch(["a"]))
+            partial = asyncio.create_task(self.client.process_batch(["a", "b"]))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(first, joined_only, partial)
+
+        self.assertEqual(results, [None, None, {"b": ["b1"]}])
+
+
+    # 17. A batch that comes back with no groups counts against the circuit breaker
+    async def test_dispatch_empty_response_is_a_breaker_failure(self):
+        recorded = []
+
+        async def fake_hedge(batch, estimate, on_result):
+            return {}
+
+        with patch.object(self.client, "_hedge", fake_hedge), \
+                patch.object(self.client.breaker, "record", recorded.append):
+            await self.client._dispatch(["a"])
+
+        self.assertEqual(recorded, [False])
 
 def main():
     unittest.main()
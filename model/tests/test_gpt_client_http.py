@@ -0,0 +1,266 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from openai import AsyncOpenAI
+
+from lib.util.openai.CircuitBreaker import CircuitBreaker, BreakerState
+from lib.util.openai.FailureJournal import FailureJournal
+from lib.util.openai.GPTClient import GPTClient
+from lib.util.openai.HedgePolicy import HedgePolicy
+from lib.util.openai.StructuredResponse import ResponseFormat
+from lib.util.openai.WarmState import WarmState
+from tests.fake_openai_server import FakeOpenAIServer, echo_responder, fixed
+
+
+class TestGPTClientOverHttp(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeOpenAIServer(seed=0).start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    async def make_client(self, pool_size: int = 2, max_retries: int = 2,
+                          response_format: ResponseFormat = ResponseFormat.TEXT, stream: bool = False) -> GPTClient:
+        client = GPTClient(
+            "dummy", "dummy-model", "dummy-system", pool_size, response_format=response_format, stream=stream
+        )
+        client.journal = FailureJournal(os.path.join(self.tmp.name, "failed.jsonl"))
+        client._client = AsyncOpenAI(api_key="test", base_url=self.server.url, max_retries=max_retries)
+        await client._create_assistant()
+        await client._populate_thread_pool()
+        return client
+
+    # 1. Batches round trip through messages, runs and message listing
+    async def test_process_batch_round_trip(self):
+        client = await self.make_client()
+
+        result = await client.process_batch(["one", "two"])
+        await client.close()
+
+        self.assertEqual(result, {"one": ["one (rewritten)"], "two": ["two (rewritten)"]})
+        self.assertEqual(self.server.calls["assistants.create"], 1)
+        self.assertEqual(self.server.calls["threads.create"], 1)
+        self.assertEqual(self.server.calls["messages.create"], 1)
+        self.assertEqual(self.server.calls["runs.create"], 1)
+
+    # 2. Injected 429s fail the batch and reduce the concurrency limit
+    async def test_rate_limits_reduce_concurrency(self):
+        client = await self.make_client(pool_size=4, max_retries=0)
+        self.server.rate_limit_rate = 1.0
+
+        result = await client.process_batch(["one"])
+        await client.close()
+
+        self.assertIsNone(result)
+        self.assertLess(client.limiter.limit, 4)
+
+    # 3. Malformed responses are salvaged by alignment and bisection
+    async def test_malformed_responses_are_resolved(self):
+        client = await self.make_client()
+        self.server.malformed_rate = 1.0
+        batch = ["alpha one", "beta two", "gamma three", "delta four"]
+
+        result = await client.process_batch(batch)
+        await client.close()
+
+        self.assertEqual(result, {sentence: [f"{sentence} (rewritten)"] for sentence in batch})
+        self.assertGreater(self.server.calls["runs.create"], 1)
+
+    # 4. A restart with an unchanged fingerprint reuses the assistant and threads
+    async def test_restart_reuses_warm_state(self):
+        def warm_state():
+            return WarmState("dummy", os.path.join(self.tmp.name, "state"))
+
+        with patch("lib.util.openai.GPTClient.AsyncOpenAI", self.openai_client):
+            client = await GPTClient.create("dummy", "dummy-model", "dummy-system", 2, warm_state=warm_state())
+            await client.process_batch(["one"])
+            await client.close()
+            calls = dict(self.server.calls)
+
+            restarted = await GPTClient.create("dummy", "dummy-model", "dummy-system", 2, warm_state=warm_state())
+            result = await restarted.process_batch(["two"])
+            await restarted.close()
+
+        self.assertEqual(result, {"two": ["two (rewritten)"]})
+        self.assertEqual(self.server.calls["assistants.list"], calls["assistants.list"])
+        self.assertEqual(self.server.calls["threads.create"], calls["threads.create"])
+        self.assertEqual(self.server.calls["assistants.retrieve"], 1)
+
+    # 5. A changed prompt falls back to discovery and fresh threads
+    async def test_restart_with_new_prompt_rediscovers(self):
+        state = WarmState("dummy", os.path.join(self.tmp.name, "state"))
+
+        with patch("lib.util.openai.GPTClient.AsyncOpenAI", self.openai_client):
+            client = await GPTClient.create("dummy", "dummy-model", "dummy-system", 2, warm_state=state)
+            await client.close()
+            restarted = await GPTClient.create("dummy", "dummy-model", "new-system", 2, warm_state=state)
+            await restarted.close()
+
+        self.assertEqual(self.server.calls["assistants.list"], 2)
+        self.assertEqual(self.server.calls["assistants.update"], 1)
+        self.assertEqual(self.server.calls["threads.create"], 2)
+        self.assertNotIn("assistants.retrieve", self.server.calls)
+
+    # 6. Structured responses map rewrites to sentences by index
+    async def test_structured_round_trip(self):
+        client = await self.make_client(response_format=ResponseFormat.JSON)
+
+        result = await client.process_batch(["one", "two: with a colon"])
+        await client.close()
+
+        self.assertEqual(result, {"one": ["one (rewritten)"], "two: with a colon": ["two: with a colon (rewritten)"]})
+        self.assertEqual(self.server.calls["runs.create"], 1)
+
+    # 7. Structured responses missing entries or cut short are re-submitted, never misattributed
+    async def test_structured_malformed_responses_are_resubmitted(self):
+        client = await self.make_client(response_format=ResponseFormat.JSON)
+        self.server.malformed_rate = 1.0
+        batch = ["alpha one", "beta two", "gamma three", "delta four"]
+
+        result = await client.process_batch(batch) or {}
+        await client.close()
+
+        self.assertGreater(self.server.calls["runs.create"], 1)
+        for sentence, rewrites in result.items():
+            self.assertEqual(rewrites, [f"{sentence} (rewritten)"])
+
+    # 8. Streamed runs hand each sentence over while the rest is still being generated
+    async def test_streamed_results_arrive_before_run_completes(self):
+        client = await self.make_client(stream=True)
+        self.server.run_seconds = fixed(0.5)
+        batch = ["alpha one", "beta two", "gamma three", "delta four"]
+        arrivals: dict[str, float] = {}
+
+        def on_result(sentence, rewrites):
+            arrivals[sentence] = time.monotonic()
+
+        start = time.monotonic()
+        result = await client.process_batch(batch, on_result)
+        finished = time.monotonic()
+        await client.close()
+
+        self.assertEqual(result, {sentence: [f"{sentence} (rewritten)"] for sentence in batch})
+        self.assertEqual(set(arrivals), set(batch))
+        self.assertLess(arrivals["alpha one"] - start, (finished - start) / 2)
+        self.assertNotIn("runs.retrieve", self.server.calls)
+        self.assertNotIn("messages.list", self.server.calls)
+
+    # 9. Streamed groups that drift out of position are never delivered to the wrong sentence
+    async def test_streamed_malformed_responses_are_not_misattributed(self):
+        client = await self.make_client(stream=True)
+        self.server.malformed_rate = 1.0
+        batch = ["alpha one", "beta two", "gamma three", "delta four"]
+        delivered: dict[str, list[str]] = {}
+
+        result = await client.process_batch(batch, delivered.__setitem__)
+        await client.close()
+
+        self.assertEqual(result, {sentence: [f"{sentence} (rewritten)"] for sentence in batch})
+        self.assertEqual(delivered, result)
+
+    # 10. A run stuck past the hedge percentile is duplicated, and the loser is cancelled
+    async def test_stuck_run_is_hedged(self):
+        client = await self.make_client()
+        client.hedging = HedgePolicy(0.5, min_samples=1, max_ratio=1.0)
+        client.hedging.observe(0.1)
+        run_seconds = iter([30.0, 0.0])
+        self.server.run_seconds = lambda: next(run_seconds)
+
+        start = time.monotonic()
+        result = await client.process_batch(["one"])
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(1)  # The loser's run is cancelled as its thread is released
+        await client.close()
+
+        self.assertEqual(result, {"one": ["one (rewritten)"]})
+        self.assertLess(elapsed, 5)
+        self.assertEqual(self.server.calls["runs.create"], 2)
+        self.assertEqual(self.server.calls["runs.cancel"], 1)
+
+    # 11. Once most batches fail the circuit opens and further batches never reach the API
+    async def test_circuit_opens_on_error_spike(self):
+        client = await self.make_client(max_retries=0)
+        client.breaker = CircuitBreaker(min_calls=4)
+        self.server.server_error_rate = 1.0
+
+        for i in range(4):
+            await client.process_batch([f"sentence {i}"])
+        calls = self.server.total_calls
+        result = await client.process_batch(["one more"])
+        await client.close()
+
+        self.assertIsNone(result)
+        self.assertEqual(self.server.total_calls, calls)
+        self.assertIs(client.breaker.state, BreakerState.OPEN)
+
+    # 12. A streamed group missing its first sentence's rewrites is not handed to a near-identical sentence
+    async def test_streamed_near_identical_sentences_are_not_misattributed(self):
+        client = await self.make_client(stream=True)
+        self.server.responder = lambda sentences: echo_responder(sentences[1:])
+        batch = [f"You never listen when I talk about my {topic}" for topic in ("day", "work", "family")]
+        delivered: dict[str, list[str]] = {}
+
+        result = await client.process_batch(batch, delivered.__setitem__)
+        await client.close()
+
+        self.assertNotIn(batch[0], result or {})
+        self.assertNotIn(batch[0], delivered)
+        for sentence, rewrites in delivered.items():
+            self.assertEqual(rewrites, [f"{sentence} (rewritten)"])
+
+    # 13. A restored thread deleted since the last run is dropped before any batch is sent to it
+    async def test_restart_drops_deleted_threads(self):
+        def warm_state():
+            return WarmState("dummy", os.path.join(self.tmp.name, "state"))
+
+        with patch("lib.util.openai.GPTClient.AsyncOpenAI", self.openai_client):
+            client = await GPTClient.create("dummy", "dummy-model", "dummy-system", 2, warm_state=warm_state())
+            await client.process_batch(["one"])
+            await client.close()
+            self.server.threads.clear()
+
+            restarted = await GPTClient.create("dummy", "dummy-model", "dummy-system", 2, warm_state=warm_state())
+            result = await restarted.process_batch(["two"])
+            await restarted.close()
+
+        self.assertEqual(result, {"two": ["two (rewritten)"]})
+        self.assertGreaterEqual(self.server.calls["threads.retrieve"], 1)
+        self.assertEqual(restarted.failed, 0)
+
+    # 14. Groups streamed before a run times out are kept, and only the rest is sent again
+    async def test_streamed_groups_survive_a_timed_out_run(self):
+        client = await self.make_client(stream=True)
+        client.hedging = None
+        run_seconds = iter([4.0] + [0.0] * 10)
+        self.server.run_seconds = lambda: next(run_seconds)
+        batch = ["alpha one", "beta two", "gamma three", "delta four"]
+
+        with patch("lib.util.openai.GPTClient._TIMEOUT_SECS", 2):
+            result = await client.process_batch(batch)
+        await client.close()
+
+        self.assertEqual(result, {sentence: [f"{sentence} (rewritten)"] for sentence in batch})
+        self.assertEqual(await FailureJournal.read(client.journal.path) if client.journal.path.exists() else [], [])
+        self.assertGreater(self.server.calls["runs.create"], 1)
+
+    # 15. Whatever the alignment of the full message, the result matches what was delivered early
+    async def test_streamed_results_match_deliveries(self):
+        client = await self.make_client(stream=True)
+        self.server.malformed_rate = 0.5
+        batches = [[f"{word} sentence number {i}" for word in ("alpha", "beta", "gamma")] for i in range(8)]
+
+        for batch in batches:
+            delivered: dict[str, list[str]] = {}
+            result = await client.process_batch(batch, delivered.__setitem__)
+            self.assertEqual(delivered, result or {})
+        await client.close()
+
+    def openai_client(self, api_key=None, organization=None):
+        return AsyncOpenAI(api_key="test", base_url=self.server.url)
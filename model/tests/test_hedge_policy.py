@@ -0,0 +1,36 @@
+import unittest
+
+from lib.util.openai.HedgePolicy import HedgePolicy
+
+
+class TestHedgePolicy(unittest.TestCase):
+
+    # 1. No hedging until enough latencies have been seen
+    def test_no_delay_without_history(self):
+        policy = HedgePolicy(0.9, min_samples=5)
+        for latency in range(4):
+            policy.observe(latency)
+        self.assertIsNone(policy.delay())
+
+    # 2. The delay is the configured percentile of recent latencies
+    def test_delay_is_percentile(self):
+        policy = HedgePolicy(0.9, min_samples=5)
+        for latency in range(1, 101):
+            policy.observe(float(latency))
+        self.assertEqual(policy.delay(), 91.0)
+
+    # 3. Hedges are capped at a share of completed batches
+    def test_hedges_are_rationed(self):
+        policy = HedgePolicy(0.9, min_samples=1, max_ratio=0.1)
+        for _ in range(20):
+            policy.observe(1.0)
+
+        self.assertTrue(policy.try_hedge())
+        self.assertTrue(policy.try_hedge())
+        self.assertFalse(policy.try_hedge())
+        self.assertEqual(policy.hedges, 2)
+
+    # 4. Percentiles outside (0, 1) are rejected
+    def test_invalid_percentile(self):
+        with self.assertRaises(ValueError):
+            HedgePolicy(1.0)
@@ -1,6 +1,7 @@
 import unittest
 from typing import List
-from lib.util.list_extensions import group_by, chunked, parse_list_response
+from lib.util.list_extensions import group_by, chunked, packed, parse_list_response, align_groups, ListResponseParser, \
+    is_rewrite_of
 
 
 # TODO -> Separate out tests properly
@@ -154,6 +155,50 @@ class TestChunked(unittest.TestCase):
             list(chunked(values, "two"))  # type: ignore
 
 
+class TestPacked(unittest.TestCase):
+
+    def test_fills_chunks_up_to_max_weight(self):
+        values = [5, 5, 5, 5]
+        result = packed(values, lambda x: x, 10, 25)
+        self.assertEqual(result, [[5, 5], [5, 5]])
+
+    def test_heavy_and_light_values_share_chunks(self):
+        values = [1, 9, 2, 8, 3, 7]
+        result = packed(values, lambda x: x, 10, 25)
+        self.assertEqual(result, [[9, 1], [8, 2], [7, 3]])
+
+    def test_max_items_caps_chunk_length(self):
+        values = [1] * 7
+        result = packed(values, lambda x: x, 100, 3)
+        self.assertEqual([len(chunk) for chunk in result], [3, 3, 1])
+
+    def test_oversized_value_gets_own_chunk(self):
+        values = [50, 2, 3]
+        result = packed(values, lambda x: x, 10, 25)
+        self.assertEqual(result, [[50], [3, 2]])
+
+    def test_every_value_is_packed_once(self):
+        values = list(range(1, 30))
+        result = packed(values, lambda x: x, 30, 4)
+        self.assertEqual(sorted(v for chunk in result for v in chunk), values)
+        self.assertTrue(all(sum(chunk) <= 30 and len(chunk) <= 4 for chunk in result))
+
+    def test_empty_list(self):
+        self.assertEqual(packed([], lambda x: x, 10, 5), [])
+
+    def test_max_items_zero_raises(self):
+        with self.assertRaises(ValueError):
+            packed([1, 2], lambda x: x, 10, 0)
+
+    def test_max_weight_zero_raises(self):
+        with self.assertRaises(ValueError):
+            packed([1, 2], lambda x: x, 0, 5)
+
+    def test_non_integer_max_items_raises(self):
+        with self.assertRaises(TypeError):
+            packed([1, 2], lambda x: x, 10, "five")  # type: ignore
+
+
 class TestParseListResponse(unittest.TestCase):
 
     def test_single_group_single_line(self):
@@ -220,3 +265,77 @@ class TestParseListResponse(unittest.TestCase):
         response = "  line1  \n  line2  \n\n null \n\n  line3  "
         expected = [["line1", "line2"], [], ["line3"]]
         self.assertEqual(parse_list_response(response), expected)
+
+
+class TestListResponseParser(unittest.TestCase):
+
+    def feed_all(self, text, step):
+        parser = ListResponseParser()
+        groups = []
+        for i in range(0, len(text), step):
+            groups.extend(parser.feed(text[i:i + step]))
+        return groups + parser.close()
+
+    def test_matches_parse_list_response_for_any_split(self):
+        for text in ["a\nb\n\nc", "  a\n\n\n\nb\n\n", "a\nnull\n\nb\n", "", "single"]:
+            for step in (1, 2, 5, 100):
+                with self.subTest(text=text, step=step):
+                    self.assertEqual(self.feed_all(text, step), parse_list_response(text))
+
+    def test_group_returned_once_next_group_starts(self):
+        parser = ListResponseParser()
+        self.assertEqual(parser.feed("a1\na2\n\n"), [])
+        self.assertEqual(parser.feed("b"), [["a1", "a2"]])
+        self.assertEqual(parser.feed("1\n"), [])
+        self.assertEqual(parser.close(), [["b1"]])
+
+    def test_null_group_is_empty(self):
+        parser = ListResponseParser()
+        self.assertEqual(parser.feed("NULL\n\nb"), [[]])
+
+
+class TestAlignGroups(unittest.TestCase):
+
+    def test_equal_counts_zip(self):
+        self.assertEqual(align_groups(["a", "b"], [["x"], ["y"]]), {0: 0, 1: 1})
+
+    def test_missing_group_is_left_unaligned(self):
+        sentences = ["you never listen to me", "i will leave you", "this is all your fault"]
+        groups = [["you never ever listen to me"], ["this is entirely your fault"]]
+        self.assertEqual(align_groups(sentences, groups), {0: 0, 2: 1})
+
+    def test_split_group_aligns_best_half(self):
+        sentences = ["you never listen to me", "this is all your fault"]
+        groups = [["you never listen to me"], ["honestly you never listen"], ["this is all your fault"]]
+        self.assertEqual(align_groups(sentences, groups), {1: 2})
+
+    def test_ambiguous_sentences_are_not_aligned(self):
+        sentences = ["you always forget my birthday", "my birthday you always forget"]
+        groups = [["you always forget my birthday"]]
+        self.assertEqual(align_groups(sentences, groups), {})
+
+    def test_null_groups_do_not_align(self):
+        sentences = ["you never listen to me", "leave now"]
+        groups = [[], [], ["you never listen to me"]]
+        self.assertEqual(align_groups(sentences, groups), {0: 2})
+
+    def test_unrelated_groups(self):
+        self.assertEqual(align_groups(["sentence1", "sentence2"], [["rewrite1", "rewrite2"]]), {})
+
+
+class TestIsRewriteOf(unittest.TestCase):
+
+    def test_shared_words(self):
+        self.assertTrue(is_rewrite_of("you never listen to me", ["you never ever listen"]))
+        self.assertFalse(is_rewrite_of("you never listen to me", ["leave now"]))
+
+    def test_closer_rival_rejects(self):
+        sentences = [
+            "You never listen when I talk about my day",
+            "You never listen when I talk about my work",
+            "You never listen when I talk about my family",
+        ]
+        group = ["You never listen when I talk about my work, honestly"]
+        self.assertTrue(is_rewrite_of(sentences[0], group))
+        self.assertFalse(is_rewrite_of(sentences[0], group, rivals=sentences[1:]))
+        self.assertTrue(is_rewrite_of("you never listen to me", ["you never ever listen"], rivals=["this is all your fault"]))
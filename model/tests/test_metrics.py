@@ -0,0 +1,126 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from lib.util.Metrics import MetricsRegistry, MetricsExporter
+from lib.util.openai.GPTClient import GPTClient, _BATCHES, _THREAD_WAIT
+from lib.util.openai.ThreadPool import ThreadPool
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    # 1. Counters accumulate per label set
+    def test_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("failures_total", "Failures", ("reason",))
+        counter.inc(reason="timeout")
+        counter.inc(2, reason="timeout")
+        counter.inc(reason="mismatch")
+
+        self.assertEqual(counter.value(reason="timeout"), 3)
+        self.assertEqual(counter.value(reason="mismatch"), 1)
+        self.assertIs(registry.counter("failures_total", "Failures", ("reason",)), counter)
+
+    # 2. Registering a name twice with another type fails
+    def test_type_conflict(self):
+        registry = MetricsRegistry()
+        registry.counter("metric", "A counter")
+        with self.assertRaises(ValueError):
+            registry.histogram("metric", "A histogram")
+
+    # 3. Histogram quantiles interpolate within buckets
+    def test_histogram_quantiles(self):
+        histogram = MetricsRegistry().histogram("latency_seconds", "Latency", buckets=(1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count(), 5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.75)
+        self.assertEqual(histogram.quantile(0.99), 4)
+        self.assertIsNone(MetricsRegistry().histogram("empty", "Empty").quantile(0.5))
+
+    # 4. Prometheus text exposes cumulative buckets, sum and count
+    def test_prometheus_text(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", ("call",), buckets=(1, 2))
+        histogram.observe(0.5, call="run")
+        histogram.observe(1.5, call="run")
+        registry.counter("failures_total", "Failures", ("reason",)).inc(reason='say "hi"')
+
+        text = registry.prometheus_text()
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{call="run",le="1"} 1', text)
+        self.assertIn('latency_seconds_bucket{call="run",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_sum{call="run"} 2', text)
+        self.assertIn('latency_seconds_count{call="run"} 2', text)
+        self.assertIn('failures_total{reason="say \\"hi\\""} 1', text)
+
+    # 5. Timers observe elapsed time
+    def test_timer(self):
+        histogram = MetricsRegistry().histogram("timed_seconds", "Timed")
+        with histogram.timer():
+            time.sleep(0.01)
+        self.assertEqual(histogram.count(), 1)
+
+
+class TestMetricsExporter(unittest.IsolatedAsyncioTestCase):
+
+    # 6. Metrics are served over HTTP and written as JSON snapshots
+    async def test_endpoint_and_snapshot(self):
+        registry = MetricsRegistry()
+        registry.counter("batches_total", "Batches").inc(4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            exporter = MetricsExporter(registry, port=0, snapshot_path=tmp + "/metrics.json", interval=0.01)
+            await exporter.start()
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", exporter.port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = (await reader.read()).decode("utf-8")
+            writer.close()
+
+            await asyncio.sleep(0.05)
+            await exporter.close()
+            with open(tmp + "/metrics.json", encoding="utf-8") as f:
+                snapshot = json.load(f)
+
+        self.assertTrue(response.startswith("HTTP/1.1 200 OK"))
+        self.assertIn("batches_total 4", response)
+        self.assertEqual(snapshot["counters"]["batches_total"], [{"labels": {}, "value": 4}])
+
+    # 7. Unknown paths are not found
+    async def test_unknown_path(self):
+        exporter = await MetricsExporter(MetricsRegistry(), port=0).start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", exporter.port)
+        writer.write(b"GET /other HTTP/1.1\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        await exporter.close()
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 404"))
+
+
+class TestGPTClientMetrics(unittest.IsolatedAsyncioTestCase):
+
+    # 8. Batches and thread waits are recorded per client
+    async def test_process_batch_records_metrics(self):
+        client = GPTClient("metrics-dummy", "model", "system", pool_size=1)
+        client._client = object()
+        client._assistant = object()
+        await client._thread_queue.put(ThreadPool(0, object()))
+
+        async def fake_create_message(thread, message):
+            return None
+
+        async def fake_create_run(thread):
+            raise RuntimeError("Simulated create run failure")
+
+        with patch.object(client, "_create_message", fake_create_message), \
+                patch.object(client, "_create_run", fake_create_run):
+            self.assertIsNone(await client.process_batch(["sentence"]))
+
+        self.assertEqual(_BATCHES.value(client="metrics-dummy", outcome="error"), 1)
+        self.assertEqual(_THREAD_WAIT.count(client="metrics-dummy"), 1)
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from lib.augment import Augmentation as augmentation_module
+from lib.augment.Augmentation import Augmentation
+from lib.augment.AugmentType import AugmentationType
+from lib.augment.Pipeline import AugmentationPipeline
+from lib.augment.Progress import ProgressManifest
+from tests.test_augmentation import DummyGPTClient, read_rows
+
+_STAGES = (AugmentationType.EMOTIONAL_TONE, AugmentationType.PERSPECTIVE_FLIP, AugmentationType.POLARITY_ADJUST)
+
+
+class TimedGPTClient(DummyGPTClient):
+    """Rewrites by tagging each sentence with its stage, recording when every batch ran."""
+
+    def __init__(self, tag: str, delay: float = 0.0):
+        super().__init__()
+        self.tag = tag
+        self.delay = delay
+        self.spans: list[tuple[float, float]] = []
+
+    async def process_batch(self, batch, on_result=None):
+        start = time.monotonic()
+        self.batches.append(batch)
+        await asyncio.sleep(self.delay)
+        self.spans.append((start, time.monotonic()))
+        return {sentence: [f"{sentence} {self.tag}"] for sentence in batch}
+
+
+class TestAugmentationPipeline(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = self.tmp.name + "/input/"
+        os.makedirs(self.input_dir)
+        with open(self.input_dir + "threat.csv", "w", encoding="utf-8") as f:
+            f.write("type,sentence\n" + "".join(f'1,"s{i}"\n' for i in range(8)) + '2,"t0"\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_pipeline(self, delay: float = 0.0) -> tuple[AugmentationPipeline, list[TimedGPTClient]]:
+        augmentations, clients = [], []
+        for index, aug_type in enumerate(_STAGES):
+            augmentation = Augmentation(aug_type)
+            augmentation.input_path = augmentations[-1].output_path if augmentations else self.input_dir
+            augmentation.output_path = f"{self.tmp.name}/{aug_type.name.lower()}/"
+            augmentation.skipped_path = f"{self.tmp.name}/skipped/{aug_type.name.lower()}/"
+            augmentation.progress = ProgressManifest(f"{self.tmp.name}/progress/{aug_type.name.lower()}.jsonl")
+            client = TimedGPTClient(str(index), delay)
+
+            async def fake_create_gpt_client(augmentation=augmentation, client=client):
+                augmentation.gpt_client = client
+
+            augmentation.create_gpt_client = fake_create_gpt_client
+            augmentations.append(augmentation)
+            clients.append(client)
+
+        return AugmentationPipeline(augmentations, workers=2), clients
+
+    # 1. Every stage's rows, originals and rewrites, flow through the later stages once each
+    async def test_rows_flow_through_every_stage(self):
+        pipeline, clients = self.make_pipeline()
+
+        with patch("lib.augment.Pipeline.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 3):
+            await pipeline.run()
+
+        sent = [sorted(sentence for batch in client.batches for sentence in batch) for client in clients]
+        self.assertEqual(len(sent[0]), 9)
+        self.assertEqual(len(sent[1]), 18)
+        self.assertEqual(len(sent[2]), 36)
+        self.assertEqual(len(set(sent[2])), 36)
+
+        final = read_rows(pipeline.stages[-1].augmentation.output_path + "threat.csv")
+        self.assertIn(["1", "s0 0 1 2"], final)
+        self.assertIn(["2", "t0 2"], final)
+
+    # 2. Later stages start while earlier ones are still working
+    async def test_stages_overlap(self):
+        pipeline, clients = self.make_pipeline(delay=0.02)
+
+        with patch("lib.augment.Pipeline.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 2):
+            await pipeline.run()
+
+        first_stage_end = max(end for _, end in clients[0].spans)
+        second_stage_start = min(start for start, _ in clients[1].spans)
+        self.assertLess(second_stage_start, first_stage_end)
+
+    # 3. A restart picks up each stage where it stopped, including upstream rows it never received
+    async def test_restart_resumes_every_stage(self):
+        pipeline, clients = self.make_pipeline()
+
+        async def interrupted(batch, on_result=None):
+            raise ConnectionError("interrupted")
+
+        clients[1].process_batch = interrupted
+        with patch("lib.augment.Pipeline.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 3):
+            await pipeline.run()
+
+            pipeline, clients = self.make_pipeline()
+            await pipeline.run()
+
+        self.assertEqual(clients[0].batches, [])
+        self.assertEqual(sum(len(batch) for batch in clients[1].batches), 18)
+        self.assertEqual(sum(len(batch) for batch in clients[2].batches), 36)
+        self.assertEqual(len(read_rows(pipeline.stages[0].augmentation.output_path + "threat.csv")), 18)
+        self.assertIn(["1", "s0 0 1 2"], read_rows(pipeline.stages[-1].augmentation.output_path + "threat.csv"))
+
+    # 4. Input added after a complete run goes through every stage alone
+    async def test_new_input_is_incremental(self):
+        pipeline, _ = self.make_pipeline()
+        with patch("lib.augment.Pipeline.ELEMENT_PATHS", {None: "threat"}), \
+                patch("lib.augment.Augmentation.MAX_PER_REQUEST", 3):
+            await pipeline.run()
+
+            with open(self.input_dir + "threat.csv", "a", encoding="utf-8") as f:
+                f.write('2,"t1"\n')
+            pipeline, clients = self.make_pipeline()
+            await pipeline.run()
+
+        self.assertEqual([sorted(s for batch in client.batches for s in batch) for client in clients], [
+            ["t1"],
+            ["t1", "t1 0"],
+            ["t1", "t1 0", "t1 0 1", "t1 1"],
+        ])
+        final = read_rows(pipeline.stages[-1].augmentation.output_path + "threat.csv")
+        self.assertEqual(len(final), 2 * (36 + 4))
+
+
+class TestMainPathSelection(unittest.TestCase):
+
+    def run_main(self, env: dict) -> tuple[bool, int]:
+        with patch.dict(os.environ, env, clear=False), \
+                patch.object(augmentation_module, "AugmentationPipeline") as pipeline, \
+                patch.object(augmentation_module, "run_exported", lambda run: None), \
+                patch.object(augmentation_module.asyncio, "run"), \
+                patch.object(Augmentation, "start") as start:
+            augmentation_module.main()
+        return pipeline.called, start.call_count
+
+    # 1. Unbudgeted interactive runs use the pipeline
+    def test_pipeline_by_default(self):
+        env = {"ATHENA_TOKEN_BUDGET": "", "ATHENA_COST_BUDGET": "", "ATHENA_SEQUENTIAL": "", "ATHENA_RESUME_SKIPPED": ""}
+        self.assertEqual(self.run_main(env), (True, 0))
+
+    # 2. Budgeted runs keep each stage's fewest-samples-first order
+    def test_budget_runs_sequentially(self):
+        self.assertEqual(self.run_main({"ATHENA_TOKEN_BUDGET": "1000"}), (False, len(AugmentationType)))
+
+    # 3. Every stage's clients share one response cache
+    def test_stages_share_cache(self):
+        env = {"ATHENA_TOKEN_BUDGET": "", "ATHENA_COST_BUDGET": "", "ATHENA_SEQUENTIAL": "", "ATHENA_RESUME_SKIPPED": ""}
+        with patch.dict(os.environ, env, clear=False), \
+                patch.object(augmentation_module, "AugmentationPipeline") as pipeline, \
+                patch.object(augmentation_module, "run_exported", lambda run: None), \
+                patch.object(augmentation_module.asyncio, "run"):
+            augmentation_module.main()
+
+        augmentations = pipeline.call_args.args[0]
+        self.assertEqual(len({id(augmentation.cache) for augmentation in augmentations}), 1)
@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+
+from lib.augment.Progress import ProgressManifest, chunk_hash
+
+
+class TestProgressManifest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name + "/progress/stage.jsonl"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 1. Recorded chunks are outstanding no more, for this run and the next
+    async def test_record_and_reload(self):
+        progress = ProgressManifest(self.path)
+        await progress.load()
+        self.assertFalse(progress.resumed)
+
+        await progress.record("threat", "1", ["a", "b"])
+        self.assertEqual(progress.outstanding("threat", "1", ["a", "b", "c"]), ["c"])
+        self.assertEqual(progress.outstanding("threat", "2", ["a"]), ["a"])
+
+        reloaded = ProgressManifest(self.path)
+        await reloaded.load()
+        self.assertTrue(reloaded.resumed)
+        self.assertEqual(reloaded.chunks, 1)
+        self.assertEqual(reloaded.outstanding("threat", "1", ["b", "c", "a"]), ["c"])
+
+    # 2. A line torn by a crash leaves its chunk outstanding
+    async def test_torn_line_ignored(self):
+        progress = ProgressManifest(self.path)
+        await progress.record("threat", "1", ["a"])
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"element": "threat", "ordinal": "1", "sent')
+
+        reloaded = ProgressManifest(self.path)
+        await reloaded.load()
+        self.assertEqual(reloaded.outstanding("threat", "1", ["a", "b"]), ["b"])
+
+    # 3. Chunk hashes ignore sentence order
+    def test_chunk_hash(self):
+        self.assertEqual(chunk_hash(["a", "b"]), chunk_hash(["b", "a"]))
+        self.assertNotEqual(chunk_hash(["a", "b"]), chunk_hash(["a", "c"]))
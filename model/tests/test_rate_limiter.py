@@ -0,0 +1,75 @@
+import asyncio
+import time
+import unittest
+
+from lib.util.openai.RateLimiter import RateLimiter, TokenBucket, TokenEstimate, estimate_tokens
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    # 1. Buckets start full and wait once drained
+    def test_wait_time_after_consume(self):
+        bucket = TokenBucket(per_minute=60)
+        self.assertEqual(bucket.wait_time(10), 0)
+
+        bucket.consume(60)
+        self.assertAlmostEqual(bucket.wait_time(1), 1.0, places=1)
+
+    # 2. Requests larger than the bucket are capped rather than blocked forever
+    def test_oversized_request_is_capped(self):
+        bucket = TokenBucket(per_minute=60)
+        self.assertEqual(bucket.wait_time(1_000), 0)
+
+    # 3. Adjustments refund up to capacity and allow debt
+    def test_adjust(self):
+        bucket = TokenBucket(per_minute=60)
+        bucket.adjust(100)
+        self.assertAlmostEqual(bucket.available, 60, places=1)
+
+        bucket.adjust(-90)
+        self.assertLess(bucket.available, 0)
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    # 4. Estimates cover the system prompt, the batch and its expected rewrites
+    async def test_estimate(self):
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=10_000)
+        estimate = limiter.estimate("s" * 400, ["a" * 40, "b" * 39])
+
+        self.assertEqual(estimate.content_tokens, estimate_tokens("a" * 40 + "\n" + "b" * 39))
+        self.assertEqual(estimate.prompt_tokens, 100 + 20)
+        self.assertEqual(estimate.completion_tokens, 60)
+
+    # 5. Reported usage refines subsequent estimates
+    async def test_reconcile_refines_estimate(self):
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=10_000)
+        before = limiter.estimate("system", ["sentence one", "sentence two"])
+
+        for _ in range(20):
+            estimate = limiter.estimate("system", ["sentence one", "sentence two"])
+            limiter.reconcile(estimate, estimate.raw_prompt_tokens * 3, estimate.content_tokens)
+
+        after = limiter.estimate("system", ["sentence one", "sentence two"])
+        self.assertGreater(after.prompt_tokens, before.prompt_tokens * 2)
+        self.assertLess(after.completion_tokens, before.completion_tokens / 2)
+
+    # 6. Admission waits on whichever budget is exhausted
+    async def test_acquire_waits_for_token_budget(self):
+        limiter = RateLimiter(requests_per_minute=6_000, tokens_per_minute=600)
+        estimate = TokenEstimate(prompt_tokens=550, completion_tokens=0)
+        await limiter.acquire(estimate)
+
+        start = time.monotonic()
+        await limiter.acquire(TokenEstimate(prompt_tokens=55, completion_tokens=0))
+        self.assertGreater(time.monotonic() - start, 0.3)
+
+    # 7. Admission waits on the request budget
+    async def test_acquire_waits_for_request_budget(self):
+        limiter = RateLimiter(requests_per_minute=120, tokens_per_minute=1_000_000)
+        limiter.requests.consume(120)
+
+        task = asyncio.create_task(limiter.acquire(TokenEstimate(1, 1)))
+        await asyncio.sleep(0.1)
+        self.assertFalse(task.done())
+        await asyncio.wait_for(task, 2)
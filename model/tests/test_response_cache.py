@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from lib.util.openai.GPTClient import GPTClient
+from lib.util.openai.ResponseCache import ResponseCache, cache_key
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 1. Stored sentences are returned, unknown ones are misses
+    async def test_put_and_get(self):
+        cache = ResponseCache(self.tmp.name)
+        await cache.put_many("model", "prompt", {"a": ["a1", "a2"], "b": []})
+
+        found = await cache.get_many("model", "prompt", ["a", "b", "c"])
+        self.assertEqual(found, {"a": ["a1", "a2"], "b": []})
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    # 2. Keys depend on model and prompt as well as the sentence
+    async def test_key_includes_model_and_prompt(self):
+        cache = ResponseCache(self.tmp.name)
+        await cache.put_many("model", "prompt", {"a": ["a1"]})
+
+        self.assertEqual(await cache.get_many("other-model", "prompt", ["a"]), {})
+        self.assertEqual(await cache.get_many("model", "other-prompt", ["a"]), {})
+        self.assertNotEqual(cache_key("m", "p", "a"), cache_key("m", "p", "b"))
+
+    # 3. Entries persist across instances
+    async def test_persists_to_disk(self):
+        await ResponseCache(self.tmp.name).put_many("model", "prompt", {"a": ["a1"]})
+
+        cache = ResponseCache(self.tmp.name)
+        self.assertEqual(await cache.get_many("model", "prompt", ["a"]), {"a": ["a1"]})
+        self.assertGreater(cache.size, 0)
+
+    # 4. Least recently used entries are evicted past the size limit
+    async def test_size_eviction(self):
+        cache = ResponseCache(self.tmp.name, max_bytes=200)
+        await cache.put_many("model", "prompt", {"old": ["x" * 40]})
+        await cache.put_many("model", "prompt", {"kept": ["y" * 40]})
+        await cache.get_many("model", "prompt", ["old"])
+        await cache.put_many("model", "prompt", {"new": ["z" * 40]})
+
+        self.assertLessEqual(cache.size, 200)
+        found = await cache.get_many("model", "prompt", ["old", "kept", "new"])
+        self.assertEqual(set(found), {"old", "new"})
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(self.tmp.name)), 2)
+
+
+class TestGPTClientCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = GPTClient("dummy", "model", "system", pool_size=1, cache=ResponseCache(self.tmp.name))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 5. Only cache misses are dispatched and results are merged
+    async def test_process_batch_sends_only_misses(self):
+        await self.client.cache.put_many("model", "system", {"cached": ["c1"]})
+        sent = []
+
+        async def fake_dispatch(batch, on_result=None):
+            sent.append(batch)
+            return {sentence: [sentence + "1"] for sentence in batch}
+
+        with patch.object(self.client, "_dispatch", fake_dispatch):
+            result = await self.client.process_batch(["cached", "fresh"])
+            again = await self.client.process_batch(["fresh", "cached"])
+
+        self.assertEqual(sent, [["fresh"]])
+        self.assertEqual(result, {"cached": ["c1"], "fresh": ["fresh1"]})
+        self.assertEqual(again, result)
+
+    # 6. Failed dispatches still return whatever was cached
+    async def test_process_batch_failure_returns_cached(self):
+        await self.client.cache.put_many("model", "system", {"cached": ["c1"]})
+
+        async def fake_dispatch(batch, on_result=None):
+            return None
+
+        with patch.object(self.client, "_dispatch", fake_dispatch):
+            self.assertEqual(await self.client.process_batch(["cached", "fresh"]), {"cached": ["c1"]})
+            self.assertIsNone(await self.client.process_batch(["fresh"]))
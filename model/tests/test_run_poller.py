@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from lib.util.openai.RunPoller import RunPoller
+
+
+class DummyRun:
+    def __init__(self, id, status):
+        self.id = id
+        self.status = status
+
+
+class TestRunPoller(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        await self.poller.close()
+
+    # 1. A run is resolved once it leaves an active status
+    async def test_wait_returns_terminal_run(self):
+        calls = 0
+
+        async def retrieve(thread_id, run_id):
+            nonlocal calls
+            calls += 1
+            return DummyRun(run_id, "completed" if calls >= 2 else "in_progress")
+
+        self.poller = RunPoller(retrieve)
+        run = await self.poller.wait("thread", "run-1", timeout=10)
+
+        self.assertEqual(run.status, "completed")
+        self.assertEqual(calls, 2)
+        self.assertEqual(self.poller.in_flight, 0)
+
+    # 2. Runs that never finish time out as None
+    async def test_wait_times_out(self):
+        async def retrieve(thread_id, run_id):
+            return DummyRun(run_id, "queued")
+
+        self.poller = RunPoller(retrieve)
+        run = await self.poller.wait("thread", "run-2", timeout=0.1)
+
+        self.assertIsNone(run)
+        self.assertEqual(self.poller.in_flight, 0)
+
+    # 3. Many concurrent runs are served by a single poll loop
+    async def test_concurrent_runs_share_loop(self):
+        async def retrieve(thread_id, run_id):
+            return DummyRun(run_id, "failed")
+
+        self.poller = RunPoller(retrieve)
+        runs = await asyncio.gather(*(self.poller.wait("thread", f"run-{i}", timeout=10) for i in range(20)))
+
+        self.assertEqual([r.id for r in runs], [f"run-{i}" for i in range(20)])
+        self.assertEqual(self.poller.polls, 20)
+
+    # 4. Poll errors are retried rather than failing the run
+    async def test_retrieve_error_is_retried(self):
+        calls = 0
+
+        async def retrieve(thread_id, run_id):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ConnectionError("Dummy poll failure")
+            return DummyRun(run_id, "completed")
+
+        self.poller = RunPoller(retrieve)
+        run = await self.poller.wait("thread", "run-4", timeout=10)
+        self.assertEqual(run.status, "completed")
+
+    # 5. Poll schedule follows observed completion times
+    async def test_next_delay_uses_history(self):
+        self.poller = RunPoller(None)
+        for duration in (4.0, 5.0, 6.0, 7.0):
+            self.poller._record(duration)
+
+        self.assertAlmostEqual(self.poller._next_delay(0), 5.0)
+        self.assertAlmostEqual(self.poller._next_delay(5.5), 0.5)
+        # Past every observed duration, back off relative to elapsed time
+        self.assertAlmostEqual(self.poller._next_delay(20), 10.0)
+        self.assertAlmostEqual(self.poller._next_delay(100), 15)
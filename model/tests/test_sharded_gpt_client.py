@@ -0,0 +1,134 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from openai import AsyncOpenAI
+
+from lib.util.openai.ConcurrencyLimiter import ConcurrencyLimiter
+from lib.util.openai.FailureJournal import FailureJournal
+from lib.util.openai.ShardedGPTClient import ShardedGPTClient, ShardCredentials
+from tests.fake_openai_server import FakeOpenAIServer
+
+
+class DummyShard:
+    def __init__(self, name, limit=2):
+        self.name = name
+        self.limiter = ConcurrencyLimiter(limit, maximum=limit)
+        self.completed = self.failed = 0
+        self.batches = []
+        self.release = asyncio.Event()
+
+    @property
+    def capacity(self):
+        return self.limiter.maximum
+
+    async def process_batch(self, batch, on_result=None):
+        self.batches.append(batch)
+        await self.release.wait()
+        return {sentence: [sentence] for sentence in batch}
+
+
+class TestShardedGPTClient(unittest.IsolatedAsyncioTestCase):
+
+    # 1. Batches go to the shard with the least outstanding work for its limit
+    async def test_routes_to_least_loaded(self):
+        small, large = DummyShard("small", limit=1), DummyShard("large", limit=4)
+        client = ShardedGPTClient("dummy", [small, large])
+
+        tasks = [asyncio.create_task(client.process_batch([str(i)])) for i in range(5)]
+        await asyncio.sleep(0)
+
+        self.assertEqual((len(small.batches), len(large.batches)), (1, 4))
+        small.release.set()
+        large.release.set()
+        await asyncio.gather(*tasks)
+
+    # 2. The client can take as many batches at once as all its shards together
+    def test_capacity_sums_shards(self):
+        client = ShardedGPTClient("dummy", [DummyShard("small", limit=1), DummyShard("large", limit=4)])
+        self.assertEqual(client.capacity, 5)
+
+    # 3. Rate limited shards are drained while another shard is healthy
+    async def test_throttled_shard_is_drained(self):
+        throttled, healthy = DummyShard("throttled"), DummyShard("healthy")
+        throttled.limiter.last_throttle = time.monotonic()
+        throttled.release.set()
+        healthy.release.set()
+        client = ShardedGPTClient("dummy", [throttled, healthy])
+
+        await asyncio.gather(*(client.process_batch([str(i)]) for i in range(3)))
+        self.assertEqual((len(throttled.batches), len(healthy.batches)), (0, 3))
+
+        healthy.limiter.last_throttle = time.monotonic()
+        await client.process_batch(["all draining"])
+        self.assertEqual(len(throttled.batches) + len(healthy.batches), 4)
+
+    # 4. Credentials parse from a comma-separated key[@organization] list
+    def test_parse_credentials(self):
+        self.assertEqual(ShardCredentials.parse_many(" sk-a@org-1, sk-b ,"), [
+            ShardCredentials("sk-a", "org-1"),
+            ShardCredentials("sk-b", None),
+        ])
+
+    # 5. Each key gets its own assistant and threads against the API
+    async def test_create_over_http(self):
+        keys = []
+
+        def openai_client(api_key=None, organization=None):
+            keys.append(api_key)
+            return AsyncOpenAI(api_key=api_key, base_url=server.url)
+
+        with FakeOpenAIServer() as server, patch("lib.util.openai.GPTClient.AsyncOpenAI", openai_client):
+            client = await ShardedGPTClient.create(
+                "dummy", "dummy-model", "dummy-system",
+                [ShardCredentials("sk-a"), ShardCredentials("sk-b")], pool_size=2,
+            )
+            result = await client.process_batch(["one"])
+            await client.close()
+
+        self.assertEqual(result, {"one": ["one (rewritten)"]})
+        self.assertEqual(sorted(keys), ["sk-a", "sk-b"])
+        self.assertEqual(server.calls["assistants.create"], 2)
+        self.assertIs(client.shards[0].journal, client.shards[1].journal)
+        self.assertIs(client.shards[0].journal, client.journal)
+        self.assertIs(client.shards[0]._in_flight, client.shards[1]._in_flight)
+
+    # 6. A sentence in flight on one shard is awaited, not sent again, by a batch routed to another
+    async def test_coalesces_across_shards(self):
+        def openai_client(api_key=None, organization=None):
+            return AsyncOpenAI(api_key=api_key, base_url=server.url)
+
+        with FakeOpenAIServer() as server, patch("lib.util.openai.GPTClient.AsyncOpenAI", openai_client):
+            client = await ShardedGPTClient.create(
+                "dummy", "dummy-model", "dummy-system",
+                [ShardCredentials("sk-a"), ShardCredentials("sk-b")], pool_size=2,
+            )
+            server.run_seconds = lambda: 0.2
+            results = await asyncio.gather(client.process_batch(["same"]), client.process_batch(["same"]))
+            await client.close()
+
+        self.assertEqual(results, [{"same": ["same (rewritten)"]}] * 2)
+        self.assertEqual(server.calls["runs.create"], 1)
+
+    # 7. Replaying journaled failures takes every shard's entries and routes them afresh
+    async def test_replay_failed_takes_every_shard(self):
+        first, second = DummyShard("first"), DummyShard("second")
+        first.release.set()
+        second.release.set()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            client = ShardedGPTClient("dummy", [first, second])
+            client.journal = FailureJournal(tmp + "/failed.jsonl")
+            client.journal.record({"client": "first", "run_id": "r1", "message": "a\nb"})
+            client.journal.record({"client": "other", "run_id": "r2", "message": "c"})
+            client.journal.record({"client": "second", "run_id": "r3", "message": "b\nd"})
+
+            result = await client.replay_failed(batch_size=2)
+            await client.journal.flush()
+
+            self.assertEqual(result, {"a": ["a"], "b": ["b"], "d": ["d"]})
+            remaining = await FailureJournal.read(tmp + "/failed.jsonl")
+            self.assertEqual([e["run_id"] for e in remaining], ["r2"])
+            await client.journal.close()
@@ -0,0 +1,31 @@
+import unittest
+
+from lib.util.openai.SlidingWindow import SlidingWindow
+
+
+class TestSlidingWindow(unittest.TestCase):
+
+    # 1. Percentiles are read from the sorted samples
+    def test_percentile(self):
+        window = SlidingWindow(100)
+        for sample in (5.0, 1.0, 4.0, 2.0, 3.0):
+            window.add(sample)
+        self.assertEqual(window.percentile(0.5), 3.0)
+
+    # 2. Only the most recent samples are kept
+    def test_oldest_samples_are_dropped(self):
+        window = SlidingWindow(3)
+        for sample in (100.0, 1.0, 2.0, 3.0):
+            window.add(sample)
+
+        self.assertEqual(len(window), 3)
+        self.assertEqual(window.percentile(0.99), 3.0)
+
+    # 3. A percentile can be taken over just the samples above a value
+    def test_percentile_above(self):
+        window = SlidingWindow(100)
+        for sample in range(1, 11):
+            window.add(float(sample))
+
+        self.assertEqual(window.percentile(0.0, above=6.0), 7.0)
+        self.assertIsNone(window.percentile(0.5, above=10.0))
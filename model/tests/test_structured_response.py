@@ -0,0 +1,36 @@
+import json
+import unittest
+
+from lib.util.openai.StructuredResponse import format_indexed_prompt, parse_indexed_response
+
+
+class TestStructuredResponse(unittest.TestCase):
+
+    # 1. Sentences are prefixed with their index
+    def test_format_indexed_prompt(self):
+        self.assertEqual(format_indexed_prompt(["a", "b"]), "0: a\n1: b")
+
+    # 2. Rewrites map straight to their index, whatever order they arrive in
+    def test_parse_out_of_order(self):
+        response = json.dumps({"results": [
+            {"index": 1, "rewrites": ["b1"]},
+            {"index": 0, "rewrites": ["a1", " a2 "]},
+        ]})
+        self.assertEqual(parse_indexed_response(response, 2), {0: ["a1", "a2"], 1: ["b1"]})
+
+    # 3. Invalid entries are dropped, nulls and blanks become no rewrites
+    def test_parse_drops_invalid_entries(self):
+        response = json.dumps({"results": [
+            {"index": 0, "rewrites": ["null", "", 3]},
+            {"index": 5, "rewrites": ["out of range"]},
+            {"index": True, "rewrites": ["not an index"]},
+            {"index": 1, "rewrites": "not a list"},
+            "not an entry",
+        ]})
+        self.assertEqual(parse_indexed_response(response, 2), {0: []})
+
+    # 4. Text that is not a results object is rejected
+    def test_parse_rejects_invalid_json(self):
+        for response in ("one\n\ntwo", '{"results": {}}', "[]", '{"results": [{"index": 0'):
+            with self.assertRaises(ValueError):
+                parse_indexed_response(response, 1)
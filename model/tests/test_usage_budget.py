@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+
+from lib.augment.Budget import Budget
+from lib.util.openai.UsageLedger import UsageLedger, price, usage_scope
+
+
+class TestUsageLedger(unittest.IsolatedAsyncioTestCase):
+
+    # 1. Usage is priced per model and attributed to the scope it ran in
+    async def test_record_by_scope(self):
+        ledger = UsageLedger()
+
+        async def run():
+            ledger.record("gpt-4o-mini", 1_000_000, 0)
+
+        with usage_scope("STAGE", "threat", "1"):
+            task = asyncio.create_task(run())
+        await task
+        ledger.record("gpt-4o-mini", 0, 1_000_000)
+
+        self.assertAlmostEqual(ledger.by_scope[("STAGE", "threat", "1")].cost, 0.15)
+        self.assertAlmostEqual(ledger.by_scope[None].cost, 0.60)
+        self.assertEqual(ledger.totals.runs, 2)
+        self.assertEqual(ledger.totals.total_tokens, 2_000_000)
+
+    # 2. Unknown models are counted without cost
+    def test_unknown_model_price(self):
+        self.assertEqual(price("unknown-model", 1_000, 1_000), 0.0)
+
+
+class TestBudget(unittest.TestCase):
+
+    # 1. Reservations count against the budget until released
+    def test_reserve_and_release(self):
+        budget = Budget(max_tokens=100, ledger=UsageLedger())
+
+        self.assertTrue(budget.reserve(60, 0))
+        budget.release(60, 0)
+        self.assertTrue(budget.reserve(60, 0))
+        self.assertFalse(budget.reserve(60, 0))
+
+    # 2. Spent usage is measured from the ledger, and exhaustion is final
+    def test_spent_usage_exhausts(self):
+        ledger = UsageLedger()
+        ledger.record("gpt-4o-mini", 500, 0)
+        budget = Budget(max_cost=0.0002, ledger=ledger)
+
+        ledger.record("gpt-4o-mini", 1_000, 0)
+        self.assertAlmostEqual(budget.spent_cost, 0.00015)
+        self.assertFalse(budget.reserve(0, 0.0001))
+        self.assertTrue(budget.exhausted)
+        self.assertFalse(budget.reserve(0, 0))
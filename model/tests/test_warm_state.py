@@ -0,0 +1,50 @@
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from lib.util.openai.ThreadPool import ThreadPool
+from lib.util.openai.WarmState import WarmState, fingerprint
+
+
+def pool(thread_id: str, completion_count: int = 0) -> ThreadPool:
+    return ThreadPool(0, SimpleNamespace(id=thread_id, created_at=1), completion_count)
+
+
+class TestWarmState(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fingerprint = fingerprint("name", "model", "prompt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 1. Saved threads are returned once, then claimed
+    async def test_save_and_claim(self):
+        state = WarmState("client", self.tmp.name)
+        await state.save(self.fingerprint, "asst_1", [pool("thread_1", 2)])
+
+        claimed = await state.claim(self.fingerprint)
+        self.assertEqual(claimed["assistant_id"], "asst_1")
+        self.assertEqual(claimed["threads"], [{"id": "thread_1", "created_at": 1, "completion_count": 2}])
+
+        again = await state.claim(self.fingerprint)
+        self.assertEqual(again["assistant_id"], "asst_1")
+        self.assertEqual(again["threads"], [])
+
+    # 2. A changed model or prompt invalidates the snapshot
+    async def test_fingerprint_mismatch(self):
+        state = WarmState("client", self.tmp.name)
+        await state.save(self.fingerprint, "asst_1", [pool("thread_1")])
+
+        self.assertIsNone(await state.claim(fingerprint("name", "model", "new prompt")))
+
+    # 3. Stale and missing snapshots are ignored
+    async def test_stale_or_missing(self):
+        state = WarmState("client", self.tmp.name, max_age_secs=0)
+        self.assertIsNone(await state.claim(self.fingerprint))
+
+        await state.save(self.fingerprint, "asst_1", [pool("thread_1")])
+        time.sleep(0.01)
+        self.assertIsNone(await state.claim(self.fingerprint))